@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Excel Handler.
+
+Generates synthetic workbooks in the Optix input format and times each
+stage of reading and validating them. Results are appended to a JSON lines
+file, one line per stage, so runs from different versions can be compared.
+
+Usage:
+    python benchmark.py --rows 1000 10000 100000
+    python benchmark.py --rows 1000000 --error-rate 0.01 --null-rate 0.02
+    python benchmark.py --startup
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from main import (
+    COLUMN_VALIDATIONS,
+    EXPECTED_COLUMNS,
+    READER_BACKENDS,
+    ExcelData,
+    read_sheet,
+    validate_columns,
+    validate_data_types,
+)
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+DEFAULT_OUTPUT = 'benchmark_results.jsonl'
+DEFAULT_DATA_DIR = 'benchmark_data'
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+EXECUTABLE_PATH = os.path.join(ROOT_DIR, 'dist', 'Excel_Handler.exe' if sys.platform == 'win32' else 'Excel_Handler')
+
+def generate_workbook(path, rows, error_rate=0.0, null_rate=0.0, seed=0, extra_columns=0):
+    """
+    Write a synthetic workbook matching EXPECTED_COLUMNS and COLUMN_VALIDATIONS.
+
+    Args:
+        path: where to write the .xlsx file
+        rows: number of data rows
+        error_rate: share of numeric/date cells holding an invalid value
+        null_rate: share of cells left empty
+        seed: random seed, so the same arguments give the same file
+        extra_columns: number of unexpected text columns added after the
+            expected ones, as in real exports
+    """
+    rng = random.Random(seed)
+    start_date = datetime.datetime(2020, 1, 1)
+    extra_names = [f"Extra {i + 1}" for i in range(extra_columns)]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(EXPECTED_COLUMNS + extra_names)
+
+    for row_number in range(rows):
+        row = []
+        for col_name in EXPECTED_COLUMNS:
+            col_type = COLUMN_VALIDATIONS.get(col_name, {}).get('type', 'string')
+            if rng.random() < null_rate:
+                row.append(None)
+            elif col_type == 'numeric':
+                row.append('n/a' if rng.random() < error_rate else rng.randint(1, 5))
+            elif col_type == 'date':
+                if rng.random() < error_rate:
+                    row.append('not a date')
+                else:
+                    row.append(start_date + datetime.timedelta(days=rng.randint(0, 1500)))
+            elif col_name in ('Customer', 'Customer Supplier Code', 'Supplier Name'):
+                # Low-cardinality columns, as in real exports
+                row.append(f"{col_name.split()[0]} {rng.randint(1, 50)}")
+            else:
+                row.append(f"{col_name.split()[-1]}-{row_number:07d}")
+        row.extend(f"{name}-{row_number:07d}" for name in extra_names)
+        sheet.append(row)
+
+    workbook.save(path)
+
+def workbook_path(data_dir, rows, error_rate, null_rate, seed, extra_columns=0):
+    """Return the path of a generated workbook, generating it if needed."""
+    os.makedirs(data_dir, exist_ok=True)
+    extra = f"_x{extra_columns}" if extra_columns else ''
+    path = os.path.join(data_dir, f"optix_{rows}_e{error_rate}_n{null_rate}_s{seed}{extra}.xlsx")
+    if not os.path.exists(path):
+        print(f"  Generating {path}...")
+        generate_workbook(path, rows, error_rate, null_rate, seed, extra_columns)
+    return path
+
+def available_backends(path):
+    """Return the names of the installed reader backends that can read path."""
+    return [
+        name for name, backend in READER_BACKENDS.items()
+        if backend.available() and backend.supports(path)
+    ]
+
+def run_stages(path, backends=()):
+    """
+    Run every stage once and return {stage: seconds}.
+
+    Each reader backend in backends is timed reading the same file, as
+    stage 'read:<backend>', and validating the frame it returned, as
+    'validate:<backend>', as backends leave different dtypes (e.g.
+    object columns of mixed values) for the validation to convert.
+    'validate_data_types' validates the pd.read_excel frame, and
+    'read_projected' reads only EXPECTED_COLUMNS with the default backend. With pyarrow installed, 'export_parquet'
+    writes the validated data next to the workbook and 'read_parquet'
+    reads it back, as a downstream job would.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    workbook = load_workbook(path, read_only=True)
+    workbook.close()
+    timings['file_open'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = pd.read_excel(path)
+    timings['read_excel'] = time.perf_counter() - start
+
+    for name in backends:
+        start = time.perf_counter()
+        backend_df = READER_BACKENDS[name].read_frame(path)
+        timings[f'read:{name}'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        validate_data_types(backend_df, COLUMN_VALIDATIONS)
+        timings[f'validate:{name}'] = time.perf_counter() - start
+        del backend_df
+
+    start = time.perf_counter()
+    read_sheet(path, columns=EXPECTED_COLUMNS)
+    timings['read_projected'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate_columns(df, EXPECTED_COLUMNS)
+    timings['validate_columns'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate_data_types(df, COLUMN_VALIDATIONS)
+    timings['validate_data_types'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    excel_data = ExcelData(df, path)
+    timings['excel_data'] = time.perf_counter() - start
+
+    if importlib.util.find_spec('pyarrow'):
+        export_path = os.path.splitext(path)[0] + '.parquet'
+        start = time.perf_counter()
+        excel_data.export(export_path)
+        timings['export_parquet'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pd.read_parquet(export_path)
+        timings['read_parquet'] = time.perf_counter() - start
+
+    return timings
+
+def measure_peak_memory(path, backends=()):
+    """
+    Run every stage under tracemalloc and return {stage: peak bytes}.
+
+    Peaks are measured on top of what earlier stages still hold, so they
+    show what each stage allocates itself.
+    """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def peak_of(stage, func):
+            tracemalloc.reset_peak()
+            held_before = tracemalloc.get_traced_memory()[0]
+            result = func()
+            peaks[stage] = tracemalloc.get_traced_memory()[1] - held_before
+            return result
+
+        peak_of('file_open', lambda: load_workbook(path, read_only=True).close())
+        df = peak_of('read_excel', lambda: pd.read_excel(path))
+        for name in backends:
+            peak_of(f'read:{name}', lambda: READER_BACKENDS[name].read_frame(path))
+        peak_of('read_projected', lambda: read_sheet(path, columns=EXPECTED_COLUMNS))
+        peak_of('validate_columns', lambda: validate_columns(df, EXPECTED_COLUMNS))
+        peak_of('validate_data_types', lambda: validate_data_types(df, COLUMN_VALIDATIONS))
+        peak_of('excel_data', lambda: ExcelData(df, path))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def measure_startup(command, repeat):
+    """
+    Return the fastest wall time of starting the tool and exiting at the menu.
+
+    Option 3 exits, and the empty line answers "Press Enter to exit".
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, input=b'3\n\n', cwd=ROOT_DIR, capture_output=True, check=True)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def startup_benchmark(repeat, executable=EXECUTABLE_PATH):
+    """
+    Time cold starts of the module import, the source run and the built executable.
+
+    The executable is skipped if it has not been built with build.py.
+    """
+    commands = {
+        'startup:import': [sys.executable, '-c', "import sys; sys.path.insert(0, 'src'); import main"],
+        'startup:source': [sys.executable, os.path.join('src', 'main.py')],
+    }
+    if executable and os.path.exists(executable):
+        commands['startup:executable'] = [executable]
+    else:
+        print(f"  No executable at {executable}; run build.py to include it")
+
+    common = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': code_version(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'rows': None,
+    }
+    return [
+        dict(common, stage=stage, seconds=round(measure_startup(command, repeat), 6),
+             rows_per_second=None, peak_bytes=None)
+        for stage, command in commands.items()
+    ]
+
+def code_version():
+    """Return the git commit of this checkout, or 'unknown'."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def benchmark(rows, error_rate, null_rate, seed, repeat, data_dir, memory=True, backends=None,
+              extra_columns=0):
+    """Benchmark one workbook size and return one result dict per stage."""
+    path = workbook_path(data_dir, rows, error_rate, null_rate, seed, extra_columns)
+    if backends is None:
+        backends = available_backends(path)
+
+    # Keep the fastest of the repeats, the least disturbed by other load
+    best = {}
+    for _ in range(repeat):
+        for stage, seconds in run_stages(path, backends).items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+    peaks = measure_peak_memory(path, backends) if memory else {}
+
+    common = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': code_version(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'rows': rows,
+        'error_rate': error_rate,
+        'null_rate': null_rate,
+        'extra_columns': extra_columns,
+        'file_bytes': os.path.getsize(path),
+    }
+    return [
+        dict(common, stage=stage, seconds=round(seconds, 6),
+             rows_per_second=round(rows / seconds) if seconds > 0 else None,
+             peak_bytes=peaks.get(stage))
+        for stage, seconds in best.items()
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Excel Handler on synthetic workbooks.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help="row counts to benchmark (default: %(default)s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of invalid numeric/date cells")
+    parser.add_argument('--null-rate', type=float, default=0.0, help="share of empty cells")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the generated data")
+    parser.add_argument('--extra-columns', type=int, default=0,
+                        help="unexpected columns added to each workbook")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size; the fastest is kept")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON lines file to append results to")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated workbooks are kept")
+    parser.add_argument('--no-memory', action='store_true', help="skip the (slower) peak memory pass")
+    parser.add_argument('--backends', nargs='*', choices=list(READER_BACKENDS), default=None,
+                        help="reader backends to time (default: every installed one)")
+    parser.add_argument('--startup', action='store_true',
+                        help="time cold starts of the source run and the built executable instead")
+    parser.add_argument('--executable', default=EXECUTABLE_PATH, help="built executable to time with --startup")
+    args = parser.parse_args()
+
+    if args.startup:
+        print("\nBenchmarking startup...")
+        results = startup_benchmark(max(args.repeat, 5), args.executable)
+        with open(args.output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+        for result in results:
+            print(f"  {result['stage']:<20} {result['seconds']:9.3f} s")
+        print(f"\nResults appended to: {args.output}")
+        return
+
+    for rows in args.rows:
+        print(f"\nBenchmarking {rows} rows...")
+        results = benchmark(rows, args.error_rate, args.null_rate, args.seed,
+                            args.repeat, args.data_dir, memory=not args.no_memory,
+                            backends=args.backends, extra_columns=args.extra_columns)
+
+        with open(args.output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+
+        for result in results:
+            peak = result['peak_bytes']
+            peak_text = f"{peak / 1024 / 1024:8.1f} MB" if peak is not None else ''
+            rate = result['rows_per_second']
+            rate_text = f"{rate:>12,} rows/s" if rate is not None else ''
+            print(f"  {result['stage']:<20} {result['seconds']:9.3f} s {rate_text} {peak_text}")
+
+    print(f"\nResults appended to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -36,8 +36,8 @@ def print_info(message):
 
 def check_python_version():
     """Check if Python version is adequate."""
-    if sys.version_info < (3, 7):
-        print_error("Python 3.7 or higher is required")
+    if sys.version_info < (3, 9):
+        print_error("Python 3.9 or higher is required")
         print_info(f"Current version: {sys.version}")
         return False
     print_success(f"Python version: {sys.version_info.major}.{sys.version_info.minor}")
@@ -104,6 +104,9 @@ def build_executable():
         sys.executable, "-m", "PyInstaller",
         "--onefile",
         "--console",
+        # pandas and numpy are imported lazily, so PyInstaller cannot see them
+        "--hidden-import", "pandas",
+        "--hidden-import", "numpy",
         "src/main.py",
         "--name", "Excel_Handler"
     ]
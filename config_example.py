@@ -18,20 +18,43 @@ EXPECTED_COLUMNS = [
 ]
 
 # Column data type expectations and validation rules
+#
+# Besides 'type' and 'required', a column can have:
+#   'min' / 'max'   lowest / highest value of a numeric or date column
+#   'pattern'       regular expression every value must match in full
+#   'allowed'       list of the only values accepted
+#   'not_before'    another column of the same type that this column's value
+#                   in the same row must not be less than (e.g. close >= create)
+#   'unique'        True if no two rows may share a value, or a list of other
+#                   columns that form a unique key together with this one
+#   'reference'     a CSV, Parquet or Excel file listing the only values
+#                   accepted: its path, or {'path': ..., 'column': ..., 'sheet': ...}
+#                   when the column there has another name. Paths are relative
+#                   to this file. The file is indexed once and the index is reused
+#                   until the file changes.
+# Empty cells are only checked by 'required'.
 COLUMN_VALIDATIONS = {
     'Customer': {'type': 'string', 'required': True},
-    'Customer RO': {'type': 'string', 'required': True},
-    'Customer Pre Work PN': {'type': 'string', 'required': True},
+    'Customer RO': {'type': 'string', 'required': True, 'pattern': r'[A-Z0-9-]+',
+                    'unique': ['Customer Pre Work SN']},
+    'Customer Pre Work PN': {'type': 'string', 'required': True, 'pattern': r'[A-Z0-9][A-Z0-9-]*'},
     'Customer Pre Work SN': {'type': 'string', 'required': True},
     'Description': {'type': 'string', 'required': True},
-    'Customer Supplier Code': {'type': 'string', 'required': True},
-    'Priority - PDR/TDR': {'type': 'numeric', 'required': True},
+    'Customer Supplier Code': {'type': 'string', 'required': True, 'allowed': ['SUP01', 'SUP02', 'SUP03']},
+    'Priority - PDR/TDR': {'type': 'numeric', 'required': True, 'min': 1, 'max': 5},
     'Supplier Name': {'type': 'string', 'required': True},
     'Last Quote ID': {'type': 'string', 'required': False},  # Can be empty
-    'RO Create Date': {'type': 'date', 'required': True},
-    'RO Close Date': {'type': 'date', 'required': True},
+    'RO Create Date': {'type': 'date', 'required': True, 'min': '2000-01-01'},
+    'RO Close Date': {'type': 'date', 'required': True, 'not_before': 'RO Create Date'},
 }
 
+# Check suppliers and quotes against master data exports:
+# COLUMN_VALIDATIONS['Customer Supplier Code']['reference'] = {'path': 'suppliers.parquet', 'column': 'Supplier Code'}
+# COLUMN_VALIDATIONS['Supplier Name']['reference'] = {'path': 'suppliers.parquet', 'column': 'Name'}
+# COLUMN_VALIDATIONS['Last Quote ID']['reference'] = {'path': 'quotes.csv', 'column': 'Quote ID'}
+
+# Use this file with: python src/main.py batch incoming/ --config config.py
+
 # Example configurations:
 
 # For a simple contact list:
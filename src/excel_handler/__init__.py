@@ -0,0 +1,155 @@
+"""
+Excel Handler: validation of Excel workbooks against an expected layout.
+
+The modules are listed in dependency order; src/main.py adds the command
+line and the interactive tool.
+"""
+from .settings import (
+    EXPECTED_COLUMNS,
+    COLUMN_VALIDATIONS,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_EXPORT_ROWS,
+    EXPORT_FORMATS,
+    SHARED_STRINGS_SPILL_BYTES,
+    DEFAULT_SAMPLE_SIZE,
+    DEFAULT_QUICK_CHECK_SECONDS,
+    QUICK_CHECK_MIN_BYTES,
+    DEFAULT_MAX_ERROR_VALUES,
+    FIRST_DATA_ROW,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_BYTES,
+    DATE_SAMPLE_ROWS,
+    CATEGORY_MAX_UNIQUE_RATIO,
+    ROW_KEY_COLUMNS,
+    DEFAULT_STATE_DIR,
+    DEFAULT_STATE_MAX_BYTES,
+    INTERACTIVE_CACHE_DIR,
+    INTERACTIVE_STATE_DIR,
+    DEFAULT_REFERENCE_DIR,
+    SHEET_COLUMN,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE,
+    DEFAULT_MAX_UPLOAD_BYTES,
+    DEFAULT_WATCH_SETTLE,
+    DEFAULT_WATCH_POLL,
+    DEFAULT_WATCH_QUEUE,
+    WATCH_RATE_WINDOW,
+)
+from .instrumentation import Instrumentation, NO_INSTRUMENTATION
+from .readers import (
+    read_excel_header,
+    ReaderBackend,
+    WorkbookReader,
+    OpenpyxlBackend,
+    CalamineBackend,
+    XmlStreamBackend,
+    PandasBackend,
+    READER_BACKENDS,
+    select_backend,
+    iter_excel_chunks,
+    read_sheet,
+)
+from .engine import (
+    validate_columns,
+    ValidationResult,
+    ValidationEngine,
+    ErrorIndex,
+    DuplicateIndex,
+    ReferenceIndex,
+    load_reference,
+    count_data_type_errors,
+    format_data_type_errors,
+    validate_data_types,
+    load_config,
+)
+from .data import ExcelData, LazyExcelData, OutOfCoreExcelData, RowView
+from .cache import ParsedCache, load_sheet, IncrementalValidator
+from .validation import (
+    read_and_validate_excel,
+    QuickCheck,
+    quick_check,
+    find_excel_files,
+    validate_file_report,
+    find_cross_file_duplicates,
+    validate_batch,
+    write_batch_report,
+)
+from .server import ValidationServer
+from .watcher import FolderWatcher
+
+__all__ = [
+    'EXPECTED_COLUMNS',
+    'COLUMN_VALIDATIONS',
+    'DEFAULT_CHUNK_SIZE',
+    'DEFAULT_BATCH_SIZE',
+    'DEFAULT_EXPORT_ROWS',
+    'EXPORT_FORMATS',
+    'SHARED_STRINGS_SPILL_BYTES',
+    'DEFAULT_SAMPLE_SIZE',
+    'DEFAULT_QUICK_CHECK_SECONDS',
+    'QUICK_CHECK_MIN_BYTES',
+    'DEFAULT_MAX_ERROR_VALUES',
+    'FIRST_DATA_ROW',
+    'DEFAULT_CACHE_DIR',
+    'DEFAULT_CACHE_MAX_BYTES',
+    'DATE_SAMPLE_ROWS',
+    'CATEGORY_MAX_UNIQUE_RATIO',
+    'ROW_KEY_COLUMNS',
+    'DEFAULT_STATE_DIR',
+    'DEFAULT_STATE_MAX_BYTES',
+    'INTERACTIVE_CACHE_DIR',
+    'INTERACTIVE_STATE_DIR',
+    'DEFAULT_REFERENCE_DIR',
+    'SHEET_COLUMN',
+    'DEFAULT_SERVER_HOST',
+    'DEFAULT_SERVER_PORT',
+    'DEFAULT_SERVER_QUEUE',
+    'DEFAULT_MAX_UPLOAD_BYTES',
+    'DEFAULT_WATCH_SETTLE',
+    'DEFAULT_WATCH_POLL',
+    'DEFAULT_WATCH_QUEUE',
+    'WATCH_RATE_WINDOW',
+    'Instrumentation',
+    'NO_INSTRUMENTATION',
+    'read_excel_header',
+    'ReaderBackend',
+    'WorkbookReader',
+    'OpenpyxlBackend',
+    'CalamineBackend',
+    'XmlStreamBackend',
+    'PandasBackend',
+    'READER_BACKENDS',
+    'select_backend',
+    'iter_excel_chunks',
+    'read_sheet',
+    'validate_columns',
+    'ValidationResult',
+    'ValidationEngine',
+    'ErrorIndex',
+    'DuplicateIndex',
+    'ReferenceIndex',
+    'load_reference',
+    'count_data_type_errors',
+    'format_data_type_errors',
+    'validate_data_types',
+    'load_config',
+    'ExcelData',
+    'LazyExcelData',
+    'OutOfCoreExcelData',
+    'RowView',
+    'ParsedCache',
+    'load_sheet',
+    'IncrementalValidator',
+    'read_and_validate_excel',
+    'QuickCheck',
+    'quick_check',
+    'find_excel_files',
+    'validate_file_report',
+    'find_cross_file_duplicates',
+    'validate_batch',
+    'write_batch_report',
+    'ValidationServer',
+    'FolderWatcher',
+]
@@ -0,0 +1,47 @@
+"""
+Lazy imports of the heavy dependencies, and checks for optional ones.
+"""
+import importlib
+import importlib.util
+import sys
+import types
+
+class _LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that imports it when one of its attributes is first used.
+    
+    Unlike importlib.util.LazyLoader, nothing is put in sys.modules until
+    then, so other code cannot mistake the module for loaded.
+    """
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Later lookups find the attributes without coming back here
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def _lazy_import(name):
+    """
+    Import a module when one of its attributes is first used.
+    
+    pandas and numpy take most of the startup time, so they are only
+    loaded once a workbook is actually read.
+    
+    Raises:
+        ImportError: if the module is not installed
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
+
+np = _lazy_import('numpy')
+pd = _lazy_import('pandas')
+
+def _require_pyarrow(feature):
+    """Import pyarrow, explaining which feature needs it if it is missing."""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(f"{feature} requires pyarrow. Install it with: pip install pyarrow") from None
+    return pyarrow
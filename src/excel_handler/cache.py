@@ -0,0 +1,323 @@
+"""
+On-disk state: the cache of parsed sheets and the fingerprints kept by
+incremental validation.
+"""
+import hashlib
+import json
+import os
+
+from ._lazy import np, pd
+from .settings import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_STATE_DIR,
+    DEFAULT_STATE_MAX_BYTES,
+    FIRST_DATA_ROW,
+    ROW_KEY_COLUMNS,
+)
+from .instrumentation import NO_INSTRUMENTATION
+from .readers import select_backend
+from .engine import ErrorIndex, ValidationResult, _row_fingerprints
+
+class ParsedCache:
+    """
+    On-disk cache of parsed sheets with least-recently-used eviction.
+    
+    Entries are keyed on the file's content hash and size, so an unchanged
+    workbook is never parsed twice, even when it is copied or uploaded
+    again under another path. Sheets are stored
+    as Feather files, which needs pyarrow. Frames Arrow cannot represent,
+    such as columns holding both numbers and text, are not cached, as the
+    cache directory is never trusted with pickled data. When the cache
+    grows past max_bytes the least recently used entries are removed.
+    """
+    SUFFIX = '.feather'
+    # Entries written by older versions, which are never loaded
+    STALE_SUFFIXES = ('.pkl',)
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        
+    def __repr__(self):
+        return f"ParsedCache(cache_dir={self.cache_dir!r}, max_bytes={self.max_bytes})"
+    
+    def key(self, file_path, variant=''):
+        """
+        Return the cache key for a file.
+        
+        Args:
+            file_path: path to the Excel file
+            variant: extra text that changes how the file is parsed (optional)
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(f"|{os.stat(file_path).st_size}|{variant}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def load(self, key):
+        """Return the cached dataframe for key, or None."""
+        path = os.path.join(self.cache_dir, key + self.SUFFIX)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_feather(path)
+        except Exception:
+            # A damaged entry, or pyarrow no longer installed, is treated as a miss
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        return df
+    
+    def store(self, key, df):
+        """
+        Add a dataframe to the cache, evicting old entries if needed.
+        
+        Returns:
+            bool: False if the frame was not cached because pyarrow is not
+            installed or Arrow cannot represent one of its columns
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.tmp")
+        try:
+            df.to_feather(temp_path)
+        except (ImportError, TypeError, ValueError):
+            # e.g. a column of numbers and text (ArrowTypeError / ArrowInvalid)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        # Write under a temporary name so readers never see a partial entry
+        os.replace(temp_path, os.path.join(self.cache_dir, key + self.SUFFIX))
+        self._evict()
+        return True
+    
+    def _evict(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(self.STALE_SUFFIXES):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        _evict_least_recently_used(self.cache_dir, self.SUFFIX, self.max_bytes)
+
+def _evict_least_recently_used(directory, suffix, max_bytes):
+    """Remove the oldest files ending in suffix, by modification time, until the rest fit in max_bytes."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def load_sheet(file_path, cache=None, backend=None, columns=None, parsed=None):
+    """
+    Load the first sheet of an Excel file into a dataframe.
+    
+    Args:
+        file_path: path to the Excel file
+        cache: ParsedCache to read from and add to (optional)
+        backend: name of a reader backend (default: the fastest available)
+        columns: names of the columns to load (default: all columns)
+        parsed: the sheet as already parsed with this backend and columns,
+            e.g. by a QuickCheck; it is used instead of reading the file
+            and only added to the cache (optional)
+        
+    Returns:
+        tuple: (dataframe, True if it came from the cache)
+    """
+    reader = select_backend(file_path, backend)
+    if cache is None:
+        return (reader.read_frame(file_path, columns) if parsed is None else parsed), False
+    
+    # Backends differ in small ways (e.g. None vs NaN), so each gets its own entry
+    variant = reader.name if columns is None else f"{reader.name}|{'|'.join(columns)}"
+    key = cache.key(file_path, variant=variant)
+    df = cache.load(key) if parsed is None else None
+    if df is not None:
+        return df, True
+    
+    df = reader.read_frame(file_path, columns) if parsed is None else parsed
+    try:
+        cache.store(key, df)
+    except Exception as e:
+        print(f"  Note: Could not write to cache: {str(e)}")
+    return df, False
+
+class IncrementalValidator:
+    """
+    Re-validate only the rows of a file that changed since its last version.
+    
+    For every file it validates, it stores a fingerprint of each row, keyed
+    on key_columns, along with the errors found in that row. Fingerprints
+    are hashes of the cells' text, so they do not depend on the dtypes
+    pandas infers for the columns. When the same
+    file is validated again, unchanged rows reuse their stored errors and
+    only added or changed rows go through the ValidationEngine. Stored state
+    is discarded when the validation rules change. It is kept as plain
+    arrays in a .npz file per source file, loaded without pickle support.
+    When the state grows past max_bytes, the files validated least
+    recently are forgotten.
+    """
+    def __init__(self, state_dir=DEFAULT_STATE_DIR, key_columns=ROW_KEY_COLUMNS,
+                 max_bytes=DEFAULT_STATE_MAX_BYTES):
+        self.state_dir = state_dir
+        self.key_columns = list(key_columns)
+        self.max_bytes = max_bytes
+    
+    def __repr__(self):
+        return (f"IncrementalValidator(state_dir={self.state_dir!r}, key_columns={self.key_columns}, "
+                f"max_bytes={self.max_bytes})")
+    
+    def validate(self, df, file_path, engine, instrument=NO_INSTRUMENTATION, source_name=None):
+        """
+        Validate a dataframe, reusing results from the file's last version.
+        
+        Args:
+            df: pandas DataFrame read from file_path
+            file_path: path the data was read from; identifies the file
+            engine: ValidationEngine to run on added and changed rows
+            instrument: Instrumentation passed on to the engine (optional)
+            source_name: identifies the file instead of file_path, e.g. the
+                client's name of an uploaded copy kept in a temporary file
+                (optional)
+            
+        Returns:
+            ValidationResult for the whole dataframe. Its diff attribute is a
+            dict with the sheet row numbers of 'added' and 'changed' rows, the
+            key values of 'removed' rows, the number of 'unchanged' rows and
+            whether a 'previous_version' was found.
+            Coerced columns are only kept when every row was re-validated.
+        """
+        if any(col not in df.columns for col in self.key_columns):
+            return engine.run(df, instrument=instrument)
+        
+        keys = self._row_keys(df)
+        fingerprints = _row_fingerprints(df)
+        rules_hash = engine.fingerprint()
+        source = f"name:{source_name}" if source_name is not None else os.path.abspath(file_path)
+        state_path = os.path.join(self.state_dir, hashlib.sha256(source.encode('utf-8')).hexdigest() + '.npz')
+        state = self._load_state(state_path, rules_hash)
+        
+        if state is None:
+            to_check = np.ones(len(df), dtype=bool)
+            is_new = to_check
+            removed = []
+        else:
+            old_rows = state['rows']
+            matched = pd.Index(old_rows['key']).get_indexer(keys)
+            is_new = matched == -1
+            # Only rows found in the previous version have a fingerprint to compare;
+            # when it had no rows at all, every row is new
+            changed = np.zeros(len(df), dtype=bool)
+            changed[~is_new] = old_rows['fingerprint'].to_numpy()[matched[~is_new]] != fingerprints[~is_new]
+            to_check = is_new | changed
+            gone = ~np.isin(old_rows['key'].to_numpy(), keys)
+            removed = list(old_rows.loc[gone, self.key_columns].itertuples(index=False, name=None))
+        
+        positions = np.flatnonzero(to_check)
+        if len(positions) == len(df):
+            result = engine.run(df, instrument=instrument)
+        else:
+            partial = engine.run(df.iloc[positions], instrument=instrument, check_unique=False)
+            result = self._merge(engine, partial, positions, state, keys, len(df))
+            # A changed row can duplicate an unchanged one, so keys are always checked in full
+            engine.check_unique(df, result, instrument=instrument)
+        
+        result.diff = {
+            'previous_version': state is not None,
+            'added': np.flatnonzero(is_new) + FIRST_DATA_ROW,
+            'changed': np.flatnonzero(to_check & ~is_new) + FIRST_DATA_ROW,
+            'removed': removed,
+            'unchanged': int(len(df) - len(positions)),
+        }
+        self._save_state(state_path, rules_hash, df, keys, fingerprints, result)
+        return result
+    
+    def _row_keys(self, df):
+        # Repeated keys are told apart by how often they appeared before
+        key_hashes = pd.Series(_row_fingerprints(df[self.key_columns]))
+        occurrence = key_hashes.groupby(key_hashes.to_numpy()).cumcount()
+        return pd.util.hash_pandas_object(
+            pd.DataFrame({'key': key_hashes.to_numpy(), 'occurrence': occurrence.to_numpy()}), index=False
+        ).to_numpy()
+    
+    def _merge(self, engine, partial, positions, state, keys, row_count):
+        """Combine results for re-validated rows with stored errors for the rest."""
+        masks = {}
+        for key, mask in partial.masks.items():
+            full_mask = np.zeros(row_count, dtype=bool)
+            full_mask[positions[mask]] = True
+            masks[key] = full_mask
+        
+        stored = state['errors']
+        if len(stored):
+            error_positions = pd.Index(keys).get_indexer(stored['key'])
+            revalidated = np.zeros(row_count, dtype=bool)
+            revalidated[positions] = True
+            keep = (error_positions != -1) & (stored['rule'] != 'duplicate').to_numpy()
+            keep[keep] &= ~revalidated[error_positions[keep]]
+            for (col_name, rule), group in stored[keep].groupby(['column', 'rule'], sort=False):
+                full_mask = masks.setdefault((col_name, rule), np.zeros(row_count, dtype=bool))
+                full_mask[error_positions[group.index.to_numpy()]] = True
+        
+        # Keep the errors in schema order, as a full run would report them
+        column_order = {col: i for i, (col, _, _) in enumerate(engine.plan)}
+        counts = {}
+        for key in sorted(set(masks) | set(partial.counts),
+                          key=lambda key: (column_order.get(key[0], -1), ErrorIndex.RULES.index(key[1]))):
+            if partial.counts.get(key, 0) is None:
+                counts[key] = None
+            elif masks[key].any():
+                counts[key] = int(masks[key].sum())
+        return ValidationResult(counts, masks, {}, rules=engine.column_validations)
+    
+    def _load_state(self, state_path, rules_hash):
+        try:
+            with np.load(state_path, allow_pickle=False) as data:
+                if str(data['rules']) != rules_hash:
+                    return None
+                rows = pd.DataFrame(json.loads(str(data['key_values'])), columns=self.key_columns)
+                rows['key'] = data['key']
+                rows['fingerprint'] = data['fingerprint']
+                errors = pd.DataFrame({
+                    'key': data['error_key'],
+                    'column': data['error_column'].astype(object),
+                    'rule': data['error_rule'].astype(object),
+                })
+        except Exception:
+            # Missing, damaged or written by an older version
+            return None
+        return {'rules': rules_hash, 'rows': rows, 'errors': errors}
+    
+    def _save_state(self, state_path, rules_hash, df, keys, fingerprints, result):
+        # The key values are only needed to list removed rows, so JSON text is enough
+        key_values = json.dumps(df[self.key_columns].to_numpy().tolist(), default=str)
+        masks = list(result.masks.items())
+        error_counts = [int(mask.sum()) for _, mask in masks]
+        
+        os.makedirs(self.state_dir, exist_ok=True)
+        temp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(
+                f,
+                rules=np.array(rules_hash),
+                key_values=np.array(key_values),
+                key=np.asarray(keys, dtype=np.uint64),
+                fingerprint=np.asarray(fingerprints, dtype=np.uint64),
+                error_key=np.concatenate([keys[mask] for _, mask in masks] + [np.empty(0, dtype=np.uint64)]),
+                error_column=np.array([col_name for (col_name, _), _ in masks], dtype=str).repeat(error_counts),
+                error_rule=np.array([rule for (_, rule), _ in masks], dtype=str).repeat(error_counts),
+            )
+        os.replace(temp_path, state_path)
+        _evict_least_recently_used(self.state_dir, '.npz', self.max_bytes)
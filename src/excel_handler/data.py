@@ -0,0 +1,804 @@
+"""
+Containers for validated data (in memory, read lazily, or spilled to
+disk) and their export to columnar files.
+"""
+import importlib.util
+import itertools
+import numbers
+import os
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
+
+from ._lazy import _require_pyarrow, pd
+from .settings import (
+    CATEGORY_MAX_UNIQUE_RATIO,
+    COLUMN_VALIDATIONS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_EXPORT_ROWS,
+    EXPORT_FORMATS,
+)
+from .readers import iter_excel_chunks
+from .engine import (
+    ValidationEngine,
+    _budget_message,
+    _coerce_date,
+    _coerce_numeric,
+    _is_datetime_dtype,
+    _key_text,
+    format_data_type_errors,
+)
+
+class ExcelData:
+    """Class to hold the extracted Excel data."""
+    def __init__(self, dataframe, file_path, validation=None):
+        self.dataframe = dataframe
+        self.file_path = file_path
+        # ValidationResult from reading the file, with the coerced typed columns
+        self.validation = validation
+        # Instrumentation of the read, if it was instrumented
+        self.metrics = None
+        self.rows = len(dataframe)
+        self.columns = list(dataframe.columns)
+        
+    def __repr__(self):
+        return f"ExcelData(rows={self.rows}, columns={self.columns})"
+    
+    def get_data(self):
+        """Return the dataframe."""
+        return self.dataframe
+    
+    def to_dict(self):
+        """Convert dataframe to dictionary."""
+        return self.dataframe.to_dict('records')
+    
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield the dataframe as slices of at most batch_size rows, without copying."""
+        for start in range(0, len(self.dataframe), batch_size):
+            yield self.dataframe.iloc[start:start + batch_size]
+    
+    def iter_records(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield lists of at most batch_size row dictionaries."""
+        return _iter_record_batches(self.iter_batches(batch_size))
+    
+    def iter_rows(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield a lightweight RowView per row."""
+        return _iter_row_views(self.iter_batches(batch_size))
+    
+    def to_arrow_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield pyarrow RecordBatches of at most batch_size rows."""
+        return _iter_arrow_batches(self.iter_batches(batch_size))
+    
+    def to_numpy_records(self):
+        """Return the data as one NumPy structured array (no per-row objects)."""
+        return self.dataframe.to_records(index=False)
+    
+    def export(self, path, export_format=None, column_validations=None, batch_size=DEFAULT_EXPORT_ROWS):
+        """
+        Write the data to a Parquet, Arrow IPC or CSV file for other tools.
+        
+        Columns are written with the compact dtypes implied by the
+        validation rules (see convert_types), so categoricals become
+        dictionary-encoded columns and dates real timestamps. The frame is
+        written in slices of batch_size rows, each one Parquet row group or
+        Arrow record batch. Each slice is converted as it is written, so no
+        converted copy of the whole table is built. The file only appears
+        under its name once it is complete.
+        
+        Args:
+            path: file to write
+            export_format: 'parquet', 'arrow' or 'csv' (default: from the
+                extension of path)
+            column_validations: rules giving the column types (default: the
+                rules the data was validated with)
+            batch_size: rows per row group or record batch
+            
+        Returns:
+            number of rows written
+        """
+        export_format = _export_format(path, export_format)
+        if column_validations is None:
+            rules = self.validation.rules if self.validation is not None else None
+            column_validations = rules or COLUMN_VALIDATIONS
+        
+        df = self.dataframe
+        coerced = self.validation.coerced if self.validation is not None else {}
+        # Types are decided from whole columns, but only one slice at a time is converted
+        converters = {
+            col_name: _export_converter(
+                df[col_name], column_validations[col_name].get('type', 'string') if col_name in column_validations
+                else None, coerced.get(col_name))
+            for col_name in df.columns
+        }
+        frames = (
+            pd.DataFrame({col_name: convert(start, start + batch_size) for col_name, convert in converters.items()})
+            for start in range(0, len(df), batch_size)
+        )
+        return _write_export(frames, path, export_format, list(df.columns))
+    
+    def summary(self):
+        """Print a summary of the data."""
+        print("\n=== Data Summary ===")
+        print(f"File: {self.file_path}")
+        print(f"Total rows: {self.rows}")
+        print(f"Columns: {', '.join(self.columns)}")
+        print("\nFirst 5 rows:")
+        print(self.dataframe.head())
+    
+    def memory_usage(self):
+        """Return the memory used by the dataframe, in bytes."""
+        return int(self.dataframe.memory_usage(deep=True).sum())
+    
+    def convert_types(self, column_validations=COLUMN_VALIDATIONS):
+        """
+        Convert columns to compact dtypes based on their validation rules.
+        
+        String columns with few distinct values become categoricals, other
+        string columns become Arrow-backed strings when pyarrow is installed.
+        Numeric columns get the smallest integer or float dtype that holds
+        their values exactly, and date columns become datetime64. Values
+        already coerced during validation are reused. A numeric or date
+        column with values that do not convert is left as it is.
+        
+        Args:
+            column_validations: dict of column validation rules
+            
+        Returns:
+            tuple: (bytes before, bytes after)
+        """
+        before = self.memory_usage()
+        self.dataframe = self._typed_frame(column_validations)
+        return before, self.memory_usage()
+    
+    def _typed_frame(self, column_validations):
+        """Return the dataframe with the columns converted as described in convert_types."""
+        coerced = self.validation.coerced if self.validation is not None else {}
+        
+        converted = {}
+        for col_name, rules in column_validations.items():
+            if col_name not in self.dataframe.columns:
+                continue
+            col_data = self.dataframe[col_name]
+            expected_type = rules.get('type', 'string')
+            if expected_type == 'string':
+                converted[col_name] = _compact_strings(col_data)
+                continue
+            if expected_type not in ('numeric', 'date'):
+                continue
+            values = coerced.get(col_name)
+            if values is None:
+                values = _coerce_numeric(col_data) if expected_type == 'numeric' else _coerce_date(col_data)
+            # Data that was not validated may hold values that do not convert;
+            # the column is kept as it is rather than lose them
+            if (values.isna() & col_data.notna()).any():
+                continue
+            converted[col_name] = _smallest_numeric(values) if expected_type == 'numeric' else values
+        
+        # Build a new frame rather than assigning column by column, which
+        # would copy the whole block for every column
+        return self.dataframe.assign(**converted) if converted else self.dataframe
+
+class LazyExcelData:
+    """
+    Lazy counterpart of ExcelData returned by streaming reads.
+    
+    Only the row count and columns are kept in memory; the rows themselves
+    are read again from the file, chunk by chunk, when they are needed.
+    Chunks kept on disk for export (see read_and_validate_excel's
+    keep_for_export) are deleted by close().
+    """
+    def __init__(self, file_path, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE, backend=None,
+                 projection=None, rules=None, export_spill=None):
+        self.file_path = file_path
+        self.columns = list(columns)
+        self.rows = rows
+        self.chunk_size = chunk_size
+        self.backend = backend
+        # Columns the file is projected onto when it is read again, if any
+        self.projection = projection
+        # The validation rules the data passed, if it was validated
+        self.rules = rules
+        # The chunks as they were validated, kept on disk for export, if any
+        self._export_spill = export_spill
+        # Instrumentation of the read, if it was instrumented
+        self.metrics = None
+        
+    def __repr__(self):
+        return f"LazyExcelData(rows={self.rows}, columns={self.columns})"
+    
+    def iter_chunks(self):
+        """Yield the data as DataFrame chunks of at most chunk_size rows."""
+        return iter_excel_chunks(self.file_path, self.chunk_size, self.backend, self.projection)
+    
+    def get_data(self):
+        """Load all rows and return them as one dataframe."""
+        return pd.concat(self.iter_chunks())
+    
+    def to_dict(self):
+        """Convert all rows to a list of dictionaries."""
+        records = []
+        for chunk in self.iter_chunks():
+            records.extend(chunk.to_dict('records'))
+        return records
+    
+    def iter_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield the data as DataFrames of at most batch_size rows."""
+        for chunk in self.iter_chunks():
+            for start in range(0, len(chunk), batch_size):
+                yield chunk.iloc[start:start + batch_size]
+    
+    def iter_records(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield lists of at most batch_size row dictionaries."""
+        return _iter_record_batches(self.iter_batches(batch_size))
+    
+    def iter_rows(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield a lightweight RowView per row."""
+        return _iter_row_views(self.iter_batches(batch_size))
+    
+    def to_arrow_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield pyarrow RecordBatches of at most batch_size rows."""
+        return _iter_arrow_batches(self.iter_batches(batch_size))
+    
+    def export(self, path, export_format=None, column_validations=None):
+        """
+        Write the data to a Parquet, Arrow IPC or CSV file, chunk by chunk.
+        
+        Columns are written with the types ExcelData.export gives them,
+        decided from whole columns. If the chunks were kept on disk as they
+        were validated, they are written without parsing the workbook
+        again; otherwise it is read again first. Only one column is held in
+        memory while the types are decided, and one chunk while writing.
+        Without pyarrow, CSV is still written, but each chunk is converted
+        on its own, numbers as float64 and columns without numeric or date
+        rules as text.
+        
+        Args:
+            path: file to write
+            export_format: 'parquet', 'arrow' or 'csv' (default: from the
+                extension of path)
+            column_validations: rules giving the column types (default: the
+                rules the data was validated with)
+            
+        Returns:
+            number of rows written
+        """
+        export_format = _export_format(path, export_format)
+        if column_validations is None:
+            column_validations = self.rules or COLUMN_VALIDATIONS
+        if export_format == 'csv' and importlib.util.find_spec('pyarrow') is None:
+            frames = (_export_chunk(chunk, column_validations) for chunk in self.iter_chunks())
+            return _write_export(frames, path, export_format, self.columns)
+        
+        pa = _require_pyarrow(f"{export_format} export")
+        kept = self._kept_chunks()
+        if kept is not None:
+            return _export_spilled(pa, kept, path, export_format, self.columns, column_validations)
+        spill = _ExportSpill(column_validations)
+        try:
+            for chunk in self.iter_chunks():
+                spill.write(chunk)
+            return _export_spilled(pa, spill.paths, path, export_format, self.columns, column_validations)
+        finally:
+            spill.discard()
+    
+    def close(self):
+        """Delete the chunks kept on disk for export, if any."""
+        if self._export_spill is not None:
+            self._export_spill.discard()
+            self._export_spill = None
+    
+    def _kept_chunks(self):
+        """Return the Arrow IPC files holding the validated chunks, or None to read the workbook again."""
+        return self._export_spill.paths if self._export_spill is not None else None
+    
+    def summary(self):
+        """Print a summary of the data."""
+        print("\n=== Data Summary ===")
+        print(f"File: {self.file_path}")
+        print(f"Total rows: {self.rows}")
+        print(f"Columns: {', '.join(self.columns)}")
+        print("\nFirst 5 rows:")
+        print(next(iter(self.iter_chunks())).head())
+
+class OutOfCoreExcelData(LazyExcelData):
+    """
+    ExcelData kept on disk, for sheets larger than memory.
+    
+    Streaming reads with a spill_dir write each parsed chunk to an Arrow
+    IPC file as it is validated, with the column types of the rules. The
+    accessors memory-map that file rather than parsing the workbook again:
+    record batches are read in place, so only the pages being used are
+    resident and the operating system can drop them again at any time.
+    get_data() and to_dict() still build everything in memory.
+    
+    The spill file is deleted by close(), or on leaving a with block.
+    Tables and arrays from table() and column() map the file until they
+    are dropped, and on Windows it cannot be deleted while they exist.
+    """
+    def __init__(self, file_path, spill_path, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE, rules=None):
+        super().__init__(file_path, columns, rows, chunk_size, rules=rules)
+        self.spill_path = spill_path
+    
+    def __repr__(self):
+        return f"OutOfCoreExcelData(rows={self.rows}, columns={self.columns}, spill_path={self.spill_path!r})"
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def table(self):
+        """Return the data as a pyarrow Table backed by the memory-mapped spill file."""
+        pa = _require_pyarrow("Out-of-core mode")
+        # The table's buffers keep the mapping alive after the file is closed
+        with pa.memory_map(self.spill_path) as source:
+            return pa.ipc.open_file(source).read_all()
+    
+    def column(self, name):
+        """Return one column as a memory-mapped pyarrow ChunkedArray."""
+        return self.table().column(name)
+    
+    def iter_chunks(self):
+        """Yield the data as DataFrame chunks of at most chunk_size rows, one record batch at a time."""
+        pa = _require_pyarrow("Out-of-core mode")
+        with pa.memory_map(self.spill_path) as source:
+            reader = pa.ipc.open_file(source)
+            offset = 0
+            for i in range(reader.num_record_batches):
+                chunk = reader.get_batch(i).to_pandas()
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
+    
+    def to_arrow_batches(self, batch_size=DEFAULT_BATCH_SIZE):
+        """Yield pyarrow RecordBatches of at most batch_size rows, without converting them."""
+        pa = _require_pyarrow("Out-of-core mode")
+        with pa.memory_map(self.spill_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, batch_size):
+                    yield batch.slice(start, batch_size)
+    
+    def validate(self, column_validations=COLUMN_VALIDATIONS, max_errors=None):
+        """
+        Validate the spilled data again, e.g. against new rules, without parsing the workbook.
+        
+        Numeric and date columns were stored with the types of the rules
+        the data was read with, so they are checked as such.
+        
+        Args:
+            column_validations: dict of column validation rules
+            max_errors: error budget (see ValidationEngine.run; optional)
+            
+        Returns:
+            tuple: (is_valid, errors_list), as validate_data_types
+        """
+        engine = ValidationEngine(column_validations)
+        duplicates = engine.duplicate_indexes()
+        counts = {}
+        stopped = None
+        rows = 0
+        for chunk in self.iter_chunks():
+            result = engine.run(chunk, counts, duplicates=duplicates, row_offset=rows, max_errors=max_errors)
+            rows += len(chunk)
+            if result.stopped is not None:
+                stopped = result.stopped
+                break
+        errors = format_data_type_errors(counts, column_validations)
+        if stopped is not None:
+            errors.append(_budget_message(stopped))
+        return len(errors) == 0, errors
+    
+    def _kept_chunks(self):
+        return [self.spill_path]
+    
+    def close(self):
+        """
+        Delete the spill file.
+        
+        Raises:
+            PermissionError: on Windows, if a table or column of the file
+                is still in use, so the file is still mapped
+        """
+        try:
+            os.remove(self.spill_path)
+        except FileNotFoundError:
+            pass
+        except PermissionError as e:
+            raise PermissionError(
+                f"Cannot delete {self.spill_path} while it is memory-mapped; "
+                f"drop the tables and columns taken from it before calling close()") from e
+
+class RowView:
+    """Read-only view of one row, indexed by column name or position."""
+    __slots__ = ('_positions', '_values')
+    
+    def __init__(self, positions, values):
+        self._positions = positions
+        self._values = values
+    
+    def __repr__(self):
+        return f"RowView({self.as_dict()})"
+    
+    def __getitem__(self, key):
+        # numbers.Integral also covers NumPy integers, e.g. from np.flatnonzero
+        if isinstance(key, numbers.Integral):
+            return self._values[key]
+        return self._values[self._positions[key]]
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def get(self, key, default=None):
+        """Return the value in column key, or default if there is no such column."""
+        position = self._positions.get(key)
+        return default if position is None else self._values[position]
+    
+    def as_dict(self):
+        """Copy the row into a dictionary."""
+        return dict(zip(self._positions, self._values))
+
+def _iter_record_batches(batches):
+    for batch in batches:
+        yield batch.to_dict('records')
+
+def _iter_row_views(batches):
+    positions = None
+    for batch in batches:
+        if positions is None:
+            # Shared by every RowView, so each row only holds its values
+            positions = {col: i for i, col in enumerate(batch.columns)}
+        # tolist() converts a column at a time to the Python values to_dict()
+        # and iter_records() give, e.g. Timestamp and int rather than NumPy scalars
+        columns = [batch[col].tolist() for col in batch.columns]
+        for values in zip(*columns):
+            yield RowView(positions, values)
+
+def _iter_arrow_batches(batches):
+    pa = _require_pyarrow("Arrow export")
+    for batch in batches:
+        yield _record_batch(pa, batch)
+
+def _record_batch(pa, frame, schema=None):
+    """
+    Convert a DataFrame to one Arrow RecordBatch.
+    
+    Columns of frames combined with pd.concat, e.g. the sheets of a
+    workbook, can hold several Arrow chunks, which
+    RecordBatch.from_pandas refuses, so they are joined into one array.
+    """
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    return pa.RecordBatch.from_arrays([column.combine_chunks() for column in table.columns], schema=table.schema)
+
+def _export_format(path, export_format=None):
+    """Return the export format named, or the one implied by the extension of path."""
+    if export_format is None:
+        suffix = Path(path).suffix.lower()
+        export_format = {'.feather': 'arrow', '.ipc': 'arrow'}.get(suffix)
+        export_format = export_format or next(
+            (name for name, extension in EXPORT_FORMATS.items() if extension == suffix), None)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format for {path}; use one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+def _export_converter(col_data, expected_type=None, coerced=None):
+    """
+    Decide how ExcelData.export writes a column, and return a converter for its slices.
+    
+    Args:
+        col_data: the column
+        expected_type: its 'type' in the validation rules, or None if it has no rules
+        coerced: its values as coerced during validation, if any
+        
+    Returns:
+        function (start, stop) -> rows start:stop of the column, converted
+    """
+    values, conversion, dtype = _export_type(col_data, expected_type, coerced)
+    return lambda start, stop: _export_values(values.iloc[start:stop], conversion, dtype)
+
+def _export_type(col_data, expected_type=None, coerced=None):
+    """
+    Decide the type a column is exported with, from the whole column.
+    
+    Columns get the dtypes convert_types would give them, and object
+    columns Arrow cannot store with one type become numbers, timestamps or
+    text. As the type is decided from the whole column, every slice or
+    chunk converted with _export_values gets the same Arrow type.
+    
+    Args:
+        col_data: the column
+        expected_type: its 'type' in the validation rules, or None if it has no rules
+        coerced: its values as coerced during validation, if any
+        
+    Returns:
+        tuple: (values, conversion, dtype) for _export_values, where values
+        are the column's values that are cheapest to convert in slices,
+        e.g. the coerced ones
+    """
+    if expected_type == 'numeric':
+        values = coerced if coerced is not None else col_data
+        return values, 'numeric', _smallest_numeric(values).dtype
+    if expected_type == 'date':
+        if coerced is None and _is_datetime_dtype(col_data.dtype):
+            coerced = col_data
+        return (coerced if coerced is not None else col_data), 'date', 'datetime64[us]'
+    
+    values = col_data
+    dtype = col_data.dtype
+    if expected_type == 'string' and not isinstance(dtype, pd.CategoricalDtype):
+        if _few_distinct(col_data):
+            # The codes take a byte or two per row, and slicing them is free
+            values = col_data.astype('category')
+            dtype = values.dtype
+        else:
+            try:
+                return values, 'astype', pd.StringDtype('pyarrow')
+            except ImportError:
+                pass
+    
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if categories.dtype != object or pd.api.types.infer_dtype(categories) == 'string':
+            return values, 'astype', dtype
+        kind = pd.api.types.infer_dtype(categories)
+    elif dtype != object:
+        return values, 'astype', dtype
+    else:
+        kind = pd.api.types.infer_dtype(col_data, skipna=True)
+    
+    if kind in ('string', 'empty', 'boolean'):
+        return values, 'astype', object
+    if kind in ('integer', 'floating', 'mixed-integer-float'):
+        # e.g. int64, or float64 if some rows are blank
+        return values, 'numeric', pd.to_numeric(col_data.astype(object)).dtype
+    if kind in ('datetime', 'date'):
+        return values, 'date', 'datetime64[us]'
+    # Mixed values, e.g. part numbers that are sometimes plain numbers
+    return values, 'text', object
+
+def _export_values(values, conversion, dtype):
+    """Convert some rows of a column to the type _export_type decided for it."""
+    if isinstance(values.dtype, pd.CategoricalDtype) and conversion != 'astype':
+        values = values.astype(object)
+    if conversion == 'numeric':
+        return pd.to_numeric(values, errors='coerce').astype(dtype)
+    if conversion == 'date':
+        if not _is_datetime_dtype(values.dtype):
+            values = _coerce_date(values)
+        return values.astype(dtype)
+    if conversion == 'text':
+        return _key_text(values)
+    return values.astype(dtype)
+
+def _export_chunk(chunk, column_validations, coerced=None):
+    """
+    Convert a streamed chunk to the fixed column types of _chunk_schema.
+    
+    Values coerced while validating the chunk are reused if given.
+    """
+    coerced = coerced or {}
+    converted = {}
+    for col_name in chunk.columns:
+        col_data = chunk[col_name]
+        expected_type = column_validations.get(col_name, {}).get('type', 'string')
+        if expected_type == 'numeric':
+            values = coerced.get(col_name)
+            values = values if values is not None else pd.to_numeric(col_data, errors='coerce')
+            converted[col_name] = values.astype('float64')
+        elif expected_type == 'date':
+            values = coerced.get(col_name)
+            values = values if values is not None else _coerce_date(col_data)
+            converted[col_name] = values.astype('datetime64[us]')
+        else:
+            converted[col_name] = _key_text(col_data)
+    return chunk.assign(**converted)
+
+class _SpillWriter:
+    """Arrow IPC file that streamed chunks are written to in out-of-core mode."""
+    def __init__(self, spill_dir, file_path, columns, column_validations):
+        self.pa = _require_pyarrow("Out-of-core mode")
+        self.column_validations = column_validations
+        self.schema = _chunk_schema(self.pa, columns, column_validations)
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=f"{Path(file_path).stem}.", suffix='.arrow', dir=spill_dir)
+        os.close(fd)
+        self.writer = self.pa.ipc.new_file(self.path, self.schema)
+    
+    def write(self, chunk, coerced=None):
+        frame = _export_chunk(chunk, self.column_validations, coerced)
+        self.writer.write_batch(_record_batch(self.pa, frame, self.schema))
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    def discard(self):
+        """Close and delete the file."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class _ExportSpill:
+    """
+    Chunks of a streamed sheet kept on disk until they are exported.
+    
+    Each chunk is written to its own Arrow IPC file with the types it was
+    read with, as a column can hold numbers in one chunk and text in the
+    next. Only values Arrow cannot store in one column, such as a mix of
+    numbers and text, are kept as the text the export makes of them.
+    """
+    def __init__(self, column_validations, spill_dir=None):
+        self.pa = _require_pyarrow("Export of streamed data")
+        self.column_validations = column_validations
+        self.directory = tempfile.mkdtemp(prefix='export.', dir=spill_dir)
+        self.paths = []
+        # Delete the files even if discard() is never called
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.directory, True)
+    
+    def write(self, chunk, coerced=None):
+        batch = _record_batch(self.pa, _spill_chunk(chunk, self.column_validations, coerced))
+        path = os.path.join(self.directory, f"{len(self.paths)}.arrow")
+        with self.pa.ipc.new_file(path, batch.schema) as writer:
+            writer.write_batch(batch)
+        self.paths.append(path)
+    
+    def discard(self):
+        """Delete the files."""
+        self._cleanup()
+
+def _spill_chunk(chunk, column_validations, coerced=None):
+    """Convert a streamed chunk to types Arrow can store, keeping what _export_type looks at."""
+    coerced = coerced or {}
+    converted = {}
+    for col_name in chunk.columns:
+        col_data = chunk[col_name]
+        expected_type = column_validations.get(col_name, {}).get('type')
+        if expected_type in ('numeric', 'date'):
+            values = coerced.get(col_name)
+            if values is None:
+                values = pd.to_numeric(col_data, errors='coerce') if expected_type == 'numeric' else _coerce_date(col_data)
+            converted[col_name] = values.astype('float64' if expected_type == 'numeric' else 'datetime64[us]')
+        elif col_data.dtype == object:
+            kind = pd.api.types.infer_dtype(col_data, skipna=True)
+            if kind in ('integer', 'floating', 'mixed-integer-float'):
+                converted[col_name] = pd.to_numeric(col_data)
+            elif kind in ('datetime', 'date'):
+                converted[col_name] = _coerce_date(col_data)
+            elif kind not in ('string', 'empty', 'boolean'):
+                converted[col_name] = _key_text(col_data)
+    return chunk.assign(**converted)
+
+def _export_spilled(pa, spill_paths, path, export_format, columns, column_validations):
+    """
+    Export chunks kept in Arrow IPC files with the types ExcelData.export gives whole columns.
+    
+    Returns:
+        number of rows written
+    """
+    def whole_column(col_name):
+        parts = []
+        for spill_path in spill_paths:
+            with pa.memory_map(spill_path) as source:
+                parts.append(pa.ipc.open_file(source).read_all().column(col_name).to_pandas())
+        return pd.concat(parts, ignore_index=True) if parts else pd.Series(dtype=object)
+    
+    def chunks():
+        for spill_path in spill_paths:
+            with pa.memory_map(spill_path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i).to_pandas()
+    
+    # Each column is loaded on its own to decide its type, then dropped
+    types = {}
+    for col_name in columns:
+        expected_type = column_validations[col_name].get('type', 'string') if col_name in column_validations else None
+        _, conversion, dtype = _export_type(whole_column(col_name), expected_type)
+        types[col_name] = conversion, dtype
+    frames = (
+        pd.DataFrame({col_name: _export_values(chunk[col_name], *types[col_name]) for col_name in columns})
+        for chunk in chunks()
+    )
+    return _write_export(frames, path, export_format, columns)
+
+def _chunk_schema(pa, columns, column_validations):
+    types = {'numeric': pa.float64(), 'date': pa.timestamp('us')}
+    return pa.schema([
+        (col_name, types.get(column_validations.get(col_name, {}).get('type'), pa.string()))
+        for col_name in columns
+    ])
+
+def _write_export(frames, path, export_format, columns, schema=None):
+    """
+    Write DataFrames one after another to a single export file.
+    
+    Each frame becomes one Parquet row group or Arrow record batch. CSV is
+    written with pyarrow when it is installed and with pandas otherwise.
+    Without a schema, it is taken from the first frame.
+    
+    Returns:
+        number of rows written
+    """
+    use_arrow = export_format != 'csv' or importlib.util.find_spec('pyarrow') is not None
+    pa = _require_pyarrow(f"{export_format} export") if use_arrow else None
+    rows = 0
+    writer = None
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        if not use_arrow:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                pd.DataFrame(columns=columns).to_csv(f, index=False)
+                for frame in frames:
+                    frame.to_csv(f, header=False, index=False)
+                    rows += len(frame)
+        else:
+            for frame in itertools.chain(frames, [None]):
+                if frame is None:
+                    if writer is not None:
+                        break
+                    # Nothing to write; still leave a file with the columns
+                    frame = pd.DataFrame({col: pd.Series(dtype=object) for col in columns})
+                if schema is None:
+                    schema = _arrow_schema(pa, frame)
+                if writer is None:
+                    writer = _arrow_writer(pa, temp_path, export_format, schema)
+                writer.write_batch(_record_batch(pa, frame, schema))
+                rows += len(frame)
+            writer.close()
+            writer = None
+        # Write under a temporary name so readers never see a partial file
+        os.replace(temp_path, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return rows
+
+def _arrow_schema(pa, frame):
+    """Return the Arrow schema of a frame, storing columns with no values yet as strings."""
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+def _arrow_writer(pa, path, export_format, schema):
+    if export_format == 'parquet':
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(path, schema)
+    if export_format == 'arrow':
+        return pa.ipc.new_file(path, schema)
+    import pyarrow.csv
+    return pyarrow.csv.CSVWriter(path, schema)
+
+def _smallest_numeric(values):
+    """Downcast numeric values to the smallest dtype that holds them exactly."""
+    values = pd.to_numeric(values, errors='coerce')
+    if values.notna().all() and (values == values.round()).all() and (values.abs() < 2**63).all():
+        return pd.to_numeric(values, downcast='integer')
+    as_float32 = values.astype('float32')
+    if ((as_float32.astype('float64') == values) | values.isna()).all():
+        return as_float32
+    return values.astype('float64')
+
+def _few_distinct(col_data):
+    """Return whether a string column has few enough distinct values to be a categorical."""
+    return col_data.nunique(dropna=True) <= max(1, len(col_data) * CATEGORY_MAX_UNIQUE_RATIO)
+
+def _compact_strings(col_data):
+    """Store a string column as a categorical or an Arrow-backed string."""
+    if isinstance(col_data.dtype, pd.CategoricalDtype):
+        return col_data
+    if _few_distinct(col_data):
+        return col_data.astype('category')
+    try:
+        return col_data.astype('string[pyarrow]')
+    except ImportError:
+        return col_data
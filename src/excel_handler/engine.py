@@ -0,0 +1,1030 @@
+"""
+The vectorized validation engine, its rules, and the indexes of errors,
+duplicate keys and reference values it builds.
+"""
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import runpy
+import threading
+from pathlib import Path
+
+from ._lazy import _require_pyarrow, np, pd
+from .settings import (
+    COLUMN_VALIDATIONS,
+    DATE_SAMPLE_ROWS,
+    DEFAULT_MAX_ERROR_VALUES,
+    DEFAULT_REFERENCE_DIR,
+    EXPECTED_COLUMNS,
+    FIRST_DATA_ROW,
+)
+from .instrumentation import NO_INSTRUMENTATION
+from .readers import read_sheet
+
+def validate_columns(df, expected_columns):
+    """
+    Validate that the dataframe has the expected columns.
+    
+    Args:
+        df: pandas DataFrame
+        expected_columns: list of expected column names
+        
+    Returns:
+        tuple: (is_valid, missing_columns, extra_columns)
+    """
+    if not expected_columns:
+        # If no expected columns defined, accept any columns
+        return True, [], []
+    
+    actual_columns = set(df.columns)
+    expected_set = set(expected_columns)
+    
+    missing_columns = expected_set - actual_columns
+    extra_columns = actual_columns - expected_set
+    
+    is_valid = len(missing_columns) == 0
+    
+    return is_valid, list(missing_columns), list(extra_columns)
+
+class ValidationResult:
+    """Outcome of running a ValidationEngine over a dataframe."""
+    def __init__(self, counts, masks, coerced, diff=None, rules=None, duplicates=None, stopped=None):
+        # (column, check) -> error count, None if the column could not be checked
+        self.counts = counts
+        # (column, check) -> boolean array marking the failing rows
+        self.masks = masks
+        # column -> values converted to the column's type (numeric and date columns)
+        self.coerced = coerced
+        # Rows added/changed/removed since the previous version (incremental mode)
+        self.diff = diff
+        # Column validation rules, used to describe the errors
+        self.rules = rules
+        # Column -> DuplicateIndex of its 'unique' rule
+        self.duplicates = duplicates
+        # The error budget, if it ran out and later checks were skipped
+        self.stopped = stopped
+    
+    def __repr__(self):
+        return f"ValidationResult(errors={self.error_count()})"
+    
+    @property
+    def is_valid(self):
+        return not self.counts
+    
+    def error_count(self):
+        """Return the total number of failing cells."""
+        return sum(count or 0 for count in self.counts.values())
+    
+    def errors(self):
+        """Return the error messages for this result."""
+        errors = format_data_type_errors(self.counts, self.rules)
+        if self.stopped is not None:
+            errors.append(_budget_message(self.stopped))
+        return errors
+
+class ValidationEngine:
+    """
+    Column validation rules compiled into vectorized checks.
+    
+    The rules are compiled once into a per-column plan, with the type check
+    and coercion function resolved up front. Running the engine reads each
+    column a single time: its null mask is computed once and shared by the
+    required-field and type checks, and numeric and date columns are coerced
+    once (columns that already have the right dtype are not coerced at all).
+    The coerced columns are kept on the result for later use.
+    
+    Besides 'type' and 'required', a column's rules may set:
+        min, max: lowest and highest allowed value of a numeric or date column
+        pattern: regular expression every value must match in full
+        allowed: list of the allowed values
+        not_before: name of another column of the same type whose value in
+            the same row this column must not be less than
+        unique: True if no two rows may have the same value, or a list of
+            more columns that together with this one form a unique key
+        reference: a reference dataset (CSV, Parquet or workbook) whose
+            values are the only ones allowed: its path, or a dict with
+            'path', 'column' (default: this column's name) and 'sheet'
+    Each of these is compiled into a function that returns a mask of the
+    failing rows, so a rule costs a few array operations per column rather
+    than a Python call per row. Unique keys are hashed in one pass and
+    looked up in a DuplicateIndex, reference values in a ReferenceIndex.
+    Bad rules raise ValueError here, before any data is read.
+    """
+    def __init__(self, column_validations):
+        self.column_validations = column_validations
+        self.plan = []
+        self.rules = []
+        # (column, key columns) of each 'unique' rule
+        self.unique_keys = []
+        # ReferenceIndex of each 'reference' rule
+        self.references = []
+        for col_name, rules in column_validations.items():
+            unknown = set(rules) - _RULE_KEYS
+            if unknown:
+                raise ValueError(f"Unknown rules for column '{col_name}': {', '.join(sorted(unknown))}")
+            expected_type = rules.get('type', 'string')
+            check = expected_type if expected_type in _COERCERS else None
+            self.plan.append((col_name, rules.get('required', True), check))
+            self.rules.extend(_compile_rules(col_name, rules, column_validations))
+            if 'reference' in rules:
+                index = _reference_index(col_name, rules['reference'])
+                self.references.append(index)
+                self.rules.append((col_name, 'reference', _reference_test(index)))
+            unique = rules.get('unique')
+            if unique:
+                others = [] if unique is True else [unique] if isinstance(unique, str) else list(unique)
+                self.unique_keys.append((col_name, [col_name] + others))
+    
+    def __repr__(self):
+        return f"ValidationEngine(columns={[col for col, _, _ in self.plan]}, rules={len(self.rules)})"
+    
+    def run(self, df, counts=None, instrument=NO_INSTRUMENTATION, duplicates=None, row_offset=0,
+            check_unique=True, max_errors=None):
+        """
+        Validate a dataframe.
+        
+        Args:
+            df: pandas DataFrame
+            counts: dict of running error counts to add to (optional)
+            instrument: Instrumentation recording a stage per column (optional)
+            duplicates: indexes from duplicate_indexes() holding the keys of
+                earlier chunks, so duplicates across chunks are found too
+                (default: new indexes, checking df on its own)
+            row_offset: data row position of the first row of df
+            check_unique: if False, skip the 'unique' rules
+            max_errors: error budget; once counts (including earlier chunks)
+                reach this many errors, the remaining checks are skipped and
+                the result's stopped is set. Each check covers a whole
+                column, so 1 stops after the first failing column
+                (default: run every check)
+            
+        Returns:
+            ValidationResult
+        """
+        if counts is None:
+            counts = {}
+        masks = {}
+        coerced = {}
+        null_masks = {}
+        
+        present = set(df.columns)
+        over_budget = max_errors is not None and _error_total(counts) >= max_errors
+        for col_name, is_required, check in self.plan:
+            if over_budget:
+                break
+            if col_name not in present:
+                continue
+            with instrument.stage(f"type_check:{col_name}"):
+                null_masks[col_name] = self._check_column(
+                    df[col_name], col_name, is_required, check, counts, masks, coerced)
+            over_budget = max_errors is not None and _error_total(counts) >= max_errors
+        
+        for col_name, rule, test in self.rules:
+            if over_budget:
+                break
+            if col_name not in present:
+                continue
+            with instrument.stage(f"{rule}_check:{col_name}"):
+                failed = test(df[col_name], null_masks[col_name], coerced)
+            if failed is not None:
+                self._record(counts, masks, (col_name, rule), failed)
+                over_budget = max_errors is not None and _error_total(counts) >= max_errors
+        
+        result = ValidationResult(counts, masks, coerced, rules=self.column_validations,
+                                  stopped=max_errors if over_budget else None)
+        if check_unique and not over_budget:
+            self.check_unique(df, result, duplicates, row_offset, instrument)
+        return result
+    
+    def fingerprint(self):
+        """
+        Return a hash of the rules and of the reference files they use.
+        
+        It changes when a rule or a reference file changes, so results
+        stored for earlier data can be reused only while it stays the same.
+        """
+        state = {
+            'rules': self.column_validations,
+            'references': [(index.source, index.column, index.sheet, index.stamp()) for index in self.references],
+        }
+        return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
+    def duplicate_indexes(self):
+        """Return a new, empty DuplicateIndex for each 'unique' rule, by column."""
+        return {col_name: DuplicateIndex(key_columns) for col_name, key_columns in self.unique_keys}
+    
+    def check_unique(self, df, result, duplicates=None, row_offset=0, instrument=NO_INSTRUMENTATION):
+        """
+        Run the 'unique' rules on df and add their failures to result.
+        
+        Rows repeating a key seen in an earlier row fail with rule
+        'duplicate'; the first row with a key does not.
+        """
+        if duplicates is None:
+            duplicates = self.duplicate_indexes()
+        present = set(df.columns)
+        for col_name, key_columns in self.unique_keys:
+            if not all(col in present for col in key_columns):
+                continue
+            with instrument.stage(f"unique_check:{col_name}"):
+                failed = duplicates[col_name].add(df, row_offset=row_offset)
+            self._record(result.counts, result.masks, (col_name, 'duplicate'), failed)
+        result.duplicates = duplicates
+    
+    def _check_column(self, col_data, col_name, is_required, check, counts, masks, coerced):
+        """Run the required-field and type checks of one column and return its null mask."""
+        null_mask = col_data.isna().to_numpy()
+        if is_required:
+            self._record(counts, masks, (col_name, 'required'), null_mask)
+        
+        if check is None:
+            return null_mask
+        is_typed, coerce = _COERCERS[check]
+        if is_typed(col_data.dtype):
+            coerced[col_name] = col_data
+            return null_mask
+        try:
+            values = coerce(col_data)
+        except Exception:
+            counts[(col_name, check)] = None
+            return null_mask
+        coerced[col_name] = values
+        # Values that were present but did not survive coercion
+        failed = values.isna().to_numpy() & ~null_mask
+        self._record(counts, masks, (col_name, check), failed)
+        return null_mask
+    
+    @staticmethod
+    def _record(counts, masks, key, mask):
+        """Store a failure mask and add its count to the running totals."""
+        count = int(mask.sum())
+        if count > 0:
+            masks[key] = mask
+            _add_error_count(counts, key, count)
+
+# Keys a column's validation rules may have
+_RULE_KEYS = {'type', 'required', 'min', 'max', 'pattern', 'allowed', 'not_before', 'unique', 'reference'}
+
+def _compile_rules(col_name, rules, column_validations):
+    """
+    Compile a column's value rules into (column, rule, test) checks.
+    
+    Each test is called as test(col_data, null_mask, coerced) and returns
+    a boolean array of the failing rows, or None if it could not run
+    (e.g. because the column it compares with is missing). Empty cells
+    never fail these rules; 'required' covers them.
+    """
+    expected_type = rules.get('type', 'string')
+    compiled = []
+    
+    if 'min' in rules or 'max' in rules:
+        if expected_type not in _COERCERS:
+            raise ValueError(f"Column '{col_name}': 'min' and 'max' need a numeric or date column")
+        convert = pd.Timestamp if expected_type == 'date' else float
+        low = convert(rules['min']) if rules.get('min') is not None else None
+        high = convert(rules['max']) if rules.get('max') is not None else None
+        compiled.append((col_name, 'range', _range_test(col_name, low, high)))
+    
+    if 'pattern' in rules:
+        try:
+            regex = re.compile(rules['pattern'])
+        except re.error as e:
+            raise ValueError(f"Column '{col_name}': invalid pattern {rules['pattern']!r}: {e}") from e
+        compiled.append((col_name, 'pattern', _pattern_test(regex)))
+    
+    if 'allowed' in rules:
+        compiled.append((col_name, 'allowed', _allowed_test(col_name, list(rules['allowed']))))
+    
+    if 'not_before' in rules:
+        other = rules['not_before']
+        if other not in column_validations:
+            raise ValueError(f"Column '{col_name}': 'not_before' names an unknown column '{other}'")
+        if expected_type not in _COERCERS or column_validations[other].get('type', 'string') != expected_type:
+            raise ValueError(f"Column '{col_name}': 'not_before' needs two numeric or two date columns")
+        compiled.append((col_name, 'order', _order_test(col_name, other)))
+    
+    return compiled
+
+def _range_test(col_name, low, high):
+    def test(col_data, null_mask, coerced):
+        if col_name not in coerced:
+            return None
+        values = coerced[col_name]
+        failed = np.zeros(len(values), dtype=bool)
+        # Comparisons with NaN/NaT are False, so values that failed the type check do not fail again
+        if low is not None:
+            failed |= (values < low).to_numpy(dtype=bool, na_value=False)
+        if high is not None:
+            failed |= (values > high).to_numpy(dtype=bool, na_value=False)
+        return failed
+    return test
+
+def _pattern_test(regex):
+    def test(col_data, null_mask, coerced):
+        # Each distinct value is matched once, then the result is spread to its rows
+        codes, uniques = pd.factorize(col_data, use_na_sentinel=True)
+        # Always Python's re, as compiled from the rule: Arrow's RE2 engine, used by
+        # .str on str columns, disagrees on e.g. whether \d matches non-ASCII digits
+        matched = np.fromiter(
+            (regex.fullmatch(_text_value(value)) is not None for value in np.asarray(uniques, dtype=object)),
+            dtype=bool, count=len(uniques),
+        )
+        failed = np.zeros(len(codes), dtype=bool)
+        present = codes >= 0
+        failed[present] = ~matched[codes[present]]
+        return failed
+    return test
+
+def _allowed_test(col_name, allowed):
+    def test(col_data, null_mask, coerced):
+        values = coerced.get(col_name, col_data)
+        return ~values.isin(allowed).to_numpy() & ~null_mask
+    return test
+
+def _order_test(col_name, other):
+    def test(col_data, null_mask, coerced):
+        if col_name not in coerced or other not in coerced:
+            return None
+        # Both columns come from the same frame, so their indexes line up
+        return (coerced[col_name] < coerced[other]).to_numpy(dtype=bool, na_value=False)
+    return test
+
+def _reference_index(col_name, spec):
+    """Return the ReferenceIndex named by a 'reference' rule."""
+    if isinstance(spec, (str, os.PathLike)):
+        spec = {'path': spec}
+    if not isinstance(spec, dict) or 'path' not in spec:
+        raise ValueError(f"Column '{col_name}': 'reference' needs a path or a dict with a 'path'")
+    unknown = set(spec) - {'path', 'column', 'sheet'}
+    if unknown:
+        raise ValueError(f"Column '{col_name}': unknown 'reference' settings: {', '.join(sorted(unknown))}")
+    return load_reference(spec['path'], spec.get('column', col_name), spec.get('sheet'))
+
+def _reference_test(index):
+    def test(col_data, null_mask, coerced):
+        return ~index.contains(col_data) & ~null_mask
+    return test
+
+def _text_value(value):
+    """Return a cell value as text, writing whole numbers stored as floats without '.0'."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _key_text(col_data):
+    """Return key column values as text, so 'A1', 123 and 123.0 hash the same in every file."""
+    if col_data.dtype != object and pd.api.types.is_string_dtype(col_data.dtype):
+        return col_data
+    return col_data.map(_text_value, na_action='ignore').astype(object)
+
+class ErrorIndex:
+    """
+    Compact index of the individual cells that failed validation.
+    
+    Each error is stored as a (row, column, rule) triple of integer codes in
+    NumPy arrays, so the index costs a few bytes per error no matter how
+    large the sheet is. Rows are zero-based data row positions; sheet_rows()
+    converts them to the row numbers shown in Excel. The raw cell values are
+    only kept for the first max_values errors.
+    """
+    RULES = ('required', 'numeric', 'date', 'range', 'pattern', 'allowed', 'order', 'duplicate', 'reference')
+    
+    def __init__(self, columns, max_values=DEFAULT_MAX_ERROR_VALUES, sheet=None):
+        self.columns = list(columns)
+        self.max_values = max_values
+        # Name of the sheet the errors are in, for multi-sheet workbooks
+        self.sheet = sheet
+        self.values = []
+        # Incremental diff of the validated rows, when there is one
+        self.diff = None
+        # Column -> DuplicateIndex of the 'unique' rules, when there are any
+        self.duplicates = None
+        # The error budget, if validation stopped early because it ran out
+        self.stopped = None
+        self._column_codes = {col: code for code, col in enumerate(self.columns)}
+        self._parts = []
+        self._arrays = None
+    
+    def __repr__(self):
+        return f"ErrorIndex(errors={len(self)})"
+    
+    def __len__(self):
+        return sum(len(rows) for rows, _, _ in self._parts)
+    
+    def add(self, result, df, row_offset=0):
+        """
+        Add the failures of a ValidationResult to the index.
+        
+        Args:
+            result: ValidationResult for df
+            df: the validated DataFrame, used to look up the raw values
+            row_offset: data row position of the first row of df
+        """
+        if result.diff is not None:
+            self.diff = result.diff
+        if result.duplicates:
+            self.duplicates = result.duplicates
+        if result.stopped is not None:
+            self.stopped = result.stopped
+        for (col_name, rule), mask in result.masks.items():
+            positions = np.flatnonzero(mask)
+            self._parts.append((
+                positions + row_offset,
+                np.full(len(positions), self._column_codes[col_name], dtype=np.int16),
+                np.full(len(positions), self.RULES.index(rule), dtype=np.int8),
+            ))
+            room = self.max_values - len(self.values)
+            if room > 0:
+                kept = positions[:room]
+                raw = [None] * len(kept) if rule == 'required' else df[col_name].iloc[kept].tolist()
+                self.values.extend(raw)
+        self._arrays = None
+    
+    def arrays(self):
+        """Return the (rows, column codes, rule codes) arrays."""
+        if self._arrays is None:
+            if self._parts:
+                self._arrays = tuple(np.concatenate(part) for part in zip(*self._parts))
+            else:
+                self._arrays = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int8))
+        return self._arrays
+    
+    def counts(self):
+        """Return a dict of (column, rule) -> number of failing cells."""
+        rows, columns, rules = self.arrays()
+        pairs, counts = np.unique(np.stack([columns, rules.astype(np.int16)]), axis=1, return_counts=True)
+        return {
+            (self.columns[column], self.RULES[rule]): int(count)
+            for (column, rule), count in zip(pairs.T, counts)
+        }
+    
+    def sheet_rows(self, column=None, rule=None):
+        """
+        Return the sheet row numbers of the failing cells.
+        
+        Args:
+            column: only rows failing in this column (optional)
+            rule: only rows failing this rule (optional)
+            
+        Returns:
+            sorted NumPy array of unique sheet row numbers
+        """
+        rows, columns, rules = self.arrays()
+        keep = np.ones(len(rows), dtype=bool)
+        if column is not None:
+            keep &= columns == self._column_codes[column]
+        if rule is not None:
+            keep &= rules == self.RULES.index(rule)
+        return np.unique(rows[keep]) + FIRST_DATA_ROW
+    
+    def first(self, n=None):
+        """
+        Return the errors that kept their raw values, ordered by row.
+        
+        Args:
+            n: number of errors to return, at most max_values (optional)
+            
+        Returns:
+            list of dicts with 'row' (sheet row number), 'column', 'rule'
+            and 'value', and 'sheet' if the index belongs to a named sheet
+        """
+        rows, columns, rules = self.arrays()
+        kept = len(self.values)
+        order = np.lexsort((columns[:kept], rows[:kept]))
+        if n is not None:
+            order = order[:n]
+        sheet = {'sheet': self.sheet} if self.sheet is not None else {}
+        return [
+            {
+                **sheet,
+                'row': int(rows[i]) + FIRST_DATA_ROW,
+                'column': self.columns[columns[i]],
+                'rule': self.RULES[rules[i]],
+                'value': self.values[i],
+            }
+            for i in order
+        ]
+    
+    def duplicate_groups(self):
+        """
+        Return every group of rows sharing a unique key.
+        
+        Returns:
+            list of dicts with the 'key' values and the sheet 'rows' that
+            have them, and 'sheet' if the index belongs to a named sheet
+        """
+        sheet = {'sheet': self.sheet} if self.sheet is not None else {}
+        return [
+            {**sheet, **group}
+            for index in (self.duplicates or {}).values()
+            for group in index.groups()
+        ]
+
+class DuplicateIndex:
+    """
+    Hash index of the keys seen so far, for finding duplicate keys.
+    
+    Keys are hashed to 64 bits in one vectorized pass per DataFrame and
+    looked up in a sorted array of the hashes already seen, so rows can be
+    added a chunk or a file at a time. For each distinct key only its hash,
+    the location of its first row and its values are kept, so memory grows
+    with the number of unique keys, not with the number of rows. Keys that
+    occur more than once are collected into groups with all their rows.
+    Rows with an empty key column are never duplicates.
+    """
+    def __init__(self, key_columns):
+        self.key_columns = list(key_columns)
+        # Names of the files (or sheets) rows were added from, when given
+        self.sources = []
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._source_codes = np.empty(0, dtype=np.int32)
+        self._keys = [np.empty(0, dtype=object) for _ in self.key_columns]
+        # Whether each key in _hashes is one of the groups below
+        self._grouped = np.empty(0, dtype=bool)
+        # Keys that occur more than once, with their values, in the order found
+        self._group_hashes = np.empty(0, dtype=np.uint64)
+        self._group_keys = [np.empty(0, dtype=object) for _ in self.key_columns]
+        # (hashes, source codes, data row positions) of the rows of those keys
+        self._members = []
+    
+    def __repr__(self):
+        return f"DuplicateIndex(key_columns={self.key_columns}, keys={len(self)}, duplicates={len(self._group_hashes)})"
+    
+    def __len__(self):
+        return len(self._hashes)
+    
+    def add(self, df, source=None, row_offset=0):
+        """
+        Add the keys of a DataFrame to the index.
+        
+        Args:
+            df: DataFrame with the key columns
+            source: name of the file the rows come from (optional)
+            row_offset: data row position of the first row of df
+            
+        Returns:
+            boolean array marking the rows whose key was seen before,
+            in df or in anything added earlier
+        """
+        keys = pd.DataFrame({col: _key_text(df[col]) for col in self.key_columns})
+        complete = keys.notna().all(axis=1).to_numpy()
+        positions = np.flatnonzero(complete)
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()[positions]
+        repeated = np.zeros(len(df), dtype=bool)
+        repeated[positions] = self._insert(
+            hashes, positions + row_offset, self._source_code(source),
+            [keys[col].to_numpy(dtype=object)[positions] for col in self.key_columns])
+        return repeated
+    
+    def merge(self, other, source=None):
+        """
+        Add the keys of another index, e.g. one built by a worker for one file.
+        
+        Only the first row of each key in other is added, so the groups
+        found here are keys shared between sources; other's own groups
+        are not copied.
+        """
+        order = np.argsort(other._rows, kind='stable')
+        self._insert(other._hashes[order], other._rows[order], self._source_code(source),
+                     [keys[order] for keys in other._keys])
+    
+    def _source_code(self, source):
+        if source is None:
+            return -1
+        if source not in self.sources:
+            self.sources.append(source)
+        return self.sources.index(source)
+    
+    def _insert(self, hashes, rows, source_code, keys):
+        """Add hashed keys and return the mask of the ones already seen."""
+        unique, first, inverse, counts = np.unique(
+            hashes, return_index=True, return_inverse=True, return_counts=True)
+        found = np.minimum(np.searchsorted(self._hashes, unique), max(len(self._hashes) - 1, 0))
+        seen = self._hashes[found] == unique if len(self._hashes) else np.zeros(len(unique), dtype=bool)
+        repeated = np.ones(len(hashes), dtype=bool)
+        repeated[first[~seen]] = False
+        
+        # Keys occurring more than once become groups; a key seen in an
+        # earlier call brings the stored location of its first row along
+        duplicated = seen | (counts > 1)
+        grouped = self._grouped[found] & seen if len(self._hashes) else seen
+        new_group = duplicated & ~grouped
+        from_index = found[new_group & seen]
+        from_here = first[new_group & ~seen]
+        if new_group.any():
+            self._grouped[from_index] = True
+            self._group_hashes = np.concatenate([self._group_hashes, self._hashes[from_index], hashes[from_here]])
+            self._group_keys = [
+                np.concatenate([group_keys, stored[from_index], values[from_here]])
+                for group_keys, stored, values in zip(self._group_keys, self._keys, keys)
+            ]
+            self._members.append(
+                (self._hashes[from_index], self._source_codes[from_index], self._rows[from_index]))
+        members = np.flatnonzero(duplicated[inverse])
+        if len(members):
+            self._members.append(
+                (hashes[members], np.full(len(members), source_code, dtype=np.int32), rows[members]))
+        
+        # np.unique sorted the new hashes, so they are merged into the
+        # sorted index in one linear pass instead of sorting it again
+        new = first[~seen]
+        if len(new):
+            at = np.searchsorted(self._hashes, hashes[new])
+            self._hashes = np.insert(self._hashes, at, hashes[new])
+            self._rows = np.insert(self._rows, at, rows[new])
+            self._source_codes = np.insert(self._source_codes, at, source_code)
+            self._grouped = np.insert(self._grouped, at, counts[~seen] > 1)
+            self._keys = [np.insert(old, at, values[new]) for old, values in zip(self._keys, keys)]
+        return repeated
+    
+    def groups(self):
+        """
+        Return the duplicate keys, in the order they were found.
+        
+        Returns:
+            list of dicts with the 'key' values by column and the sheet
+            'rows' having them; when rows came from named sources, 'files'
+            maps each source to its rows instead of 'rows'
+        """
+        if not self._members:
+            return []
+        hashes, source_codes, rows = (np.concatenate(part) for part in zip(*self._members))
+        group_of = pd.Index(self._group_hashes).get_indexer(hashes)
+        order = np.argsort(group_of, kind='stable')
+        sizes = np.bincount(group_of, minlength=len(self._group_hashes))
+        ends = np.cumsum(sizes)
+        starts = ends - sizes
+        sheet_rows = (rows[order] + FIRST_DATA_ROW).tolist()
+        codes = source_codes[order].tolist()
+        
+        groups = []
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            group = {'key': {col: values[i] for col, values in zip(self.key_columns, self._group_keys)}}
+            if self.sources:
+                files = {}
+                for code, row in zip(codes[start:end], sheet_rows[start:end]):
+                    files.setdefault(self.sources[code] if code >= 0 else None, []).append(row)
+                group['files'] = files
+            else:
+                group['rows'] = sheet_rows[start:end]
+            groups.append(group)
+        return groups
+
+class ReferenceIndex:
+    """
+    Persistent hash index of the values in one column of a reference dataset.
+    
+    The reference file (CSV, Parquet or a workbook) is read once: its values
+    are hashed to 64 bits and the sorted, distinct hashes are saved as a .npy
+    file in index_dir. Later runs memory-map that file instead of reading
+    the source again, so a 2M-row supplier list opens in milliseconds and
+    its pages are shared by every process using it. The index is rebuilt
+    when the source's size or modification time changes. Values are checked
+    with a vectorized binary search of the hashes of their distinct values.
+    """
+    def __init__(self, source, column, sheet=None, index_dir=DEFAULT_REFERENCE_DIR):
+        self.source = os.path.abspath(source)
+        self.column = column
+        self.sheet = sheet
+        self.index_dir = index_dir
+        self._hashes = None
+        self._loaded_stamp = None
+        self._lock = threading.Lock()
+    
+    def __repr__(self):
+        return f"ReferenceIndex(source={self.source!r}, column={self.column!r})"
+    
+    def __len__(self):
+        return len(self.hashes())
+    
+    def stamp(self):
+        """Return the (size, modification time) of the source, or None if it is missing."""
+        try:
+            stat = os.stat(self.source)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    def hashes(self):
+        """Return the sorted hashes of the reference values, loading or building the index if needed."""
+        stamp = self.stamp()
+        if stamp is None:
+            raise ValueError(f"Reference file not found: {self.source}")
+        with self._lock:
+            if self._hashes is None or self._loaded_stamp != stamp:
+                self._hashes = self._load(stamp)
+                self._loaded_stamp = stamp
+            return self._hashes
+    
+    def contains(self, values):
+        """
+        Return a boolean array marking the values found in the reference data.
+        
+        Args:
+            values: pandas Series of values to look up; empty values are
+                never found
+        """
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        hashes = _hash_text(pd.Series(uniques))
+        reference = self.hashes()
+        if len(reference):
+            # Looking up sorted hashes walks the index in order, like a merge join,
+            # instead of jumping around the memory map
+            order = np.argsort(hashes)
+            positions = np.minimum(np.searchsorted(reference, hashes[order]), len(reference) - 1)
+            found = np.empty(len(hashes), dtype=bool)
+            found[order] = reference[positions] == hashes[order]
+        else:
+            found = np.zeros(len(hashes), dtype=bool)
+        result = np.zeros(len(codes), dtype=bool)
+        present = codes >= 0
+        result[present] = found[codes[present]]
+        return result
+    
+    def _paths(self):
+        name = hashlib.sha256(f"{self.source}|{self.column}|{self.sheet}".encode('utf-8')).hexdigest()
+        return os.path.join(self.index_dir, name + '.npy'), os.path.join(self.index_dir, name + '.json')
+    
+    def _load(self, stamp):
+        index_path, meta_path = self._paths()
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('stamp') == stamp:
+                return np.load(index_path, mmap_mode='r')
+        except (OSError, ValueError):
+            # A missing or damaged index is rebuilt
+            pass
+        
+        hashes = np.sort(_hash_text(self._read_source().dropna()))
+        hashes = hashes[np.concatenate([[True], hashes[1:] != hashes[:-1]])]
+        os.makedirs(self.index_dir, exist_ok=True)
+        # Write under temporary names so other processes never see a partial index
+        temp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, hashes)
+        os.replace(temp_path, index_path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'source': self.source, 'column': self.column, 'sheet': self.sheet,
+                       'stamp': stamp, 'values': len(hashes)}, f)
+        os.replace(temp_path, meta_path)
+        return np.load(index_path, mmap_mode='r')
+    
+    def _read_source(self):
+        """Read the reference column from the source file."""
+        suffix = Path(self.source).suffix.lower()
+        if suffix == '.parquet':
+            _require_pyarrow("Parquet reference data")
+            df = pd.read_parquet(self.source, columns=[self.column])
+        elif suffix in ('.xlsx', '.xlsm', '.xls'):
+            try:
+                df = read_sheet(self.source, columns=[self.column], sheet=self.sheet)
+            except ValueError as e:
+                raise ValueError(f"Could not read column '{self.column}' from reference file: {self.source}: {e}") from e
+        else:
+            if self.column not in pd.read_csv(self.source, nrows=0).columns:
+                raise ValueError(f"Column '{self.column}' not found in reference file: {self.source}")
+            # Read as text, so codes such as '00123' keep their leading zeros;
+            # pyarrow's multi-threaded parser is several times faster when installed
+            engine = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+            df = pd.read_csv(self.source, usecols=[self.column], dtype=str, engine=engine)
+        if self.column not in df.columns:
+            raise ValueError(f"Column '{self.column}' not found in reference file: {self.source}")
+        return df[self.column]
+
+# Reference indexes already opened by this process, so each is loaded once
+_REFERENCE_INDEXES = {}
+
+def load_reference(source, column, sheet=None, index_dir=DEFAULT_REFERENCE_DIR):
+    """
+    Return the ReferenceIndex of a column of a reference file.
+    
+    The same index object is returned for the same file and column within
+    a process, so its memory map is opened once and reused by every run.
+    Nothing is read until the index is first used.
+    """
+    key = (os.path.abspath(source), column, sheet, index_dir)
+    if key not in _REFERENCE_INDEXES:
+        _REFERENCE_INDEXES[key] = ReferenceIndex(source, column, sheet, index_dir)
+    return _REFERENCE_INDEXES[key]
+
+def _hash_text(values):
+    """Hash values as text (see _key_text) to uint64, the same way in data and reference files."""
+    # Callers pass mostly distinct values, so factorizing them first would not pay off
+    return pd.util.hash_pandas_object(_key_text(values), index=False, categorize=False).to_numpy()
+
+def _row_fingerprints(df):
+    """
+    Hash every row of df to 64 bits from the text of its cells.
+    
+    Cells are hashed as text (see _key_text), so a row keeps its hash when
+    its column's dtype changes, e.g. from object to int64 once the last
+    'n/a' in the column is fixed. Each distinct value is hashed once.
+    """
+    cell_hashes = {}
+    for position in range(df.shape[1]):
+        col_data = df.iloc[:, position]
+        if col_data.dtype != object and pd.api.types.is_string_dtype(col_data.dtype):
+            # Already text, and mostly distinct values, so hashed as it is
+            hashes = np.where(col_data.isna().to_numpy(), np.uint64(0), _hash_text(col_data))
+        else:
+            codes, uniques = pd.factorize(col_data, use_na_sentinel=True)
+            # Empty cells (code -1) take the 0 added at the end
+            hashes = np.append(_hash_text(pd.Series(uniques, dtype=object)), np.uint64(0))[codes]
+        cell_hashes[position] = hashes
+    return pd.util.hash_pandas_object(pd.DataFrame(cell_hashes), index=False).to_numpy()
+
+def _coerce_numeric(col_data):
+    return pd.to_numeric(col_data, errors='coerce')
+
+def _coerce_date(col_data):
+    # Dates usually repeat a lot (one per day), so each distinct value is converted
+    # once; repeats in the first rows show whether that is worth hashing the column for
+    sample = col_data.iloc[:DATE_SAMPLE_ROWS]
+    if col_data.dtype == object and sample.nunique() < len(sample) * 0.9:
+        codes, uniques = pd.factorize(col_data, use_na_sentinel=True)
+        values = _coerce_date_values(pd.Series(uniques, dtype=object))
+        return pd.Series(values.array.take(codes, allow_fill=True), index=col_data.index)
+    return _coerce_date_values(col_data)
+
+def _coerce_date_values(col_data):
+    # Excel dates usually arrive as datetime objects, which a plain astype
+    # converts far faster than pd.to_datetime's general parser
+    if col_data.dtype == object:
+        kind = pd.api.types.infer_dtype(col_data, skipna=True)
+        if kind == 'datetime':
+            try:
+                return col_data.astype('datetime64[us]')
+            except (TypeError, ValueError, OverflowError):
+                pass
+        elif kind == 'mixed':
+            is_datetime = np.fromiter(
+                (isinstance(value, datetime.datetime) for value in col_data.to_numpy()),
+                dtype=bool, count=len(col_data),
+            )
+            if is_datetime.any():
+                try:
+                    values = pd.Series(pd.NaT, index=col_data.index, dtype='datetime64[us]')
+                    values[is_datetime] = col_data[is_datetime].astype('datetime64[us]')
+                    values[~is_datetime] = pd.to_datetime(col_data[~is_datetime], errors='coerce')
+                    return values
+                except (TypeError, ValueError, OverflowError):
+                    pass
+    return pd.to_datetime(col_data, errors='coerce')
+
+def _is_numeric_dtype(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+def _is_datetime_dtype(dtype):
+    return pd.api.types.is_datetime64_any_dtype(dtype)
+
+# Column type -> (test for dtypes that need no coercion, coercion function)
+_COERCERS = {
+    'numeric': (_is_numeric_dtype, _coerce_numeric),
+    'date': (_is_datetime_dtype, _coerce_date),
+}
+
+def count_data_type_errors(df, column_validations, counts=None, max_errors=None):
+    """
+    Count data type and required-field errors in the dataframe.
+    
+    Args:
+        df: pandas DataFrame
+        column_validations: dict of column validation rules
+        counts: dict of running counts to add to (optional)
+        max_errors: stop checking once this many errors are counted
+            (see ValidationEngine.run; default: check everything)
+        
+    Returns:
+        dict: (column, check) -> error count, where check is 'required',
+        'numeric' or 'date'. A count of None means the column could not
+        be checked at all.
+    """
+    return ValidationEngine(column_validations).run(df, counts, max_errors=max_errors).counts
+
+def _error_total(counts):
+    """Return the total of running error counts; a column that could not be checked counts once."""
+    return sum(1 if count is None else count for count in counts.values())
+
+def _budget_message(max_errors):
+    """Return the error message for a validation stopped by its error budget."""
+    return f"Validation stopped at the error budget of {max_errors}; later checks were skipped"
+
+def _add_error_count(counts, key, count):
+    """Add count to a running error count, keeping 'could not check' markers."""
+    if key in counts and counts[key] is None:
+        return
+    counts[key] = counts.get(key, 0) + count
+
+def format_data_type_errors(counts, column_validations=None):
+    """
+    Turn error counts from count_data_type_errors into error messages.
+    
+    Args:
+        counts: dict of (column, check) -> error count
+        column_validations: the rules that were checked, to name the
+            bounds, pattern or other column in the messages (optional)
+        
+    Returns:
+        list: error message strings
+    """
+    errors = []
+    for (col_name, check), count in counts.items():
+        rules = (column_validations or {}).get(col_name, {})
+        if check == 'required':
+            errors.append(f"Column '{col_name}' has {count} empty/null values (required field)")
+        elif count is None:
+            errors.append(f"Column '{col_name}' should contain {check} values")
+        elif check == 'numeric':
+            errors.append(f"Column '{col_name}' has {count} non-numeric values")
+        elif check == 'date':
+            errors.append(f"Column '{col_name}' has {count} invalid date values")
+        elif check == 'range':
+            low, high = rules.get('min'), rules.get('max')
+            if low is not None and high is not None:
+                limits = f" outside {low} to {high}"
+            elif low is not None:
+                limits = f" below {low}"
+            elif high is not None:
+                limits = f" above {high}"
+            else:
+                limits = " out of range"
+            errors.append(f"Column '{col_name}' has {count} values{limits}")
+        elif check == 'pattern':
+            pattern = f" '{rules['pattern']}'" if 'pattern' in rules else ''
+            errors.append(f"Column '{col_name}' has {count} values not matching the pattern{pattern}")
+        elif check == 'allowed':
+            allowed = list(rules.get('allowed', []))
+            listed = f" ({', '.join(map(str, allowed))})" if 0 < len(allowed) <= 10 else ''
+            errors.append(f"Column '{col_name}' has {count} values not in the allowed list{listed}")
+        elif check == 'order':
+            other = f"'{rules['not_before']}'" if 'not_before' in rules else 'the column it follows'
+            errors.append(f"Column '{col_name}' has {count} values before {other}")
+        elif check == 'duplicate':
+            unique = rules.get('unique')
+            others = [] if unique in (None, True) else [unique] if isinstance(unique, str) else list(unique)
+            key = f" (together with {', '.join(repr(col) for col in others)})" if others else ''
+            errors.append(f"Column '{col_name}' has {count} duplicate values{key}")
+        elif check == 'reference':
+            spec = rules.get('reference')
+            spec = {'path': spec} if isinstance(spec, (str, os.PathLike)) else spec or {}
+            source = f" {os.path.basename(spec['path'])}" if 'path' in spec else ' the reference data'
+            column = f" (column '{spec['column']}')" if spec.get('column', col_name) != col_name else ''
+            errors.append(f"Column '{col_name}' has {count} values not found in{source}{column}")
+    return errors
+
+def validate_data_types(df, column_validations, max_errors=None):
+    """
+    Validate data types and required fields in the dataframe.
+    
+    Args:
+        df: pandas DataFrame
+        column_validations: dict of column validation rules
+        max_errors: error budget; stop checking once this many errors are
+            found, e.g. 1 to stop after the first failing column. The
+            errors list then ends with a note that checks were skipped
+            (default: check everything)
+        
+    Returns:
+        tuple: (is_valid, errors_list)
+    """
+    errors = ValidationEngine(column_validations).run(df, max_errors=max_errors).errors()
+    is_valid = len(errors) == 0
+    return is_valid, errors
+
+def load_config(config_path):
+    """
+    Load the expected columns and validation rules from a config file.
+    
+    The file is Python, laid out like config_example.py, and is run with
+    runpy. Settings it does not define keep their built-in values, and
+    'reference' paths are taken relative to the config file. The rules are
+    compiled once here, so mistakes in them are reported before any
+    workbook is read.
+    
+    Args:
+        config_path: path of the config file
+        
+    Returns:
+        tuple: (expected_columns, column_validations)
+    """
+    settings = runpy.run_path(config_path)
+    expected_columns = list(settings.get('EXPECTED_COLUMNS', EXPECTED_COLUMNS))
+    column_validations = dict(settings.get('COLUMN_VALIDATIONS', COLUMN_VALIDATIONS))
+    
+    # Reference files are found relative to the config file
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+    for col_name, rules in column_validations.items():
+        spec = rules.get('reference')
+        if isinstance(spec, (str, os.PathLike)):
+            spec = {'path': spec}
+        if isinstance(spec, dict) and 'path' in spec:
+            spec = dict(spec, path=os.path.join(config_dir, spec['path']))
+            column_validations[col_name] = dict(rules, reference=spec)
+    
+    ValidationEngine(column_validations)
+    return expected_columns, column_validations
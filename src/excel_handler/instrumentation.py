@@ -0,0 +1,105 @@
+"""
+Timing and memory instrumentation of named stages.
+"""
+import contextlib
+import json
+import time
+import tracemalloc
+
+class Instrumentation:
+    """
+    Records wall time, CPU time and peak allocation of named stages.
+    
+    Use stage() as a context manager around each piece of work. Stages that
+    run more than once (such as per-chunk reads) are added up into a single
+    record. Peak allocation is only measured when trace_memory is True,
+    since tracemalloc slows everything else down.
+    """
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = {}
+        # Peak allocation seen by each open stage's nested stages
+        self._child_peaks = []
+    
+    def __repr__(self):
+        return f"Instrumentation(stages={list(self.records)})"
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the body of the with block as stage name."""
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            held_now, peak_so_far = tracemalloc.get_traced_memory()
+            if self._child_peaks:
+                # Keep the enclosing stage's peak before it is reset below
+                self._child_peaks[-1] = max(self._child_peaks[-1], peak_so_far)
+            held_before = held_now
+            tracemalloc.reset_peak()
+            self._child_peaks.append(0)
+        
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = None
+            if self.trace_memory:
+                # Nested stages reset the peak, so take the largest of theirs too
+                peak_held = max(tracemalloc.get_traced_memory()[1], self._child_peaks.pop())
+                peak = peak_held - held_before
+                if self._child_peaks:
+                    self._child_peaks[-1] = max(self._child_peaks[-1], peak_held)
+                if started_tracing:
+                    tracemalloc.stop()
+            self._add(name, wall, cpu, peak)
+    
+    def _add(self, name, wall, cpu, peak):
+        record = self.records.get(name)
+        if record is None:
+            self.records[name] = {'stage': name, 'calls': 1, 'wall_seconds': wall,
+                                  'cpu_seconds': cpu, 'peak_bytes': peak}
+            return
+        record['calls'] += 1
+        record['wall_seconds'] += wall
+        record['cpu_seconds'] += cpu
+        if peak is not None:
+            record['peak_bytes'] = max(record['peak_bytes'] or 0, peak)
+    
+    def to_list(self):
+        """Return the stage records in the order the stages first ran."""
+        return [dict(record) for record in self.records.values()]
+    
+    def to_jsonl(self, path, **fields):
+        """
+        Append one JSON line per stage to a file.
+        
+        Args:
+            path: file to append to
+            **fields: extra fields added to every line, e.g. file=...
+        """
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.to_list():
+                f.write(json.dumps(dict(fields, **record), default=str) + '\n')
+    
+    def summary(self):
+        """Print a table of the recorded stages."""
+        print("\n=== Stage Timings ===")
+        for record in self.records.values():
+            peak = record['peak_bytes']
+            peak_text = f"  peak {peak / 1024 / 1024:.1f} MB" if peak is not None else ''
+            print(f"  {record['stage']:<40} {record['wall_seconds']:8.3f} s wall "
+                  f"{record['cpu_seconds']:8.3f} s cpu{peak_text}")
+
+class _NoInstrumentation:
+    """Stand-in for Instrumentation when it is turned off; records nothing."""
+    records = {}
+    
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+NO_INSTRUMENTATION = _NoInstrumentation()
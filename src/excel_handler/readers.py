@@ -0,0 +1,814 @@
+"""
+Reader backends, which turn a worksheet into rows and DataFrames the
+way pd.read_excel does.
+"""
+import collections
+import datetime
+import importlib.util
+import itertools
+import mmap
+import operator
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree
+from xml.parsers import expat
+
+from ._lazy import np, pd
+from .settings import DEFAULT_CHUNK_SIZE, SHARED_STRINGS_SPILL_BYTES
+
+def _header_names(header_row):
+    """Name header cells the way pd.read_excel does, including blank and repeated ones."""
+    names = [f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(header_row)]
+    # Repeated names get a .1, .2, ... suffix not used elsewhere in the header;
+    # as in pandas, named cells are numbered before blank ones
+    order = [i for i, value in enumerate(header_row) if value is not None]
+    order += [i for i, value in enumerate(header_row) if value is None]
+    counts = collections.defaultdict(int)
+    for i in order:
+        base = name = names[i]
+        count = counts[base]
+        while count > 0:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            count = count + 1 if name in names else counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+# XML namespaces used inside .xlsx archives
+_SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+def read_excel_header(file_path):
+    """
+    Read only the header row of the first sheet of an Excel file.
+    
+    For .xlsx files the sheet XML is parsed directly and parsing stops at
+    the end of the first row, so the cost does not depend on the number of
+    data rows. Other formats fall back to pandas with nrows=0.
+    
+    Args:
+        file_path: path to the Excel file
+        
+    Returns:
+        list: column names
+    """
+    if not str(file_path).lower().endswith('.xlsx'):
+        return [str(col) for col in pd.read_excel(file_path, nrows=0).columns]
+    
+    with zipfile.ZipFile(file_path) as archive:
+        _, sheet_path = _sheet_paths(archive)[0]
+        cells = {}
+        with archive.open(sheet_path) as sheet:
+            for _, elem in ElementTree.iterparse(sheet):
+                if elem.tag == _SHEET_NS + 'c':
+                    cells[_column_index(elem.get('r'), len(cells))] = elem
+                elif elem.tag == _SHEET_NS + 'row':
+                    break
+        
+        shared_indexes = [int(_cell_text(cell, 'v')) for cell in cells.values() if cell.get('t') == 's']
+        shared = _read_shared_strings(archive, max(shared_indexes, default=-1))
+        
+        header = [None] * (max(cells) + 1 if cells else 0)
+        for index, cell in cells.items():
+            cell_type = cell.get('t')
+            if cell_type == 's':
+                header[index] = shared[int(_cell_text(cell, 'v'))]
+            elif cell_type == 'inlineStr':
+                header[index] = ''.join(t.text or '' for t in cell.iter(_SHEET_NS + 't'))
+            else:
+                header[index] = _cell_text(cell, 'v')
+    
+    # Trailing blank cells are not part of the header
+    while header and header[-1] in (None, ''):
+        header.pop()
+    return _header_names([None if value == '' else value for value in header])
+
+def _sheet_paths(archive):
+    """Return (sheet name, archive path) for each worksheet of an .xlsx file, in order."""
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(_PKG_REL_NS + 'Relationship')}
+    
+    paths = []
+    for sheet in workbook.iter(_SHEET_NS + 'sheet'):
+        target = targets.get(sheet.get(_REL_NS + 'id'))
+        if target:
+            paths.append((sheet.get('name'), target.lstrip('/') if target.startswith('/') else 'xl/' + target))
+    if not paths:
+        raise ValueError("Workbook has no worksheets")
+    return paths
+
+def _column_index(cell_ref, default):
+    """Convert a cell reference like 'C1' to a zero-based column index."""
+    if not cell_ref:
+        return default
+    index = 0
+    for char in cell_ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+def _cell_text(cell, tag):
+    """Return the text of a cell's child element, or None."""
+    child = cell.find(_SHEET_NS + tag)
+    return child.text if child is not None else None
+
+def _read_shared_strings(archive, last_index, spill=False):
+    """
+    Read shared strings up to and including last_index.
+    
+    With spill, the strings go to a _SpilledStrings temporary file rather
+    than a list.
+    """
+    strings = _SpilledStrings() if spill else []
+    if last_index < 0 or 'xl/sharedStrings.xml' not in archive.namelist():
+        return strings
+    with archive.open('xl/sharedStrings.xml') as shared:
+        for _, elem in ElementTree.iterparse(shared):
+            if elem.tag == _SHEET_NS + 'si':
+                strings.append(_shared_string_text(elem))
+                elem.clear()
+                if len(strings) > last_index:
+                    break
+    return strings
+
+class _SpilledStrings:
+    """
+    Shared strings kept in a temporary file, for string tables that do not fit in memory.
+    
+    The UTF-8 texts are written back to back, with their end offsets in a
+    second file; both are memory-mapped once complete, so looking a string
+    up reads only its own bytes.
+    """
+    def __init__(self):
+        self._texts = tempfile.TemporaryFile()
+        self._ends = tempfile.TemporaryFile()
+        self._pending = []
+        self._size = 0
+        self._count = 0
+        self._data = None
+        self._offsets = None
+    
+    def __len__(self):
+        return self._count
+    
+    def append(self, text):
+        data = text.encode('utf-8')
+        self._texts.write(data)
+        self._size += len(data)
+        self._pending.append(self._size)
+        self._count += 1
+        if len(self._pending) >= DEFAULT_CHUNK_SIZE:
+            self._flush()
+    
+    def __getitem__(self, index):
+        if self._data is None:
+            self._map()
+        start = int(self._offsets[index - 1]) if index else 0
+        return self._data[start:int(self._offsets[index])].decode('utf-8')
+    
+    def _flush(self):
+        self._ends.write(np.array(self._pending, dtype=np.int64).tobytes())
+        self._pending = []
+    
+    def _map(self):
+        self._flush()
+        self._texts.flush()
+        self._ends.flush()
+        # mmap cannot map empty files
+        self._data = mmap.mmap(self._texts.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b''
+        self._offsets = (np.memmap(self._ends, dtype=np.int64, mode='r')
+                         if self._count else np.empty(0, dtype=np.int64))
+    
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._offsets = None
+        self._texts.close()
+        self._ends.close()
+
+def _shared_string_text(item):
+    """Join the text runs of a shared string, skipping phonetic hints."""
+    parts = []
+    for child in item:
+        if child.tag == _SHEET_NS + 't':
+            parts.append(child.text or '')
+        elif child.tag == _SHEET_NS + 'r':
+            parts.append(_cell_text(child, 't') or '')
+    return ''.join(parts)
+
+# Built-in number formats that display a date or time
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+# Quoted text, escaped characters and [...] sections other than elapsed time
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\\.|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+_EXCEL_EPOCH_1904 = datetime.datetime(1904, 1, 1)
+
+class ReaderBackend:
+    """
+    A way of reading rows out of workbooks.
+    
+    open() returns a WorkbookReader that keeps the file open, so several
+    sheets are read from one parse of the archive. Turning rows into
+    DataFrame chunks is shared, so every backend gives the same columns,
+    index, missing values and blank-row handling. Subclasses set name and extensions and
+    implement open. Backends that load the whole sheet before returning
+    its first row set streaming to False.
+    """
+    
+    name = None
+    extensions = ()
+    streaming = True
+    
+    def __repr__(self):
+        return f"{type(self).__name__}(available={self.available()})"
+    
+    def available(self):
+        """Return True if the libraries this backend needs are installed."""
+        return True
+    
+    def supports(self, file_path):
+        """Return True if this backend can read the given file."""
+        return str(file_path).lower().endswith(self.extensions)
+    
+    def open(self, file_path):
+        """Open a workbook and return a WorkbookReader for it."""
+        raise NotImplementedError
+    
+    def iter_frames(self, file_path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, sheet=None):
+        """Yield one sheet (default: the first) as DataFrame chunks of at most chunk_size rows."""
+        with self.open(file_path) as workbook:
+            yield from workbook.iter_frames(sheet, chunk_size, columns)
+    
+    def read_frame(self, file_path, columns=None, sheet=None):
+        """Read one sheet (default: the first) into one DataFrame."""
+        with self.open(file_path) as workbook:
+            return workbook.read_frame(sheet, columns)
+
+class WorkbookReader:
+    """
+    A workbook opened by a ReaderBackend.
+    
+    Subclasses set sheet_names and implement iter_rows and close. Given
+    columns, iter_rows resolves them against the header row and yields only
+    those cells of each row, so other columns are dropped while parsing.
+    Names that are not in the header are ignored.
+    """
+    
+    sheet_names = ()
+    
+    def __repr__(self):
+        return f"{type(self).__name__}(sheets={self.sheet_names})"
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Close the underlying file."""
+    
+    def sheet_index(self, sheet):
+        """Resolve a sheet name or position (None for the first sheet) to a position."""
+        if sheet is None:
+            return 0
+        if isinstance(sheet, int):
+            return sheet
+        if sheet not in self.sheet_names:
+            raise ValueError(f"Worksheet '{sheet}' not found")
+        return self.sheet_names.index(sheet)
+    
+    def iter_rows(self, sheet=None, columns=None):
+        """Yield the rows of a sheet as sequences of cell values."""
+        raise NotImplementedError
+    
+    def iter_frames(self, sheet=None, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+        """Yield a sheet as DataFrame chunks of at most chunk_size rows."""
+        return _rows_to_frames(self.iter_rows(sheet, columns), chunk_size)
+    
+    def read_frame(self, sheet=None, columns=None):
+        """Read a whole sheet into one DataFrame."""
+        return next(self.iter_frames(sheet, None, columns))
+
+class OpenpyxlBackend(ReaderBackend):
+    """openpyxl in read-only mode, which streams the sheet XML."""
+    
+    name = 'openpyxl'
+    extensions = ('.xlsx', '.xlsm')
+    
+    def open(self, file_path):
+        return _OpenpyxlWorkbook(file_path)
+
+class _OpenpyxlWorkbook(WorkbookReader):
+    
+    def __init__(self, file_path):
+        from openpyxl import load_workbook
+        
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True)
+        self.sheet_names = list(self.workbook.sheetnames)
+    
+    def iter_rows(self, sheet=None, columns=None):
+        rows = self.workbook.worksheets[self.sheet_index(sheet)].iter_rows(values_only=True)
+        return _project_by_header(rows, columns)
+    
+    def close(self):
+        self.workbook.close()
+
+class CalamineBackend(ReaderBackend):
+    """The Rust calamine parser, through the python-calamine package."""
+    
+    name = 'calamine'
+    extensions = ('.xlsx', '.xlsm', '.xls', '.xlsb', '.ods')
+    streaming = False
+    
+    def available(self):
+        # Looked up without importing, which keeps startup fast
+        return importlib.util.find_spec('python_calamine') is not None
+    
+    def open(self, file_path):
+        return _CalamineWorkbook(file_path)
+
+class _CalamineWorkbook(WorkbookReader):
+    
+    def __init__(self, file_path):
+        from python_calamine import CalamineWorkbook
+        
+        self.workbook = CalamineWorkbook.from_path(str(file_path))
+        self.sheet_names = list(self.workbook.sheet_names)
+    
+    def iter_rows(self, sheet=None, columns=None):
+        # Values are converted after projection, so skipped cells cost nothing
+        for row in _project_by_header(self._raw_rows(sheet), columns):
+            yield [_normalize_calamine(value) for value in row]
+    
+    def _raw_rows(self, sheet):
+        worksheet = self.workbook.get_sheet_by_index(self.sheet_index(sheet))
+        # calamine starts at the first used cell rather than at A1
+        first_row, first_col = worksheet.start or (0, 0)
+        yield from [()] * first_row
+        if not first_col:
+            yield from worksheet.iter_rows()
+            return
+        lead = [None] * first_col
+        for row in worksheet.iter_rows():
+            yield lead + row
+    
+    def close(self):
+        self.workbook.close()
+
+def _normalize_calamine(value):
+    """Convert a calamine cell value to what openpyxl would return."""
+    value_type = type(value)
+    if value_type is float:
+        return int(value) if value.is_integer() else value
+    if value_type is str:
+        return value if value else None
+    if value_type is datetime.date:
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+class XmlStreamBackend(ReaderBackend):
+    """
+    Parse the worksheet XML inside the .xlsx archive directly with expat.
+    
+    This skips openpyxl's cell objects and style handling and only decodes
+    the number formats needed to tell dates from numbers.
+    """
+    
+    name = 'xml'
+    extensions = ('.xlsx', '.xlsm')
+    
+    def open(self, file_path):
+        return _XmlWorkbook(file_path)
+
+class _XmlWorkbook(WorkbookReader):
+    
+    def __init__(self, file_path):
+        self.archive = zipfile.ZipFile(file_path)
+        try:
+            sheets = _sheet_paths(self.archive)
+            self.date_styles, self.epoch = _read_date_styles(self.archive)
+        except Exception:
+            self.archive.close()
+            raise
+        self.sheet_names = [name for name, _ in sheets]
+        self.sheet_paths = [path for _, path in sheets]
+        # Shared strings are common to all sheets, so they are read only once
+        self.shared = None
+    
+    def iter_rows(self, sheet=None, columns=None):
+        sheet_path = self.sheet_paths[self.sheet_index(sheet)]
+        if self.shared is None:
+            names = self.archive.namelist()
+            size = self.archive.getinfo('xl/sharedStrings.xml').file_size if 'xl/sharedStrings.xml' in names else 0
+            self.shared = _read_shared_strings(self.archive, float('inf'), spill=size > SHARED_STRINGS_SPILL_BYTES)
+        
+        rows = []
+        parser = _SheetParser(self.shared, self.date_styles, self.epoch, rows.append, columns).parser
+        with self.archive.open(sheet_path) as stream:
+            for block in iter(lambda: stream.read(1 << 16), b''):
+                parser.Parse(block, False)
+                yield from rows
+                rows.clear()
+            parser.Parse(b'', True)
+            yield from rows
+    
+    def close(self):
+        if isinstance(self.shared, _SpilledStrings):
+            self.shared.close()
+        self.archive.close()
+
+class _SheetParser:
+    """
+    expat callbacks that turn worksheet XML into rows of Python values.
+    
+    Given columns, the first row is taken as the header and later cells
+    outside those columns are skipped without decoding their values.
+    """
+    
+    def __init__(self, shared, date_styles, epoch, emit, columns=None):
+        self.shared = shared
+        self.date_styles = date_styles
+        self.epoch = epoch
+        self.emit = emit
+        self.columns = columns
+        self.usecols = None
+        self.keep = None
+        self.row_number = 0
+        self.row = []
+        self.next_col = 0
+        # Element names without namespace prefix, and column letters to indexes
+        self.local_names = {}
+        self.column_indexes = {}
+        self.cell = None
+        self.text = None
+        self.phonetic = False
+        
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.data
+    
+    def local_name(self, tag):
+        name = self.local_names[tag] = tag.rpartition(':')[2]
+        return name
+    
+    def start(self, tag, attrs):
+        tag = self.local_names.get(tag) or self.local_name(tag)
+        if tag == 'c':
+            ref = attrs.get('r')
+            if ref:
+                letters = ref.rstrip('0123456789')
+                col = self.column_indexes.get(letters)
+                if col is None:
+                    col = self.column_indexes[letters] = _column_index(letters, 0)
+            else:
+                col = self.next_col
+            self.next_col = col + 1
+            if self.keep is None or col in self.keep:
+                self.cell = (col, attrs.get('t', 'n'), int(attrs.get('s', 0)))
+        elif (tag == 'v' or tag == 't') and self.cell is not None:
+            self.text = self.text or []
+        elif tag == 'rPh':
+            # Phonetic hints are not part of an inline string's text
+            self.phonetic = True
+        elif tag == 'row':
+            number = int(attrs.get('r', self.row_number + 1))
+            # Rows with no cells are left out of the XML
+            for _ in range(number - self.row_number - 1):
+                self.emit_row(())
+            self.row_number = number
+            self.row = []
+            self.next_col = 0
+    
+    def data(self, text):
+        if self.text is not None and not self.phonetic:
+            self.text.append(text)
+    
+    def end(self, tag):
+        tag = self.local_names.get(tag) or self.local_name(tag)
+        if tag == 'c':
+            if self.cell is None:
+                return
+            col, cell_type, style = self.cell
+            value = self.value(''.join(self.text) if self.text is not None else None, cell_type, style)
+            if value is not None:
+                if col >= len(self.row):
+                    self.row.extend([None] * (col - len(self.row) + 1))
+                self.row[col] = value
+            self.cell = None
+            self.text = None
+        elif tag == 'row':
+            self.emit_row(self.row)
+        elif tag == 'rPh':
+            self.phonetic = False
+    
+    def emit_row(self, row):
+        if self.columns is not None:
+            self.usecols = _header_positions(row, self.columns)
+            self.keep = set(self.usecols)
+            self.columns = None
+        if self.usecols is not None:
+            width = len(row)
+            row = [row[i] if i < width else None for i in self.usecols]
+        self.emit(row)
+    
+    def value(self, text, cell_type, style):
+        if not text:
+            return None
+        if cell_type == 'n':
+            if style in self.date_styles:
+                return _excel_serial_to_datetime(float(text), self.epoch)
+            try:
+                return int(text)
+            except ValueError:
+                value = float(text)
+                return int(value) if value.is_integer() else value
+        if cell_type == 's':
+            return self.shared[int(text)]
+        if cell_type in ('str', 'inlineStr'):
+            return text
+        if cell_type == 'b':
+            return text == '1'
+        if cell_type == 'd':
+            return datetime.datetime.fromisoformat(text)
+        # Error cells (#N/A, #DIV/0!, ...) read as empty, as in pandas
+        return None
+
+def _read_date_styles(archive):
+    """
+    Find which cell styles of an .xlsx file display dates.
+    
+    Returns:
+        tuple: (set of cell style indexes, the epoch serial numbers count from)
+    """
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    properties = workbook.find(_SHEET_NS + 'workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+    epoch = _EXCEL_EPOCH_1904 if date1904 else _EXCEL_EPOCH
+    
+    if 'xl/styles.xml' not in archive.namelist():
+        return set(), epoch
+    styles = ElementTree.fromstring(archive.read('xl/styles.xml'))
+    date_formats = set(_BUILTIN_DATE_FORMATS)
+    for number_format in styles.iter(_SHEET_NS + 'numFmt'):
+        code = _FORMAT_LITERALS.sub('', number_format.get('formatCode', ''))
+        if re.search('[dmyhs]', code, re.IGNORECASE):
+            date_formats.add(int(number_format.get('numFmtId')))
+    
+    cell_formats = styles.find(_SHEET_NS + 'cellXfs')
+    if cell_formats is None:
+        return set(), epoch
+    return {
+        index for index, xf in enumerate(cell_formats.iter(_SHEET_NS + 'xf'))
+        if int(xf.get('numFmtId', 0)) in date_formats
+    }, epoch
+
+def _excel_serial_to_datetime(serial, epoch=_EXCEL_EPOCH):
+    """Convert an Excel date serial number to a datetime, rounded to milliseconds."""
+    # Excel counts a 29 Feb 1900 that never existed
+    if epoch == _EXCEL_EPOCH and 0 < serial < 60:
+        serial += 1
+    days, fraction = divmod(serial, 1)
+    return epoch + datetime.timedelta(days=days, milliseconds=round(fraction * 86400000))
+
+class PandasBackend(ReaderBackend):
+    """pd.read_excel with its default engine; reads every format pandas can."""
+    
+    name = 'pandas'
+    extensions = ('.xlsx', '.xlsm', '.xls', '.xlsb', '.ods')
+    streaming = False
+    
+    def open(self, file_path):
+        return _PandasWorkbook(file_path)
+
+class _PandasWorkbook(WorkbookReader):
+    
+    def __init__(self, file_path):
+        self.excel_file = pd.ExcelFile(file_path)
+        self.sheet_names = [str(name) for name in self.excel_file.sheet_names]
+    
+    def iter_rows(self, sheet=None, columns=None):
+        df = self.excel_file.parse(self.sheet_index(sheet), header=None)
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        return _project_by_header(rows, columns)
+    
+    def iter_frames(self, sheet=None, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+        wanted = set(columns) if columns is not None else None
+        df = self.excel_file.parse(self.sheet_index(sheet),
+                                   usecols=(lambda name: name in wanted) if wanted is not None else None)
+        if not chunk_size:
+            yield df
+            return
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+    
+    def close(self):
+        self.excel_file.close()
+
+# Reader backends by name, fastest first
+READER_BACKENDS = {
+    backend.name: backend
+    for backend in (CalamineBackend(), XmlStreamBackend(), OpenpyxlBackend(), PandasBackend())
+}
+
+def select_backend(file_path, name=None, streaming=False):
+    """
+    Pick the reader backend for a file.
+    
+    Args:
+        file_path: path to the Excel file
+        name: a key of READER_BACKENDS, or None/'auto' for the fastest
+            installed backend that reads this file format
+        streaming: with name None/'auto', prefer the fastest backend that
+            returns the first rows before the whole sheet is parsed
+        
+    Returns:
+        ReaderBackend
+    """
+    if name in (None, 'auto'):
+        candidates = [
+            backend for backend in READER_BACKENDS.values()
+            if backend.available() and backend.supports(file_path)
+        ]
+        for backend in candidates:
+            if backend.streaming or not streaming:
+                return backend
+        if candidates:
+            return candidates[0]
+        raise ValueError(f"No reader backend can read {Path(file_path).suffix or 'this'} files")
+    
+    if name not in READER_BACKENDS:
+        raise ValueError(f"Unknown reader backend '{name}'. Choose from: {', '.join(READER_BACKENDS)}")
+    backend = READER_BACKENDS[name]
+    if not backend.available():
+        raise ValueError(f"Reader backend '{name}' is not installed")
+    if not backend.supports(file_path):
+        raise ValueError(f"Reader backend '{name}' cannot read {Path(file_path).suffix or 'this'} files")
+    return backend
+
+def iter_excel_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE, backend=None, columns=None, sheet=None):
+    """
+    Read an Excel file in row chunks without loading the whole sheet.
+    
+    Streaming backends hold only one chunk of rows in memory at a time; the
+    calamine and pandas backends read the sheet in full and then slice it,
+    so they are only used when named.
+    
+    Args:
+        file_path: path to the Excel file
+        chunk_size: maximum number of data rows per chunk
+        backend: name of a reader backend (default: the fastest streaming
+            one available)
+        columns: names of the columns to load; other columns are skipped
+            while parsing (default: all columns)
+        sheet: sheet name or position (default: the first sheet)
+        
+    Yields:
+        pandas DataFrame chunks with the header row as columns. The index
+        continues across chunks, so it matches the row order in the sheet.
+    """
+    return select_backend(file_path, backend, streaming=True).iter_frames(file_path, chunk_size, columns, sheet)
+
+def read_sheet(file_path, backend=None, columns=None, sheet=None):
+    """
+    Read one sheet of an Excel file into a dataframe.
+    
+    Args:
+        file_path: path to the Excel file
+        backend: name of a reader backend (default: the fastest available)
+        columns: names of the columns to load (default: all columns)
+        sheet: sheet name or position (default: the first sheet)
+        
+    Returns:
+        pandas DataFrame, with the same columns, values and column types as
+        pd.read_excel, including its default NA strings ('N/A', 'NULL',
+        ...) read as missing values. Column names are always text.
+    """
+    return select_backend(file_path, backend).read_frame(file_path, columns, sheet)
+
+def _header_positions(header_row, columns):
+    """
+    Return the sorted positions of the named columns in a header row.
+    
+    Only the first of duplicated header names is used.
+    """
+    wanted = set(columns)
+    positions = []
+    for position, name in enumerate(_header_names([None if value == '' else value for value in header_row])):
+        if name in wanted:
+            positions.append(position)
+            wanted.discard(name)
+    if not positions:
+        raise ValueError("None of the requested columns are in the sheet")
+    return positions
+
+def _project_by_header(rows, columns):
+    """Take the first row as the header and keep only the named columns, if columns is given."""
+    if columns is None:
+        yield from rows
+        return
+    rows = iter(rows)
+    header = next(rows, ())
+    usecols = _header_positions(header, columns)
+    yield from _project_rows(itertools.chain([header], rows), usecols)
+
+def _project_rows(rows, usecols):
+    """Yield only the cells at the usecols positions of each row."""
+    get = operator.itemgetter(*usecols)
+    width = usecols[-1] + 1
+    padding = (None,) * width
+    for row in rows:
+        if len(row) < width:
+            row = tuple(row) + padding[len(row):]
+        values = get(row)
+        yield values if len(usecols) > 1 else (values,)
+
+def _rows_to_frames(rows, chunk_size):
+    """
+    Turn raw sheet rows into DataFrame chunks, the way pd.read_excel would.
+    
+    The first row is the header. Blank rows are kept, except at the end of
+    the sheet, and pandas' default NA strings become missing values (see
+    _apply_na_values). A chunk_size of None gives one chunk.
+    """
+    rows = iter(rows)
+    header = list(next(rows, ()))
+    # Trailing blank cells are not part of the header
+    while header and header[-1] is None:
+        header.pop()
+    header = _header_names(header)
+    width = len(header)
+    padding = (None,) * width
+    
+    offset = 0
+    buffer = []
+    blank_rows = 0
+    for row in rows:
+        if all(value is None for value in row):
+            blank_rows += 1
+            continue
+        if len(row) != width:
+            row = tuple(row[:width]) + padding[len(row):]
+        if blank_rows:
+            buffer.extend([padding] * blank_rows)
+            blank_rows = 0
+        buffer.append(row)
+        # Blank rows come in with the next row, so the buffer can hold several chunks
+        while chunk_size and len(buffer) >= chunk_size:
+            yield _rows_to_frame(buffer[:chunk_size], header, offset)
+            offset += chunk_size
+            buffer = buffer[chunk_size:]
+    
+    if buffer or offset == 0:
+        yield _rows_to_frame(buffer, header, offset)
+
+def _rows_to_frame(rows, header, offset):
+    """Build a DataFrame chunk whose index starts at the given row offset."""
+    df = pd.DataFrame.from_records(
+        rows, columns=header, index=pd.RangeIndex(offset, offset + len(rows))
+    )
+    return _apply_na_values(df)
+
+# Cell texts pd.read_excel reads as missing values by default (its na_values)
+_NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+def _apply_na_values(df):
+    """
+    Turn the cells pd.read_excel would read as missing into missing values.
+
+    Texts in _NA_VALUES and empty cells become NaN, and the columns they
+    were in get their type inferred again, so e.g. numbers with an 'N/A'
+    among them become a float column. Columns with no values at all are
+    float, as in pandas.
+    """
+    for position in range(df.shape[1]):
+        col_data = df.iloc[:, position]
+        if col_data.dtype == object:
+            missing = col_data.isna().to_numpy() | col_data.isin(_NA_VALUES).to_numpy()
+        elif pd.api.types.is_string_dtype(col_data.dtype):
+            missing = col_data.isin(_NA_VALUES).to_numpy()
+            if not missing.any():
+                continue
+            missing = missing | col_data.isna().to_numpy()
+        else:
+            continue
+        if missing.all():
+            col_data = pd.Series(np.nan, index=df.index)
+        else:
+            if missing.any():
+                col_data = col_data.mask(missing)
+            if col_data.dtype == object:
+                col_data = col_data.infer_objects()
+        df.isetitem(position, col_data)
+    return df
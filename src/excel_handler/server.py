@@ -0,0 +1,278 @@
+"""
+Local HTTP service that validates workbooks on a pool of warm workers.
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from .settings import (
+    DEFAULT_MAX_UPLOAD_BYTES,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE,
+    EXPECTED_COLUMNS,
+)
+from .readers import READER_BACKENDS
+from .validation import _warm_worker, _worker_ready, validate_file_report
+
+class ValidationServer:
+    """
+    Long-running local HTTP service that validates workbooks.
+    
+    Worker processes are started once and kept warm, with pandas and the
+    readers already imported, so a small workbook is validated in tens of
+    milliseconds instead of paying interpreter and import startup per file.
+    At most workers + max_queue jobs are accepted at a time; further
+    requests are refused with 503 and a Retry-After header. If a worker
+    process dies (e.g. killed for using too much memory), the jobs it took
+    down fail and the pool is replaced.
+    
+    Endpoints:
+        GET  /health    pool size, state and restarts, and number of jobs
+                        in progress
+        POST /validate  JSON body {"path": ...} for a file the server can
+                        read, or the workbook itself as the request body
+                        (name it with ?filename=...). Options such as
+                        sheets, backend, only_expected and max_errors go
+                        in the JSON body or the query string. Returns the
+                        validate_file_report result as JSON.
+    """
+    def __init__(self, host=DEFAULT_SERVER_HOST, port=DEFAULT_SERVER_PORT, workers=None,
+                 max_queue=DEFAULT_SERVER_QUEUE, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES, **options):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        # Defaults for validate_file_report, e.g. backend, columns, cache_dir
+        self.options = options
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._pending = 0
+        # Times the pool was replaced after a worker process died
+        self.pool_restarts = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _ValidationRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.validation_server = self
+    
+    def __repr__(self):
+        return f"ValidationServer(address={self.address}, workers={self.workers}, max_queue={self.max_queue})"
+    
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def pending(self):
+        """Number of jobs running or waiting for a worker."""
+        return self._pending
+    
+    def warm_up(self):
+        """Start every worker process now rather than on the first request."""
+        for future in [self.executor.submit(_worker_ready) for _ in range(self.workers)]:
+            future.result()
+    
+    def check_pool(self):
+        """
+        Replace the worker pool if one of its processes has died.
+        
+        Returns:
+            'ok', or 'restarted' if the pool was broken and has been replaced
+        """
+        with self._lock:
+            try:
+                # A broken pool refuses new jobs; a working one runs this in no time
+                self.executor.submit(_worker_ready)
+                return 'ok'
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+                self.pool_restarts += 1
+        print("✗ A worker process crashed; started a new worker pool")
+        return 'restarted'
+    
+    def validate(self, file_path, **options):
+        """
+        Validate a file on the worker pool and return its report.
+        
+        Returns:
+            result dict of validate_file_report, or None if the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            kwargs = dict(self.options, **options)
+            try:
+                future = self.executor.submit(validate_file_report, file_path, **kwargs)
+            except BrokenProcessPool:
+                self.check_pool()
+                future = self.executor.submit(validate_file_report, file_path, **kwargs)
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                # Every job in the pool fails when one worker dies, not only the one that caused it
+                self.check_pool()
+                return {'file': file_path, 'passed': False,
+                        'error': 'A worker process crashed during validation (e.g. it ran out of memory); '
+                                 'try again'}
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+    
+    def serve_forever(self):
+        """Handle requests until shutdown() is called or Ctrl+C is pressed."""
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.executor.shutdown(cancel_futures=True)
+    
+    def shutdown(self):
+        """Stop serve_forever from another thread."""
+        self.httpd.shutdown()
+
+# How option types are named in the server's error messages
+_JSON_TYPE_NAMES = {str: 'a string', bool: 'true or false', int: 'an integer'}
+
+class _ValidationRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler of ValidationServer."""
+    
+    server_version = 'ExcelHandler'
+    # Keys accepted from a request: the JSON type of each, and how to read it from a query string
+    OPTIONS = {
+        'sheets': (str, str),
+        'backend': (str, str),
+        'only_expected': (bool, lambda value: value.lower() in ('1', 'true', 'yes')),
+        'max_errors': (int, int),
+    }
+    
+    def do_GET(self):
+        service = self.server.validation_server
+        if urlparse(self.path).path != '/health':
+            return self._send_json(404, {'error': 'Not found'})
+        self._send_json(200, {
+            'status': 'ok',
+            'pool': service.check_pool(),
+            'pool_restarts': service.pool_restarts,
+            'workers': service.workers,
+            'pending': service.pending,
+            'capacity': service.workers + service.max_queue,
+        })
+    
+    def do_POST(self):
+        service = self.server.validation_server
+        url = urlparse(self.path)
+        if url.path != '/validate':
+            return self._send_json(404, {'error': 'Not found'})
+        
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > service.max_upload_bytes:
+            return self._send_json(413, {'error': f"Upload larger than {service.max_upload_bytes} bytes"})
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        
+        if self.headers.get_content_type() == 'application/json':
+            try:
+                job = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._send_json(400, {'error': 'Invalid JSON body'})
+            if not isinstance(job, dict) or not isinstance(job.get('path'), str) or not job['path']:
+                return self._send_json(400, {'error': "JSON body needs a 'path'"})
+            try:
+                options = self._options(job, convert=False)
+            except ValueError as e:
+                return self._send_json(400, {'error': str(e)})
+            result = self._validate(service, job['path'], options)
+        else:
+            try:
+                options = self._options(query, convert=True)
+            except ValueError as e:
+                return self._send_json(400, {'error': str(e)})
+            result = self._validate_upload(service, length, query.get('filename', 'upload.xlsx'), options)
+        
+        if result is None:
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self._send_json(None, {'error': 'Server busy, try again shortly'})
+        else:
+            self._send_json(200, result)
+    
+    def _options(self, source, convert):
+        """
+        Pick the per-job options out of a JSON body or query string.
+        
+        Raises:
+            ValueError: if an option has the wrong type or value
+        """
+        options = {}
+        for key, (kind, parse) in self.OPTIONS.items():
+            if key not in source:
+                continue
+            value = source[key]
+            if convert:
+                try:
+                    value = parse(value)
+                except ValueError:
+                    raise ValueError(f"'{key}' must be {_JSON_TYPE_NAMES[kind]}") from None
+            # bool is a subclass of int, but true is not a number of errors
+            elif not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+                raise ValueError(f"'{key}' must be {_JSON_TYPE_NAMES[kind]}")
+            options[key] = value
+        if options.get('max_errors', 1) < 1:
+            raise ValueError("'max_errors' must be at least 1")
+        if options.get('backend', 'auto') not in ('auto', *READER_BACKENDS):
+            raise ValueError(f"Unknown reader backend '{options['backend']}'. "
+                             f"Choose from: auto, {', '.join(READER_BACKENDS)}")
+        if options.pop('only_expected', False):
+            options['columns'] = self.server.validation_server.options.get('expected_columns', EXPECTED_COLUMNS)
+        return options
+    
+    def _validate(self, service, file_path, options):
+        if not os.path.isfile(file_path):
+            return {'file': file_path, 'passed': False, 'error': 'File not found'}
+        return service.validate(file_path, **options)
+    
+    def _validate_upload(self, service, length, filename, options):
+        """
+        Spool the request body to a temporary file and validate it.
+        
+        The parse cache is keyed on the file's content and the incremental
+        state on the client's filename, so both still apply to uploads.
+        """
+        suffix = Path(filename).suffix.lower() or '.xlsx'
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as upload:
+            remaining = length
+            while remaining > 0:
+                block = self.rfile.read(min(remaining, 1024 * 1024))
+                if not block:
+                    break
+                upload.write(block)
+                remaining -= len(block)
+        try:
+            result = service.validate(upload.name, source_name=filename, **options)
+        finally:
+            os.remove(upload.name)
+        if result is not None:
+            # A worker crash reports the temporary path
+            result['file'] = filename
+        return result
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        if status is not None:
+            self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
@@ -0,0 +1,110 @@
+"""
+Built-in settings: the expected columns, their validation rules and the
+defaults of every mode. A config file passed with --config replaces the
+columns and rules.
+"""
+import os
+
+# Expected column format for Optix PDR TDR - Digitization Priority
+EXPECTED_COLUMNS = [
+    'Customer',
+    'Customer RO',
+    'Customer Pre Work PN',
+    'Customer Pre Work SN',
+    'Description',
+    'Customer Supplier Code',
+    'Priority - PDR/TDR',
+    'Supplier Name',
+    'Last Quote ID',
+    'RO Create Date',
+    'RO Close Date',
+]
+
+# Column data type expectations and validation rules
+COLUMN_VALIDATIONS = {
+    'Customer': {'type': 'string', 'required': True},
+    'Customer RO': {'type': 'string', 'required': True},
+    'Customer Pre Work PN': {'type': 'string', 'required': True},
+    'Customer Pre Work SN': {'type': 'string', 'required': True},
+    'Description': {'type': 'string', 'required': True},
+    'Customer Supplier Code': {'type': 'string', 'required': True},
+    'Priority - PDR/TDR': {'type': 'numeric', 'required': True},
+    'Supplier Name': {'type': 'string', 'required': True},
+    'Last Quote ID': {'type': 'string', 'required': False},  # Can be empty
+    'RO Create Date': {'type': 'date', 'required': True},
+    'RO Close Date': {'type': 'date', 'required': True},
+}
+
+# Number of data rows read at a time in streaming mode
+DEFAULT_CHUNK_SIZE = 50000
+
+# Number of rows handed out at a time by the ExcelData iterators
+DEFAULT_BATCH_SIZE = 10000
+
+# Rows per Parquet row group, Arrow record batch or CSV block when exporting
+DEFAULT_EXPORT_ROWS = 65536
+
+# Export formats and their file extensions
+EXPORT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+# Shared string tables larger than this (as uncompressed XML) are kept in a
+# temporary file instead of in memory by the xml reader
+SHARED_STRINGS_SPILL_BYTES = 256 * 1024 * 1024
+
+# Rows validated by a quick check, and how long it may spend reading the sheet
+DEFAULT_SAMPLE_SIZE = 10000
+DEFAULT_QUICK_CHECK_SECONDS = 10.0
+
+# Files from this size on get a quick check before the full validation in main()
+QUICK_CHECK_MIN_BYTES = 5 * 1024 * 1024
+
+# Maximum number of offending cell values kept in an ErrorIndex
+DEFAULT_MAX_ERROR_VALUES = 1000
+
+# Sheet row number of the first data row (row 1 is the header)
+FIRST_DATA_ROW = 2
+
+# Where parsed workbooks are cached, and how large the cache may grow
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.excel_handler', 'cache')
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Rows looked at to decide whether a date column repeats enough to convert each distinct value once
+DATE_SAMPLE_ROWS = 1000
+
+# String columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Columns that identify a repair order across resubmissions of a file
+ROW_KEY_COLUMNS = ['Customer RO', 'Customer Pre Work SN']
+
+# Where incremental validation keeps the state of previously validated files, and how large it may grow
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser('~'), '.excel_handler', 'state')
+DEFAULT_STATE_MAX_BYTES = 256 * 1024 * 1024
+
+# Directories for the parse cache and incremental state of the interactive tool,
+# from the EXCEL_HANDLER_CACHE_DIR and EXCEL_HANDLER_STATE_DIR environment
+# variables; None (unset) turns them off
+INTERACTIVE_CACHE_DIR = os.environ.get('EXCEL_HANDLER_CACHE_DIR') or None
+INTERACTIVE_STATE_DIR = os.environ.get('EXCEL_HANDLER_STATE_DIR') or None
+
+# Where the hash indexes of reference datasets are kept between runs
+DEFAULT_REFERENCE_DIR = os.path.join(os.path.expanduser('~'), '.excel_handler', 'references')
+
+# Column added to multi-sheet results, naming the sheet each row came from
+SHEET_COLUMN = 'Sheet'
+
+# Validation server address, jobs allowed to wait for a worker, and upload size limit
+DEFAULT_SERVER_HOST = '127.0.0.1'
+DEFAULT_SERVER_PORT = 8765
+DEFAULT_SERVER_QUEUE = 32
+DEFAULT_MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# Watch mode: seconds a file must stay unchanged before it is validated,
+# seconds between directory scans when polling, and files allowed to wait
+# for a worker before new files are held back
+DEFAULT_WATCH_SETTLE = 2.0
+DEFAULT_WATCH_POLL = 1.0
+DEFAULT_WATCH_QUEUE = 32
+
+# Seconds of finished files the watch mode throughput is measured over
+WATCH_RATE_WINDOW = 300
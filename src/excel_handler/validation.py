@@ -0,0 +1,918 @@
+"""
+Reading and validating workbooks: single files, sampled quick checks,
+and batches of files on a pool of worker processes.
+"""
+import contextlib
+import fnmatch
+import glob
+import importlib.util
+import io
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from ._lazy import np, pd
+from .settings import (
+    COLUMN_VALIDATIONS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_QUICK_CHECK_SECONDS,
+    DEFAULT_SAMPLE_SIZE,
+    EXPECTED_COLUMNS,
+    EXPORT_FORMATS,
+    SHEET_COLUMN,
+)
+from .instrumentation import Instrumentation, NO_INSTRUMENTATION
+from .readers import READER_BACKENDS, read_excel_header, select_backend
+from .engine import (
+    DuplicateIndex,
+    ErrorIndex,
+    ValidationEngine,
+    ValidationResult,
+    _budget_message,
+    format_data_type_errors,
+    validate_columns,
+)
+from .data import ExcelData, LazyExcelData, OutOfCoreExcelData, _ExportSpill, _SpillWriter
+from .cache import IncrementalValidator, ParsedCache, load_sheet
+
+def read_and_validate_excel(file_path, expected_columns=None, column_validations=None,
+                            chunk_size=None, return_errors=False, cache=None, incremental=None,
+                            typed=False, instrument=None, backend=None, columns=None, sheets=None,
+                            workers=None, parsed=None, max_errors=None, spill_dir=None, source_name=None,
+                            keep_for_export=False):
+    """
+    Read and validate an Excel file.
+    
+    Args:
+        file_path: path to the Excel file
+        expected_columns: list of expected column names (optional)
+        column_validations: dict of column validation rules (optional)
+        chunk_size: if given, stream the file in chunks of this many rows
+            instead of loading it all at once (optional)
+        return_errors: if True, also return the ErrorIndex of failing cells
+        cache: ParsedCache for parsed sheets; not used when streaming (optional)
+        incremental: IncrementalValidator that re-validates only rows changed
+            since the file was last validated; not used when streaming (optional)
+        typed: if True, convert the columns to compact dtypes implied by
+            column_validations (see ExcelData.convert_types)
+        instrument: Instrumentation that records the time and memory of each
+            stage; also set as the metrics of the returned object (optional)
+        backend: name of the reader backend, one of READER_BACKENDS
+            (default: the fastest one installed; with chunk_size or
+            spill_dir, the fastest one that streams)
+        columns: names of the columns to load, e.g. expected_columns to drop
+            extra columns while parsing instead of after (default: all).
+            Rows with values only in the skipped columns count as blank.
+        sheets: validate several sheets instead of only the first: a
+            glob-style pattern of sheet names such as 'Month*' ('*' for all
+            sheets) or a list of sheet names. The sheets are combined into
+            one ExcelData with a SHEET_COLUMN. Cannot be combined with
+            chunk_size; cache and incremental are not used (optional)
+        workers: threads validating sheets while later sheets are parsed
+            (default: number of CPU cores; only used with sheets)
+        parsed: the first sheet as already parsed with this backend and
+            columns, e.g. by QuickCheck.full; it is validated without
+            reading the file again. Not used with chunk_size or sheets
+            (optional)
+        max_errors: error budget; validation stops once this many errors
+            are found, e.g. 1 to stop after the first failing column. With
+            chunk_size, the rest of the file is not read either. With
+            sheets, each sheet has its own budget. Not used with
+            incremental (default: validate everything)
+        spill_dir: for sheets larger than memory: stream the sheet (in
+            chunks of chunk_size, default DEFAULT_CHUNK_SIZE rows) with a
+            streaming reader and write it to an Arrow IPC file in this
+            directory as it is validated. Returns an OutOfCoreExcelData
+            whose accessors memory-map that file. Needs pyarrow (optional)
+        source_name: name that identifies the file to incremental instead of
+            file_path, e.g. the client's name of an uploaded copy (optional)
+        keep_for_export: with chunk_size, also keep each chunk on disk as it
+            is validated, so LazyExcelData.export writes the data without
+            parsing the workbook again; call its close() to delete them.
+            Needs pyarrow, and is not used with spill_dir, whose
+            OutOfCoreExcelData exports from its spill file (optional)
+        
+    Returns:
+        ExcelData object if successful (LazyExcelData when streaming,
+        OutOfCoreExcelData with spill_dir), None if validation fails. With return_errors, a tuple of that and
+        the ErrorIndex (None if the data rows were never validated); with
+        sheets, a dict of sheet name -> ErrorIndex instead.
+    """
+    stages = instrument if instrument is not None else NO_INSTRUMENTATION
+    try:
+        if sheets is not None:
+            if chunk_size:
+                raise ValueError("Multi-sheet validation cannot be streamed; leave chunk_size unset")
+            excel_data, error_index = _read_and_validate_sheets(
+                file_path, expected_columns, column_validations, sheets, stages, backend, columns, workers,
+                max_errors)
+        elif chunk_size or spill_dir:
+            excel_data, error_index = _read_and_validate_streaming(
+                file_path, expected_columns, column_validations, chunk_size or DEFAULT_CHUNK_SIZE, stages,
+                backend, columns, max_errors, spill_dir, keep_for_export)
+        else:
+            excel_data, error_index = _read_and_validate_full(
+                file_path, expected_columns, column_validations, cache, incremental, typed, stages,
+                backend, columns, parsed, max_errors, source_name)
+    except FileNotFoundError:
+        print(f"\n✗ ERROR: File not found: {file_path}")
+        excel_data, error_index = None, None
+    except Exception as e:
+        print("\n✗ ERROR: Failed to read Excel file")
+        print(f"  Details: {str(e)}")
+        excel_data, error_index = None, None
+    
+    if excel_data is not None:
+        excel_data.metrics = instrument
+    if return_errors:
+        return excel_data, error_index
+    return excel_data
+
+def _read_and_validate_full(file_path, expected_columns, column_validations, cache, incremental, typed,
+                            instrument, backend=None, columns=None, parsed=None, max_errors=None,
+                            source_name=None):
+    """Load the whole sheet into memory, then validate it."""
+    print(f"\nReading file: {file_path}")
+    reader = select_backend(file_path, backend)
+    
+    # Reject files with the wrong header before parsing any data rows
+    if expected_columns and not _probe_and_validate_header(file_path, expected_columns, instrument):
+        return None, None
+    
+    # Read the Excel file
+    start = time.perf_counter()
+    with instrument.stage('read'):
+        df, from_cache = load_sheet(file_path, cache, reader.name, columns, parsed)
+    load_seconds = time.perf_counter() - start
+    
+    print("✓ File loaded successfully!")
+    print(f"  Found {len(df)} rows and {len(df.columns)} columns")
+    print(f"  Columns: {', '.join(df.columns.astype(str))}")
+    if parsed is None:
+        print(f"  Full load: {load_seconds:.2f} s{' (from cache)' if from_cache else f' (reader: {reader.name})'}")
+    
+    # Validate data types and format if validation rules are provided
+    validation = None
+    error_index = ErrorIndex(df.columns)
+    if column_validations:
+        print("\nValidating data types and format...")
+        engine = ValidationEngine(column_validations)
+        with instrument.stage('type_check'):
+            if incremental is not None:
+                validation = incremental.validate(df, file_path, engine, instrument, source_name)
+            else:
+                validation = engine.run(df, instrument=instrument, max_errors=max_errors)
+            error_index.add(validation, df)
+        _print_diff(validation.diff)
+        
+        if not validation.is_valid:
+            _print_data_errors(validation.errors(), error_index)
+            return None, error_index
+        else:
+            print("✓ Data type validation passed!")
+    
+    # Create and return ExcelData object
+    with instrument.stage('construct'):
+        excel_data = ExcelData(df, file_path, validation)
+        if typed:
+            before, after = excel_data.convert_types(column_validations or COLUMN_VALIDATIONS)
+    if typed:
+        print(f"  Memory: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB (typed columns)")
+    return excel_data, error_index
+
+def _probe_and_validate_header(file_path, expected_columns, instrument=NO_INSTRUMENTATION):
+    """
+    Read only the header row and validate it against expected_columns.
+    
+    Returns:
+        bool: True if the header passes validation
+    """
+    start = time.perf_counter()
+    with instrument.stage('header_probe'):
+        header = read_excel_header(file_path)
+    probe_seconds = time.perf_counter() - start
+    print(f"  Header probe: {probe_seconds * 1000:.1f} ms")
+    
+    with instrument.stage('column_check'):
+        is_valid, missing, extra = validate_columns(pd.DataFrame(columns=header), expected_columns)
+    
+    if not is_valid:
+        print("\n✗ ERROR: Column validation failed!")
+        print(f"  Expected columns: {', '.join(expected_columns)}")
+        print(f"  Missing columns: {', '.join(missing) if missing else 'None'}")
+        if extra:
+            print(f"  Extra columns found: {', '.join(extra)}")
+    else:
+        print("✓ Column validation passed!")
+        if extra:
+            print(f"  Note: Extra columns found: {', '.join(extra)}")
+    return is_valid
+
+def _print_diff(diff):
+    """Print the row changes found by incremental validation."""
+    if diff is None:
+        return
+    if not diff['previous_version']:
+        print("  No previous version of this file; validating all rows")
+        return
+    print(f"  Changes since last version: {len(diff['added'])} added, "
+          f"{len(diff['changed'])} changed, {len(diff['removed'])} removed, "
+          f"{diff['unchanged']} unchanged rows")
+
+def _print_data_errors(errors, error_index, limit=10):
+    """Print data validation errors and the first offending cells."""
+    print("\n✗ ERROR: Data validation failed!")
+    for error in errors:
+        print(f"  - {error}")
+    
+    offending = error_index.first(limit)
+    if offending:
+        print("\n  First offending cells:")
+        for cell in offending:
+            value = '(empty)' if cell['rule'] == 'required' else repr(cell['value'])
+            print(f"    Row {cell['row']}, '{cell['column']}': {value} ({cell['rule']})")
+    
+    groups = error_index.duplicate_groups()
+    if groups:
+        print(f"\n  Duplicate keys ({len(groups)}):")
+        for group in groups[:limit]:
+            key = ', '.join(f"{col}={value!r}" for col, value in group['key'].items())
+            print(f"    {key}: rows {', '.join(map(str, group['rows']))}")
+        if len(groups) > limit:
+            print(f"    ... and {len(groups) - limit} more")
+
+def _read_and_validate_streaming(file_path, expected_columns, column_validations, chunk_size, instrument,
+                                 backend=None, columns=None, max_errors=None, spill_dir=None,
+                                 keep_for_export=False):
+    """
+    Validate the sheet chunk by chunk with flat memory use.
+    
+    With spill_dir, each validated chunk is also written to an Arrow IPC
+    file, which is kept as an OutOfCoreExcelData if the file passes. With
+    keep_for_export, the chunks are kept for LazyExcelData.export instead.
+    """
+    print(f"\nReading file in chunks of {chunk_size} rows: {file_path}")
+    # A reader that loads the whole sheet up front would defeat the flat memory use
+    reader = select_backend(file_path, backend, streaming=True)
+    
+    # Validate the header before reading any data rows
+    if expected_columns and not _probe_and_validate_header(file_path, expected_columns, instrument):
+        return None, None
+    
+    start = time.perf_counter()
+    chunks = reader.iter_frames(file_path, chunk_size, columns)
+    with instrument.stage('read'):
+        chunk = next(chunks)
+    loaded_columns = list(chunk.columns)
+    
+    if column_validations:
+        print("\nValidating data types and format...")
+    
+    # Validate chunk by chunk, keeping only running error counts and the error index
+    engine = ValidationEngine(column_validations) if column_validations else None
+    # Keys of earlier chunks are kept, so duplicates across chunks are found too
+    duplicates = engine.duplicate_indexes() if engine else None
+    error_index = ErrorIndex(loaded_columns)
+    rows = 0
+    counts = {}
+    stopped = None
+    spill = None
+    if spill_dir:
+        spill = _SpillWriter(spill_dir, file_path, loaded_columns, column_validations or {})
+    elif keep_for_export and importlib.util.find_spec('pyarrow') is not None:
+        spill = _ExportSpill(column_validations or {})
+    try:
+        while chunk is not None:
+            result = None
+            if engine:
+                with instrument.stage('type_check'):
+                    result = engine.run(chunk, counts, instrument, duplicates=duplicates, row_offset=rows,
+                                        max_errors=max_errors)
+                    error_index.add(result, chunk, row_offset=rows)
+            rows += len(chunk)
+            if result is not None and result.stopped is not None:
+                # The file is rejected either way, so the rest of it is not parsed
+                stopped = result.stopped
+                chunks.close()
+                break
+            if spill is not None:
+                with instrument.stage('spill'):
+                    spill.write(chunk, result.coerced if result is not None else None)
+            with instrument.stage('read'):
+                chunk = next(chunks, None)
+        if isinstance(spill, _SpillWriter):
+            spill.close()
+    except BaseException:
+        if spill is not None:
+            spill.discard()
+        raise
+    
+    load_seconds = time.perf_counter() - start
+    
+    if stopped is not None:
+        print(f"✗ Stopped reading after {rows} rows: error budget of {stopped} reached")
+    else:
+        print("✓ File read successfully!")
+        print(f"  Found {rows} rows and {len(loaded_columns)} columns")
+    print(f"  Columns: {', '.join(loaded_columns)}")
+    print(f"  Full load (with validation): {load_seconds:.2f} s (reader: {reader.name})")
+    
+    if column_validations:
+        errors = format_data_type_errors(counts, column_validations)
+        if stopped is not None:
+            errors.append(_budget_message(stopped))
+        if errors:
+            if spill is not None:
+                spill.discard()
+            _print_data_errors(errors, error_index)
+            return None, error_index
+        else:
+            print("✓ Data type validation passed!")
+    
+    with instrument.stage('construct'):
+        if isinstance(spill, _SpillWriter):
+            print(f"  Spilled to: {spill.path} ({os.path.getsize(spill.path) / 1024 / 1024:.1f} MB)")
+            excel_data = OutOfCoreExcelData(file_path, spill.path, loaded_columns, rows, chunk_size,
+                                            rules=column_validations)
+        else:
+            excel_data = LazyExcelData(file_path, loaded_columns, rows, chunk_size, reader.name, columns,
+                                       rules=column_validations, export_spill=spill)
+    return excel_data, error_index
+
+def _read_and_validate_sheets(file_path, expected_columns, column_validations, sheets, instrument,
+                              backend=None, columns=None, workers=None, max_errors=None):
+    """
+    Validate several sheets of one workbook.
+    
+    The workbook is opened once. Each sheet is handed to a worker thread
+    for validation as soon as it is parsed, so validation overlaps with
+    parsing the next sheet.
+    """
+    print(f"\nReading workbook: {file_path}")
+    reader = select_backend(file_path, backend)
+    engine = ValidationEngine(column_validations) if column_validations else None
+    
+    with reader.open(file_path) as workbook:
+        names = _select_sheets(workbook.sheet_names, sheets)
+        if not names:
+            print(f"\n✗ ERROR: No sheets match: {sheets}")
+            print(f"  Sheets in workbook: {', '.join(workbook.sheet_names)}")
+            return None, {}
+        print(f"  Found {len(names)} sheets: {', '.join(names)} (reader: {reader.name})")
+        
+        workers = max(1, min(workers or os.cpu_count() or 1, len(names)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for name in names:
+                with instrument.stage(f'read:{name}'):
+                    df = workbook.read_frame(name, columns)
+                futures[name] = executor.submit(_validate_sheet, df, name, expected_columns, engine, max_errors)
+            with instrument.stage('type_check'):
+                results = {name: future.result() for name, future in futures.items()}
+    
+    passed = True
+    for name, (df, column_check, validation, error_index) in results.items():
+        print(f"\nSheet '{name}': {len(df)} rows and {len(df.columns)} columns")
+        is_valid, missing, extra = column_check
+        if not is_valid:
+            passed = False
+            print("✗ ERROR: Column validation failed!")
+            print(f"  Missing columns: {', '.join(missing)}")
+        elif validation is not None and not validation.is_valid:
+            passed = False
+            _print_data_errors(validation.errors(), error_index)
+        else:
+            print("✓ Sheet passed validation!")
+            if extra:
+                print(f"  Note: Extra columns found: {', '.join(map(str, extra))}")
+    
+    error_indexes = {name: error_index for name, (_, _, _, error_index) in results.items()}
+    if not passed:
+        return None, error_indexes
+    
+    with instrument.stage('construct'):
+        frames = [df for df, _, _, _ in results.values()]
+        combined = pd.concat(frames, ignore_index=True)
+        combined.insert(0, SHEET_COLUMN, pd.Categorical(
+            np.repeat(names, [len(df) for df in frames]), categories=names))
+        # Keep the values coerced during validation, so convert_types can reuse them
+        validations = [validation for _, _, validation, _ in results.values()]
+        coerced = {}
+        if all(validation is not None for validation in validations):
+            for col_name in validations[0].coerced:
+                if all(col_name in validation.coerced for validation in validations):
+                    coerced[col_name] = pd.concat(
+                        [validation.coerced[col_name] for validation in validations], ignore_index=True)
+        excel_data = ExcelData(combined, file_path, ValidationResult({}, {}, coerced, rules=column_validations))
+    print(f"\n✓ All {len(names)} sheets passed validation! ({len(combined)} rows)")
+    return excel_data, error_indexes
+
+def _select_sheets(sheet_names, sheets):
+    """Return the sheet names matching a glob-style pattern or in a list, in workbook order."""
+    if isinstance(sheets, str):
+        return [name for name in sheet_names if fnmatch.fnmatchcase(name, sheets)]
+    wanted = set(sheets)
+    return [name for name in sheet_names if name in wanted]
+
+def _validate_sheet(df, sheet, expected_columns, engine, max_errors=None):
+    """
+    Validate one parsed sheet; runs in a worker thread.
+    
+    Returns:
+        tuple: (df, (is_valid, missing, extra) column check, ValidationResult
+        or None, ErrorIndex)
+    """
+    error_index = ErrorIndex(df.columns, sheet=sheet)
+    column_check = validate_columns(df, expected_columns) if expected_columns else (True, [], [])
+    if not column_check[0] or engine is None:
+        return df, column_check, None, error_index
+    validation = engine.run(df, max_errors=max_errors)
+    error_index.add(validation, df)
+    return df, column_check, validation, error_index
+
+class QuickCheck:
+    """
+    Error rates of a sheet estimated from a random sample of its rows.
+    
+    The sheet is read in chunks until it ends or the time budget runs out.
+    A uniform random sample of the rows read so far is kept as it goes
+    (reservoir sampling: every row gets a random key and the rows with the
+    smallest keys form the sample), and only the sample is validated. Each
+    error rate comes with a Wilson score interval, which stays meaningful
+    when few or no errors were seen. 'unique' rules are not checked, as a
+    sample says little about duplicates.
+    
+    By default the sheet is read with the fastest streaming backend, so the
+    first rows arrive before the whole sheet is parsed and the time budget
+    holds. The chunks read are kept, so full() continues reading where the
+    check stopped instead of parsing the file again.
+    """
+    def __init__(self, file_path, expected_columns=None, column_validations=None, backend=None,
+                 columns=None, chunk_size=DEFAULT_BATCH_SIZE):
+        self.file_path = file_path
+        self.expected_columns = expected_columns
+        self.column_validations = column_validations
+        self.columns = columns
+        # The backend asked for, None to pick one
+        self.backend = backend
+        self.reader = select_backend(file_path, backend, streaming=True)
+        self.rows_scanned = 0
+        # True once the whole sheet has been read
+        self.complete = False
+        self.sample = None
+        self.result = None
+        self.seconds = 0.0
+        # Chunks read so far, and the rest of the sheet
+        self._parsed = []
+        self._chunks = self.reader.iter_frames(file_path, chunk_size, columns)
+    
+    def __repr__(self):
+        sampled = 0 if self.sample is None else len(self.sample)
+        return f"QuickCheck(sampled={sampled}, rows_scanned={self.rows_scanned}, complete={self.complete})"
+    
+    def run(self, sample_size=DEFAULT_SAMPLE_SIZE, time_budget=DEFAULT_QUICK_CHECK_SECONDS, seed=None):
+        """
+        Read the sheet until it ends or time_budget seconds have passed, then validate a sample.
+        
+        Args:
+            sample_size: number of rows to validate
+            time_budget: seconds to spend reading; at least one chunk is read
+            seed: random seed, so the same file gives the same sample (optional)
+            
+        Returns:
+            ValidationResult of the sample
+        """
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        sample, keys = None, np.empty(0)
+        while True:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.complete = True
+                break
+            self._parsed.append(chunk)
+            self.rows_scanned += len(chunk)
+            
+            sample = chunk if sample is None else pd.concat([sample, chunk])
+            keys = np.concatenate([keys, rng.random(len(chunk))])
+            if len(keys) > sample_size:
+                # Keep the smallest keys, in sheet order
+                keep = np.sort(np.argpartition(keys, sample_size)[:sample_size])
+                sample, keys = sample.iloc[keep], keys[keep]
+            if time.perf_counter() - start >= time_budget:
+                break
+        
+        self.sample = sample
+        engine = ValidationEngine(self.column_validations or {})
+        self.result = engine.run(sample, check_unique=False)
+        self.seconds = time.perf_counter() - start
+        return self.result
+    
+    def estimates(self, z=1.96):
+        """
+        Return the estimated share of failing rows per check.
+        
+        Args:
+            z: normal quantile of the confidence level (1.96 for 95%)
+            
+        Returns:
+            dict: (column, check) -> {'errors', 'rate', 'low', 'high'} for
+            every check that failed in the sample, plus ('*', 'any') for rows
+            failing any check. Rates are shares of the rows read; when every
+            row read was validated they are exact. A rate of None means the
+            column could not be checked at all.
+        """
+        estimates = {}
+        for key, count in self.result.counts.items():
+            estimates[key] = self._estimate(count, z)
+        if self.result.masks:
+            failing = np.logical_or.reduce(list(self.result.masks.values()))
+            estimates[('*', 'any')] = self._estimate(int(failing.sum()), z)
+        return estimates
+    
+    def _estimate(self, errors, z):
+        if errors is None:
+            return {'errors': None, 'rate': None, 'low': None, 'high': None}
+        sampled = len(self.sample)
+        rate = errors / sampled if sampled else 0.0
+        if sampled == self.rows_scanned:
+            low, high = rate, rate
+        else:
+            low, high = _wilson_interval(errors, sampled, z)
+        return {'errors': errors, 'rate': rate, 'low': low, 'high': high}
+    
+    def summary(self):
+        """Print the sample size and the estimated error rates."""
+        sampled = len(self.sample)
+        scope = "the whole sheet" if self.complete else f"the first {self.rows_scanned:,} rows (time budget reached)"
+        print("\n=== Quick Check ===")
+        print(f"Validated a sample of {sampled:,} rows from {scope} in {self.seconds:.2f} s")
+        
+        estimates = self.estimates()
+        if not estimates:
+            if sampled == self.rows_scanned:
+                print("✓ No errors found")
+            else:
+                high = _wilson_interval(0, sampled)[1]
+                print(f"✓ No errors in the sample; fewer than {high:.2%} of rows are likely to fail")
+            return
+        
+        print("✗ Errors in the sample (estimated share of rows, 95% confidence):")
+        for (col_name, check), estimate in estimates.items():
+            label = "Rows failing any check" if col_name == '*' else f"'{col_name}' {check}"
+            if estimate['rate'] is None:
+                print(f"  - {label}: column could not be checked")
+            elif estimate['low'] == estimate['high']:
+                print(f"  - {label}: {estimate['rate']:.2%} ({estimate['errors']} rows)")
+            else:
+                rows = f", about {round(estimate['rate'] * self.rows_scanned):,} rows" if self.complete else ''
+                print(f"  - {label}: {estimate['rate']:.2%} ({estimate['low']:.2%} to {estimate['high']:.2%}{rows})")
+    
+    def full(self, cache=None, incremental=None, typed=False, instrument=None, return_errors=False):
+        """
+        Validate every row, reusing the chunks the quick check already read.
+        
+        The rest of the sheet is read, the chunks are combined and passed to
+        read_and_validate_excel, which validates them the usual way. If the
+        check stopped early and a faster whole-sheet backend is installed
+        (e.g. calamine), that backend reads the file instead, as it parses
+        the whole sheet quicker than the streaming one reads the rest.
+        
+        Args:
+            cache, incremental, typed, instrument, return_errors: as for
+                read_and_validate_excel
+            
+        Returns:
+            as read_and_validate_excel
+        """
+        fastest = select_backend(self.file_path, self.backend)
+        if not self.complete and fastest is not self.reader:
+            self.close()
+            return read_and_validate_excel(
+                self.file_path, self.expected_columns, self.column_validations, cache=cache,
+                incremental=incremental, typed=typed, instrument=instrument, backend=fastest.name,
+                columns=self.columns, return_errors=return_errors)
+        
+        if not self.complete:
+            print(f"\nReading the rest of the sheet after row {self.rows_scanned:,}...")
+            start = time.perf_counter()
+            self._parsed.extend(self._chunks)
+            self.complete = True
+            print(f"  Read {sum(map(len, self._parsed)) - self.rows_scanned:,} more rows "
+                  f"in {time.perf_counter() - start:.2f} s")
+        parsed = _concat_chunks(self._parsed)
+        self._parsed = []
+        return read_and_validate_excel(
+            self.file_path, self.expected_columns, self.column_validations, cache=cache,
+            incremental=incremental, typed=typed, instrument=instrument, backend=self.reader.name,
+            columns=self.columns, return_errors=return_errors, parsed=parsed)
+    
+    def close(self):
+        """Stop reading the sheet and drop the chunks read so far."""
+        self._chunks.close()
+        self._parsed = []
+
+def quick_check(file_path, expected_columns=None, column_validations=None, sample_size=DEFAULT_SAMPLE_SIZE,
+                time_budget=DEFAULT_QUICK_CHECK_SECONDS, backend=None, columns=None, seed=None):
+    """
+    Estimate the error rates of an Excel file from a random sample of its rows.
+    
+    Meant as a fast first answer on very large files: the header is checked
+    in full, then the data rows are sampled within a time budget (see
+    QuickCheck). Call full() on the result to validate every row without
+    parsing the rows already read again.
+    
+    Args:
+        file_path: path to the Excel file
+        expected_columns: list of expected column names (optional)
+        column_validations: dict of column validation rules (optional)
+        sample_size: number of rows to validate
+        time_budget: seconds to spend reading the sheet
+        backend: name of the reader backend (default: the fastest one installed)
+        columns: names of the columns to load (default: all)
+        seed: random seed for the sample (optional)
+        
+    Returns:
+        QuickCheck, or None if the file could not be read or its header
+        failed validation
+    """
+    print(f"\nQuick check of: {file_path}")
+    try:
+        if expected_columns and not _probe_and_validate_header(file_path, expected_columns):
+            return None
+        check = QuickCheck(file_path, expected_columns, column_validations, backend, columns)
+        check.run(sample_size, time_budget, seed)
+    except FileNotFoundError:
+        print(f"\n✗ ERROR: File not found: {file_path}")
+        return None
+    except Exception as e:
+        print("\n✗ ERROR: Failed to read Excel file")
+        print(f"  Details: {str(e)}")
+        return None
+    check.summary()
+    return check
+
+def _wilson_interval(errors, n, z=1.96):
+    """Return the Wilson score interval (low, high) of the proportion errors / n."""
+    if n == 0:
+        return 0.0, 1.0
+    rate = errors / n
+    denominator = 1 + z * z / n
+    centre = (rate + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def _concat_chunks(chunks):
+    """
+    Combine DataFrame chunks of one sheet into the frame a single read gives.
+    
+    A column whose type differs between chunks (e.g. empty in one of them)
+    ends up as object; its type is inferred again over all rows.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks)
+    mixed = [col for col in df.columns if len({str(chunk[col].dtype) for chunk in chunks}) > 1]
+    if mixed:
+        df[mixed] = df[mixed].infer_objects()
+    return df
+
+def find_excel_files(target):
+    """
+    Find the Excel files named by a directory or a glob pattern.
+    
+    Args:
+        target: a directory (its .xlsx/.xls files are used) or a glob
+            pattern such as 'incoming/**/*.xlsx'
+        
+    Returns:
+        sorted list of file paths, without Excel lock files (~$...)
+    """
+    if os.path.isdir(target):
+        paths = [os.path.join(target, name) for name in os.listdir(target)]
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(path for path in paths if _is_excel_file(path))
+
+def _is_excel_file(path):
+    """Return True for an existing .xlsx/.xls file that is not an Excel lock file (~$...)."""
+    return (
+        path.lower().endswith(('.xlsx', '.xls'))
+        and not os.path.basename(path).startswith('~$')
+        and os.path.isfile(path)
+    )
+
+def validate_file_report(file_path, expected_columns=EXPECTED_COLUMNS,
+                         column_validations=COLUMN_VALIDATIONS, chunk_size=None, cache_dir=None,
+                         state_dir=None, backend=None, columns=None, sheets=None, key_indexes=False,
+                         export_dir=None, export_format='parquet', max_errors=None, source_name=None):
+    """
+    Validate one file without printing and return a structured result.
+    
+    This is the unit of work for batch mode, so it must stay a top-level
+    function that can be sent to worker processes.
+    
+    Args:
+        key_indexes: if True, also return the DuplicateIndex of each
+            'unique' rule, for find_cross_file_duplicates
+        export_dir: if given, write the data of a file that passes to this
+            directory, named after the file, in export_format. With
+            chunk_size, the chunks are kept on disk as they are validated
+            and exported from there
+        max_errors: error budget of read_and_validate_excel (optional)
+        source_name: name of the file when file_path is a temporary copy,
+            e.g. an upload; it keys the incremental state and names the
+            export and the result's 'file' (optional)
+    
+    Returns:
+        dict with 'file', 'passed', 'rows', 'seconds', 'error_counts'
+        ('column: rule' -> count, 'sheet!column: rule' with sheets),
+        'stopped_early' (True if the error budget ran out, so the counts
+        cover only the checks and rows up to that point),
+        'first_errors', every group of rows sharing a unique key in
+        'duplicates', incremental 'changes', per-stage timings in
+        'stages', the captured 'log' and, with export_dir, the 'export'
+        ('path', 'rows' and 'seconds', or 'error'); with key_indexes, 'key_indexes'
+        is a list of (file or 'file!sheet', {column: DuplicateIndex})
+    """
+    start = time.perf_counter()
+    log = io.StringIO()
+    instrument = Instrumentation()
+    with contextlib.redirect_stdout(log):
+        excel_data, error_index = read_and_validate_excel(
+            file_path, expected_columns, column_validations, chunk_size=chunk_size,
+            return_errors=True, cache=ParsedCache(cache_dir) if cache_dir else None,
+            incremental=IncrementalValidator(state_dir) if state_dir else None,
+            instrument=instrument, backend=backend, columns=columns, sheets=sheets,
+            max_errors=max_errors, source_name=source_name, keep_for_export=bool(export_dir))
+    
+    export = None
+    if export_dir and excel_data is not None:
+        export_path = os.path.join(export_dir, Path(source_name or file_path).stem + EXPORT_FORMATS[export_format])
+        export_start = time.perf_counter()
+        try:
+            os.makedirs(export_dir, exist_ok=True)
+            with instrument.stage('export'):
+                rows = excel_data.export(export_path, export_format, column_validations)
+            export = {'path': export_path, 'rows': rows,
+                      'seconds': round(time.perf_counter() - export_start, 3)}
+        except Exception as e:
+            export = {'path': export_path, 'error': str(e)}
+    if isinstance(excel_data, LazyExcelData):
+        excel_data.close()
+    
+    # Multi-sheet validation gives one ErrorIndex per sheet
+    if isinstance(error_index, dict):
+        error_indexes = list(error_index.values())
+        error_index = None
+    else:
+        error_indexes = [error_index] if error_index is not None else []
+    
+    result = {
+        'file': str(source_name or file_path),
+        'passed': excel_data is not None,
+        'rows': excel_data.rows if excel_data is not None else None,
+        'seconds': round(time.perf_counter() - start, 3),
+        'error_counts': {
+            f"{index.sheet + '!' if index.sheet is not None else ''}{column}: {rule}": count
+            for index in error_indexes
+            for (column, rule), count in index.counts().items()
+        },
+        'stopped_early': any(index.stopped is not None for index in error_indexes),
+        'first_errors': [error for index in error_indexes for error in index.first(10)][:10],
+        'duplicates': [group for index in error_indexes for group in index.duplicate_groups()],
+        'changes': _diff_summary(error_index.diff if error_index is not None else None),
+        'export': export,
+        'stages': instrument.to_list(),
+        'log': log.getvalue().strip().splitlines(),
+    }
+    if key_indexes:
+        result['key_indexes'] = [
+            (f"{file_path}!{index.sheet}" if index.sheet is not None else str(file_path), index.duplicates)
+            for index in error_indexes if index.duplicates
+        ]
+    return result
+
+def find_cross_file_duplicates(results):
+    """
+    Find unique keys that occur in more than one file of a batch.
+    
+    Merges the 'key_indexes' of validate_file_report results (removing
+    them from the results, as they are not JSON) into one DuplicateIndex
+    per 'unique' rule. Only the key hashes, first rows and values of each
+    file's distinct keys are combined, so memory grows with the number of
+    unique keys across all files.
+    
+    Returns:
+        list of duplicate groups, each with the 'column' of the rule, the
+        'key' values and 'files' mapping each file to the first sheet row
+        with the key
+    """
+    combined = {}
+    for result in results:
+        for source, indexes in result.pop('key_indexes', []):
+            for col_name, index in indexes.items():
+                if col_name not in combined:
+                    combined[col_name] = DuplicateIndex(index.key_columns)
+                combined[col_name].merge(index, source)
+    return [
+        {'column': col_name, **group}
+        for col_name, index in combined.items()
+        for group in index.groups()
+    ]
+
+def _diff_summary(diff):
+    """Make an incremental diff JSON-friendly for a batch report."""
+    if diff is None:
+        return None
+    return {
+        'previous_version': diff['previous_version'],
+        'added_rows': diff['added'].tolist(),
+        'changed_rows': diff['changed'].tolist(),
+        'removed_keys': [list(key) for key in diff['removed']],
+        'unchanged': diff['unchanged'],
+    }
+
+def validate_batch(file_paths, workers=None, expected_columns=EXPECTED_COLUMNS,
+                   column_validations=COLUMN_VALIDATIONS, chunk_size=None, cache_dir=None,
+                   state_dir=None, backend=None, columns=None, sheets=None, key_indexes=False,
+                   export_dir=None, export_format='parquet', max_errors=None):
+    """
+    Validate many files in parallel across CPU cores.
+    
+    Args:
+        file_paths: list of Excel file paths
+        workers: number of worker processes (default: number of CPU cores)
+        expected_columns: list of expected column names
+        column_validations: dict of column validation rules
+        chunk_size: stream each file in chunks of this many rows (optional)
+        cache_dir: directory of a ParsedCache shared by the workers (optional)
+        state_dir: directory of IncrementalValidator state (optional)
+        backend: name of the reader backend (default: the fastest available)
+        columns: names of the columns to load (default: all columns)
+        sheets: sheet name pattern to validate several sheets per file (optional)
+        key_indexes: keep each file's unique key indexes in its result,
+            for find_cross_file_duplicates
+        export_dir: directory to export the data of passing files to (optional)
+        export_format: 'parquet', 'arrow' or 'csv'
+        max_errors: stop validating a file once this many errors are
+            found; with chunk_size, its parse stops too (optional)
+        
+    Returns:
+        list of result dicts from validate_file_report, in file_paths order
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(file_paths) or 1))
+    results = {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(validate_file_report, path, expected_columns, column_validations,
+                            chunk_size, cache_dir, state_dir, backend, columns, sheets, key_indexes,
+                            export_dir, export_format, max_errors): path
+            for path in file_paths
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'file': str(path), 'passed': False, 'rows': None, 'seconds': None,
+                          'error_counts': {}, 'stopped_early': False, 'first_errors': [], 'duplicates': [],
+                          'changes': None, 'export': None, 'stages': [], 'log': [f"Worker failed: {e}"]}
+            results[path] = result
+            mark = '✓' if result['passed'] else '✗'
+            print(f"[{done}/{len(file_paths)}] {mark} {path}")
+    
+    return [results[path] for path in file_paths]
+
+def write_batch_report(results, report_path, seconds=None, cross_file_duplicates=None):
+    """Write batch results and a pass/fail summary to a JSON file."""
+    passed = sum(1 for result in results if result['passed'])
+    report = {
+        'summary': {
+            'files': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+            'seconds': round(seconds, 3) if seconds is not None else None,
+        },
+        'files': results,
+    }
+    if cross_file_duplicates is not None:
+        report['summary']['cross_file_duplicates'] = len(cross_file_duplicates)
+        report['cross_file_duplicates'] = cross_file_duplicates
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+
+def _warm_worker():
+    """Run in each new worker process so the first real job does not pay for imports."""
+    df = pd.DataFrame({col: [None] for col in EXPECTED_COLUMNS})
+    ValidationEngine(COLUMN_VALIDATIONS).run(df)
+    for backend in READER_BACKENDS.values():
+        backend.available()
+
+def _worker_ready():
+    return os.getpid()
@@ -0,0 +1,384 @@
+"""
+Daemon that validates Excel files dropped into watched directories.
+"""
+import collections
+import ctypes
+import ctypes.util
+import datetime
+import functools
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .settings import (
+    DEFAULT_WATCH_POLL,
+    DEFAULT_WATCH_QUEUE,
+    DEFAULT_WATCH_SETTLE,
+    WATCH_RATE_WINDOW,
+)
+from .validation import _is_excel_file, _warm_worker, find_excel_files, validate_file_report
+
+class FolderWatcher:
+    """
+    Daemon that validates Excel files dropped into watched directories.
+    
+    New and changed .xlsx/.xls files are noticed through inotify on Linux
+    and by polling the directories elsewhere. A file is only picked up once
+    its size and modification time have not changed for settle seconds, so
+    files still being copied in are left alone. Ready files are validated
+    by a pool of worker processes running validate_file_report. At most
+    workers + max_queue files are handed to the pool at a time; the others
+    wait in a backlog. Each validated file is moved to passed_dir or
+    failed_dir (default: 'passed' and 'failed' folders in its directory),
+    with its report next to it as <file name>.json. metrics() gives the
+    throughput and queue depth, for sizing the pool.
+    
+    When a worker process dies (e.g. killed for using too much memory),
+    the pool is replaced. Every file handed to the broken pool fails with
+    it, so those files are validated again one at a time; a file that
+    crashes its worker while it runs alone is moved to the failed folder.
+    """
+    def __init__(self, directories, passed_dir=None, failed_dir=None, workers=None,
+                 max_queue=DEFAULT_WATCH_QUEUE, settle=DEFAULT_WATCH_SETTLE, poll_interval=DEFAULT_WATCH_POLL,
+                 use_inotify=True, metrics_path=None, **options):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.passed_dir = passed_dir
+        self.failed_dir = failed_dir
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.settle = settle
+        self.poll_interval = poll_interval
+        # JSON file the metrics are written to while running, if any
+        self.metrics_path = metrics_path
+        # Options for validate_file_report, e.g. column_validations, chunk_size
+        self.options = options
+        self.notifier = None
+        if use_inotify:
+            try:
+                self.notifier = _Inotify(self.directories)
+            except (OSError, AttributeError):
+                self.notifier = None
+        self._executor = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        # path -> (signature, time it was first seen with that signature)
+        self._pending = {}
+        # path -> (signature, time it was handed to the pool)
+        self._in_flight = {}
+        self._counts = {'passed': 0, 'failed': 0, 'errors': 0, 'pool_restarts': 0}
+        # Files cut short by a crashed worker, to be validated again on their own
+        self._suspects = set()
+        # The suspect being validated on its own, if any
+        self._isolated = None
+        # (time finished, rows, validation seconds, seconds since handed to the pool)
+        self._finished = collections.deque()
+        self._started = None
+        self._metrics_written = 0.0
+    
+    def __repr__(self):
+        watcher = 'inotify' if self.notifier is not None else 'polling'
+        return f"FolderWatcher(directories={self.directories}, workers={self.workers}, watcher={watcher})"
+    
+    def run(self):
+        """Watch the directories and validate the files dropped in them until stop() is called."""
+        self._started = time.monotonic()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        try:
+            # Files that arrived while the watcher was not running
+            self._scan(self._list_files())
+            while not self._stop.is_set():
+                if self.notifier is not None:
+                    changed = self.notifier.wait(self.poll_interval)
+                    if changed is None:
+                        # Events were lost, so look at everything again
+                        changed = self._list_files()
+                else:
+                    self._stop.wait(self.poll_interval)
+                    changed = self._list_files()
+                self._scan(changed)
+                self._submit_ready()
+                self._write_metrics()
+        finally:
+            self._stop.set()
+            # Files still waiting for a worker stay where they are for the next run
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            if self.notifier is not None:
+                self.notifier.close()
+            self._write_metrics(force=True)
+    
+    def stop(self):
+        """Make run() return once the files being validated are done; safe from signal handlers."""
+        self._stop.set()
+    
+    def metrics(self):
+        """
+        Return the current throughput and queue depth.
+        
+        Returns:
+            dict with 'workers', 'capacity' (files the pool takes at a
+            time), 'running', 'queued' (handed to the pool, waiting for a
+            worker), 'backlog' (ready but held back as the pool is full),
+            'queue_depth' (queued + backlog), 'settling' (still being
+            written), the 'processed', 'passed', 'failed' and 'errors'
+            totals, 'pool_restarts' after crashed workers, and over the
+            last WATCH_RATE_WINDOW seconds
+            'files_per_minute', 'rows_per_second' per worker, the average
+            validation 'average_seconds' and 'average_latency_seconds'
+            from being handed to the pool to being moved
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._finished and now - self._finished[0][0] > WATCH_RATE_WINDOW:
+                self._finished.popleft()
+            recent = list(self._finished)
+            in_flight = len(self._in_flight)
+            backlog = sum(1 for _, since in self._pending.values() if now - since >= self.settle)
+            settling = len(self._pending) - backlog
+            counts = dict(self._counts)
+        
+        window = min(WATCH_RATE_WINDOW, now - self._started) if self._started is not None else 0
+        # Failed files have no row count, so only the others give a rate
+        rows = sum(rows for _, rows, _, _ in recent)
+        rows_seconds = sum(seconds for _, rows, seconds, _ in recent if rows)
+        seconds = sum(seconds for _, _, seconds, _ in recent)
+        queued = max(0, in_flight - self.workers)
+        return {
+            'watcher': 'inotify' if self.notifier is not None else 'polling',
+            'uptime_seconds': round(now - self._started, 1) if self._started is not None else 0.0,
+            'workers': self.workers,
+            'capacity': self.workers + self.max_queue,
+            'running': min(in_flight, self.workers),
+            'queued': queued,
+            'backlog': backlog,
+            'queue_depth': queued + backlog,
+            'settling': settling,
+            'processed': counts['passed'] + counts['failed'],
+            **counts,
+            'files_per_minute': round(len(recent) * 60 / window, 2) if window > 0 else 0.0,
+            'rows_per_second': round(rows / rows_seconds) if rows_seconds > 0 else None,
+            'average_seconds': round(seconds / len(recent), 3) if recent else None,
+            'average_latency_seconds': (
+                round(sum(latency for _, _, _, latency in recent) / len(recent), 3) if recent else None),
+        }
+    
+    def _list_files(self):
+        return [path for directory in self.directories for path in find_excel_files(directory)]
+    
+    def _scan(self, paths):
+        """Note new or changed files, restarting their settle time."""
+        now = time.monotonic()
+        with self._lock:
+            for path in paths:
+                if path in self._in_flight or not _is_excel_file(path):
+                    continue
+                signature = _file_signature(path)
+                pending = self._pending.get(path)
+                if signature is not None and (pending is None or pending[0] != signature):
+                    self._pending[path] = (signature, now)
+    
+    def _submit_ready(self):
+        """Hand the files that have settled to the pool, oldest first, while it has room."""
+        now = time.monotonic()
+        with self._lock:
+            ready = []
+            for path, (signature, since) in list(self._pending.items()):
+                current = _file_signature(path)
+                if current is None:
+                    # Deleted or moved away before it settled
+                    del self._pending[path]
+                    self._suspects.discard(path)
+                elif current != signature:
+                    self._pending[path] = (current, now)
+                elif now - since >= self.settle:
+                    ready.append((path, signature))
+            
+            # Files cut short by a crashed worker go first, each on its own once
+            # the pool is empty, so a file that crashes its worker again is known
+            suspects = [(path, signature) for path, signature in ready if path in self._suspects]
+            if self._isolated is not None or suspects:
+                if suspects and not self._in_flight:
+                    self._isolated = suspects[0][0]
+                    self._submit(*suspects[0])
+                return
+            for path, signature in ready:
+                if len(self._in_flight) >= self.workers + self.max_queue:
+                    break
+                self._submit(path, signature)
+    
+    def _submit(self, path, signature):
+        """Hand one settled file to the pool, replacing the pool if a worker died."""
+        del self._pending[path]
+        self._in_flight[path] = (signature, time.monotonic())
+        try:
+            future = self._executor.submit(validate_file_report, path, **self.options)
+        except BrokenProcessPool:
+            self._restart_pool()
+            future = self._executor.submit(validate_file_report, path, **self.options)
+        future.add_done_callback(functools.partial(self._done, path))
+    
+    def _restart_pool(self):
+        """Replace a pool that stopped working because one of its processes died."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self._counts['pool_restarts'] += 1
+        print("✗ A worker process crashed; started a new worker pool")
+    
+    def _done(self, path, future):
+        """Move a validated file and its report; runs on the pool's callback thread."""
+        with self._lock:
+            signature, submitted = self._in_flight.pop(path)
+            isolated = self._isolated == path
+            if isolated:
+                self._isolated = None
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None and self._stop.is_set():
+            # Workers interrupted by Ctrl+C; the file is validated on the next run
+            return
+        if _file_signature(path) != signature:
+            # Replaced while it was validated, so the new version is validated instead
+            self._scan([path])
+            return
+        
+        crashed = isinstance(error, BrokenProcessPool)
+        if crashed and not isolated:
+            # Every file in the pool fails when one worker dies, so this one may
+            # not be the cause; it is validated again on its own
+            with self._lock:
+                self._suspects.add(path)
+            self._scan([path])
+            return
+        with self._lock:
+            self._suspects.discard(path)
+        
+        if error is not None:
+            reason = ("Worker process crashed while validating this file (e.g. it ran out of memory)"
+                      if crashed else f"Worker failed: {error}")
+            result = {'file': path, 'passed': False, 'rows': None, 'seconds': None, 'log': [reason]}
+        else:
+            result = future.result()
+        try:
+            destination = self._move(path, result)
+        except OSError as e:
+            with self._lock:
+                self._counts['errors'] += 1
+            print(f"✗ Could not move {path}: {str(e)}")
+            return
+        
+        with self._lock:
+            self._counts['passed' if result['passed'] else 'failed'] += 1
+            if error is not None:
+                self._counts['errors'] += 1
+            self._finished.append((time.monotonic(), result['rows'] or 0, result['seconds'] or 0.0,
+                                   time.monotonic() - submitted))
+        metrics = self.metrics()
+        mark = '✓' if result['passed'] else '✗'
+        print(f"{mark} {path} -> {destination} ({result['rows'] or 0} rows, {result['seconds'] or 0:.2f} s) | "
+              f"running {metrics['running']}, queue depth {metrics['queue_depth']}, "
+              f"{metrics['files_per_minute']} files/min")
+    
+    def _move(self, path, result):
+        """Move a file to the passed or failed folder and write its report next to it."""
+        folder = 'passed' if result['passed'] else 'failed'
+        target_dir = (self.passed_dir if result['passed'] else self.failed_dir) or os.path.join(
+            os.path.dirname(path), folder)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.exists(target):
+            # Keep earlier versions of a resubmitted file
+            stem, suffix = os.path.splitext(os.path.basename(path))
+            target = os.path.join(target_dir, f"{stem}.{datetime.datetime.now():%Y%m%d-%H%M%S-%f}{suffix}")
+        shutil.move(path, target)
+        with open(target + '.json', 'w', encoding='utf-8') as f:
+            json.dump(dict(result, file=target, received=path), f, indent=2, default=str)
+        return target
+    
+    def _write_metrics(self, force=False):
+        """Write the metrics file, at most once a second unless forced."""
+        if not self.metrics_path or (not force and time.monotonic() - self._metrics_written < 1.0):
+            return
+        self._metrics_written = time.monotonic()
+        temp_path = f"{self.metrics_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.metrics(), time=datetime.datetime.now().isoformat(timespec='seconds')), f, indent=2)
+        os.replace(temp_path, self.metrics_path)
+
+def _file_signature(path):
+    """Return (size, modification time) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class _Inotify:
+    """
+    Linux inotify, through ctypes, for files written to or moved into directories.
+    
+    Raises OSError where inotify is not available, so callers can fall
+    back to polling.
+    """
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000
+    # struct inotify_event: wd, mask, cookie, len, then len bytes of name
+    EVENT = struct.Struct('iIII')
+    
+    def __init__(self, directories):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        # IN_NONBLOCK and IN_CLOEXEC have the values of O_NONBLOCK and O_CLOEXEC
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not start inotify")
+        self.directories = {}
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for directory in directories:
+            watch = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if watch < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, f"Could not watch {directory}")
+            self.directories[watch] = directory
+    
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for changes.
+        
+        Returns:
+            set of the paths that changed, or None if the kernel dropped
+            events and the directories must be scanned again
+        """
+        paths = set()
+        lost = False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                watch, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    lost = True
+                elif name and watch in self.directories:
+                    paths.add(os.path.join(self.directories[watch], os.fsdecode(name)))
+        return None if lost else paths
+    
+    def close(self):
+        os.close(self.fd)
@@ -1,71 +1,50 @@
+import argparse
+import multiprocessing
 import os
+import signal
 import sys
-import pandas as pd
-from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog
+import threading
+import time
 
-# Expected column format for Optix PDR TDR - Digitization Priority
-EXPECTED_COLUMNS = [
-    'Customer',
-    'Customer RO',
-    'Customer Pre Work PN',
-    'Customer Pre Work SN',
-    'Description',
-    'Customer Supplier Code',
-    'Priority - PDR/TDR',
-    'Supplier Name',
-    'Last Quote ID',
-    'RO Create Date',
-    'RO Close Date',
-]
+from excel_handler.settings import (
+    COLUMN_VALIDATIONS,
+    DEFAULT_SERVER_HOST,
+    DEFAULT_SERVER_PORT,
+    DEFAULT_SERVER_QUEUE,
+    DEFAULT_WATCH_POLL,
+    DEFAULT_WATCH_QUEUE,
+    DEFAULT_WATCH_SETTLE,
+    EXPECTED_COLUMNS,
+    EXPORT_FORMATS,
+    INTERACTIVE_CACHE_DIR,
+    INTERACTIVE_STATE_DIR,
+    QUICK_CHECK_MIN_BYTES,
+)
+from excel_handler.readers import READER_BACKENDS
+from excel_handler.engine import load_config
+from excel_handler.cache import IncrementalValidator, ParsedCache
+from excel_handler.validation import (
+    find_cross_file_duplicates,
+    find_excel_files,
+    quick_check,
+    read_and_validate_excel,
+    validate_batch,
+    write_batch_report,
+)
+from excel_handler.server import ValidationServer
+from excel_handler.watcher import FolderWatcher
 
-# Column data type expectations and validation rules
-COLUMN_VALIDATIONS = {
-    'Customer': {'type': 'string', 'required': True},
-    'Customer RO': {'type': 'string', 'required': True},
-    'Customer Pre Work PN': {'type': 'string', 'required': True},
-    'Customer Pre Work SN': {'type': 'string', 'required': True},
-    'Description': {'type': 'string', 'required': True},
-    'Customer Supplier Code': {'type': 'string', 'required': True},
-    'Priority - PDR/TDR': {'type': 'numeric', 'required': True},
-    'Supplier Name': {'type': 'string', 'required': True},
-    'Last Quote ID': {'type': 'string', 'required': False},  # Can be empty
-    'RO Create Date': {'type': 'date', 'required': True},
-    'RO Close Date': {'type': 'date', 'required': True},
-}
+# Everything the package offers, so scripts can keep importing it from main
+from excel_handler import *  # noqa: F401,F403
 
-class ExcelData:
-    """Class to hold the extracted Excel data."""
-    def __init__(self, dataframe, file_path):
-        self.dataframe = dataframe
-        self.file_path = file_path
-        self.rows = len(dataframe)
-        self.columns = list(dataframe.columns)
-        
-    def __repr__(self):
-        return f"ExcelData(rows={self.rows}, columns={self.columns})"
-    
-    def get_data(self):
-        """Return the dataframe."""
-        return self.dataframe
-    
-    def to_dict(self):
-        """Convert dataframe to dictionary."""
-        return self.dataframe.to_dict('records')
-    
-    def summary(self):
-        """Print a summary of the data."""
-        print(f"\n=== Data Summary ===")
-        print(f"File: {self.file_path}")
-        print(f"Total rows: {self.rows}")
-        print(f"Columns: {', '.join(self.columns)}")
-        print(f"\nFirst 5 rows:")
-        print(self.dataframe.head())
 
 def select_file_dialog():
     """Open a file dialog to select an Excel file."""
     try:
+        # Imported here so that headless runs never load Tk
+        import tkinter as tk
+        from tkinter import filedialog
+        
         # Create a hidden root window
         root = tk.Tk()
         root.withdraw()
@@ -86,145 +65,201 @@ def select_file_dialog():
         print(f"Error opening file dialog: {str(e)}")
         return None
 
-def validate_columns(df, expected_columns):
+def _config_from_args(args):
     """
-    Validate that the dataframe has the expected columns.
+    Return (expected_columns, column_validations) from --config, or the built-in ones.
     
-    Args:
-        df: pandas DataFrame
-        expected_columns: list of expected column names
-        
-    Returns:
-        tuple: (is_valid, missing_columns, extra_columns)
+    Prints the problem and returns None if the config file cannot be used.
     """
-    if not expected_columns:
-        # If no expected columns defined, accept any columns
-        return True, [], []
-    
-    actual_columns = set(df.columns)
-    expected_set = set(expected_columns)
+    if not args.config:
+        return EXPECTED_COLUMNS, COLUMN_VALIDATIONS
+    try:
+        return load_config(args.config)
+    except Exception as e:
+        print(f"✗ ERROR: Could not load config file: {args.config}")
+        print(f"  Details: {str(e)}")
+        return None
+
+def run_batch(args):
+    """Run the 'batch' command."""
+    config = _config_from_args(args)
+    if config is None:
+        return 1
+    expected_columns, column_validations = config
     
-    missing_columns = expected_set - actual_columns
-    extra_columns = actual_columns - expected_set
+    file_paths = find_excel_files(args.target)
+    if not file_paths:
+        print(f"✗ ERROR: No Excel files found for: {args.target}")
+        return 1
     
-    is_valid = len(missing_columns) == 0
+    print(f"Validating {len(file_paths)} files...")
+    start = time.perf_counter()
+    results = validate_batch(file_paths, args.workers, expected_columns, column_validations,
+                             chunk_size=args.chunk_size, cache_dir=args.cache_dir, state_dir=args.state_dir,
+                             backend=args.backend, columns=expected_columns if args.only_expected else None,
+                             sheets=args.sheets, key_indexes=args.unique_across_files,
+                             export_dir=args.export_dir, export_format=args.export_format,
+                             max_errors=1 if args.fail_fast else args.max_errors)
+    cross_file_duplicates = find_cross_file_duplicates(results) if args.unique_across_files else None
+    seconds = time.perf_counter() - start
     
-    return is_valid, list(missing_columns), list(extra_columns)
+    write_batch_report(results, args.report, seconds, cross_file_duplicates)
+    failed = sum(1 for result in results if not result['passed'])
+    print(f"\n{len(results) - failed} passed, {failed} failed in {seconds:.1f} s")
+    if cross_file_duplicates:
+        print(f"{len(cross_file_duplicates)} unique keys occur in more than one file")
+    print(f"Report written to: {args.report}")
+    return 1 if failed or cross_file_duplicates else 0
 
-def validate_data_types(df, column_validations):
-    """
-    Validate data types and required fields in the dataframe.
+def run_serve(args):
+    """Run the 'serve' command."""
+    config = _config_from_args(args)
+    if config is None:
+        return 1
+    expected_columns, column_validations = config
     
-    Args:
-        df: pandas DataFrame
-        column_validations: dict of column validation rules
-        
-    Returns:
-        tuple: (is_valid, errors_list)
-    """
-    errors = []
+    server = ValidationServer(
+        args.host, args.port, workers=args.workers, max_queue=args.queue,
+        expected_columns=expected_columns, column_validations=column_validations,
+        backend=args.backend, cache_dir=args.cache_dir, state_dir=args.state_dir,
+        columns=expected_columns if args.only_expected else None,
+    )
+    print(f"Starting {server.workers} workers...")
+    server.warm_up()
+    # Stop cleanly when a service manager sends SIGTERM; shutdown() must not run on the serving thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Listening on {server.address} (queue: {server.max_queue}). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print("\nStopped.")
+    return 0
+
+def run_watch(args):
+    """Run the 'watch' command."""
+    config = _config_from_args(args)
+    if config is None:
+        return 1
+    expected_columns, column_validations = config
     
-    for col_name, rules in column_validations.items():
-        if col_name not in df.columns:
-            continue
-            
-        col_data = df[col_name]
-        expected_type = rules.get('type', 'string')
-        is_required = rules.get('required', True)
-        
-        # Check for required fields
-        if is_required:
-            null_count = col_data.isna().sum()
-            if null_count > 0:
-                errors.append(f"Column '{col_name}' has {null_count} empty/null values (required field)")
-        
-        # Check data types (only for non-null values)
-        non_null_data = col_data.dropna()
-        if len(non_null_data) > 0:
-            if expected_type == 'numeric':
-                # Check if values can be converted to numeric
-                try:
-                    pd.to_numeric(non_null_data, errors='coerce')
-                    non_numeric = pd.to_numeric(non_null_data, errors='coerce').isna().sum()
-                    if non_numeric > 0:
-                        errors.append(f"Column '{col_name}' has {non_numeric} non-numeric values")
-                except:
-                    errors.append(f"Column '{col_name}' should contain numeric values")
-                    
-            elif expected_type == 'date':
-                # Check if values can be converted to datetime
-                try:
-                    pd.to_datetime(non_null_data, errors='coerce')
-                    non_date = pd.to_datetime(non_null_data, errors='coerce').isna().sum()
-                    if non_date > 0:
-                        errors.append(f"Column '{col_name}' has {non_date} invalid date values")
-                except:
-                    errors.append(f"Column '{col_name}' should contain date values")
+    missing = [directory for directory in args.directories if not os.path.isdir(directory)]
+    if missing:
+        print(f"✗ ERROR: Not a directory: {', '.join(missing)}")
+        return 1
     
-    is_valid = len(errors) == 0
-    return is_valid, errors
+    watcher = FolderWatcher(
+        args.directories, passed_dir=args.passed_dir, failed_dir=args.failed_dir, workers=args.workers,
+        max_queue=args.queue, settle=args.settle, poll_interval=args.poll_interval,
+        use_inotify=not args.poll, metrics_path=args.metrics_file,
+        expected_columns=expected_columns, column_validations=column_validations,
+        chunk_size=args.chunk_size, cache_dir=args.cache_dir, state_dir=args.state_dir, backend=args.backend,
+        columns=expected_columns if args.only_expected else None,
+        max_errors=1 if args.fail_fast else args.max_errors,
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    mode = 'inotify' if watcher.notifier is not None else f'polling every {watcher.poll_interval:g} s'
+    print(f"Watching {', '.join(watcher.directories)} with {watcher.workers} workers ({mode}). "
+          f"Press Ctrl+C to stop.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    metrics = watcher.metrics()
+    print(f"\nStopped. {metrics['passed']} passed, {metrics['failed']} failed.")
+    return 0
 
-def read_and_validate_excel(file_path, expected_columns=None, column_validations=None):
-    """
-    Read and validate an Excel file.
+def build_arg_parser():
+    """Build the parser for the non-interactive commands."""
+    parser = argparse.ArgumentParser(
+        prog='Excel_Handler',
+        description="Validate Excel files. Run without arguments for the interactive tool.",
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
     
-    Args:
-        file_path: path to the Excel file
-        expected_columns: list of expected column names (optional)
-        column_validations: dict of column validation rules (optional)
-        
-    Returns:
-        ExcelData object if successful, None if validation fails
-    """
-    try:
-        # Read the Excel file
-        print(f"\nReading file: {file_path}")
-        df = pd.read_excel(file_path)
-        
-        print(f"✓ File loaded successfully!")
-        print(f"  Found {len(df)} rows and {len(df.columns)} columns")
-        print(f"  Columns: {', '.join(df.columns.astype(str))}")
-        
-        # Validate columns if expected columns are provided
-        if expected_columns:
-            is_valid, missing, extra = validate_columns(df, expected_columns)
-            
-            if not is_valid:
-                print("\n✗ ERROR: Column validation failed!")
-                print(f"  Expected columns: {', '.join(expected_columns)}")
-                print(f"  Missing columns: {', '.join(missing) if missing else 'None'}")
-                if extra:
-                    print(f"  Extra columns found: {', '.join(extra)}")
-                return None
-            else:
-                print("✓ Column validation passed!")
-                if extra:
-                    print(f"  Note: Extra columns found: {', '.join(extra)}")
-        
-        # Validate data types and format if validation rules are provided
-        if column_validations:
-            print("\nValidating data types and format...")
-            is_valid, errors = validate_data_types(df, column_validations)
-            
-            if not is_valid:
-                print("\n✗ ERROR: Data validation failed!")
-                for error in errors:
-                    print(f"  - {error}")
-                return None
-            else:
-                print("✓ Data type validation passed!")
-        
-        # Create and return ExcelData object
-        excel_data = ExcelData(df, file_path)
-        return excel_data
-        
-    except FileNotFoundError:
-        print(f"\n✗ ERROR: File not found: {file_path}")
-        return None
-    except Exception as e:
-        print(f"\n✗ ERROR: Failed to read Excel file")
-        print(f"  Details: {str(e)}")
-        return None
+    batch = commands.add_parser('batch', help="validate a directory or glob of workbooks in parallel")
+    batch.add_argument('target', help="directory or glob pattern, e.g. 'incoming/*.xlsx'")
+    batch.add_argument('--report', default='validation_report.json', help="path of the JSON report")
+    batch.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU cores)")
+    batch.add_argument('--chunk-size', type=int, default=None, help="stream files in chunks of this many rows")
+    batch.add_argument('--cache-dir', default=None, help="cache parsed workbooks in this directory")
+    batch.add_argument('--state-dir', default=None,
+                       help="re-validate only rows changed since the last run, keeping state here")
+    batch.add_argument('--backend', default='auto', choices=['auto'] + list(READER_BACKENDS),
+                       help="reader backend (default: the fastest one installed)")
+    batch.add_argument('--sheets', default=None, metavar='PATTERN',
+                       help="validate every sheet matching this pattern, e.g. 'Month*' or '*' for all")
+    batch.add_argument('--only-expected', action='store_true',
+                       help="load only the expected columns; extra columns are skipped while parsing")
+    batch.add_argument('--config', default=None,
+                       help="Python file setting EXPECTED_COLUMNS and COLUMN_VALIDATIONS (see config_example.py)")
+    batch.add_argument('--unique-across-files', action='store_true',
+                       help="also report 'unique' keys that occur in more than one file")
+    batch.add_argument('--export-dir', default=None,
+                       help="write the data of every file that passes to this directory")
+    batch.add_argument('--export-format', default='parquet', choices=list(EXPORT_FORMATS),
+                       help="format of exported files (default: %(default)s)")
+    batch.add_argument('--max-errors', type=int, default=None, metavar='N',
+                       help="stop validating a file after N errors; with --chunk-size its parse stops too")
+    batch.add_argument('--fail-fast', action='store_true',
+                       help="stop validating a file after its first failing column (same as --max-errors 1)")
+    batch.set_defaults(handler=run_batch)
+    
+    serve = commands.add_parser('serve', help="run a local HTTP validation service with warm workers")
+    serve.add_argument('--host', default=DEFAULT_SERVER_HOST, help="address to listen on (default: %(default)s)")
+    serve.add_argument('--port', type=int, default=DEFAULT_SERVER_PORT, help="port to listen on (default: %(default)s)")
+    serve.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU cores)")
+    serve.add_argument('--queue', type=int, default=DEFAULT_SERVER_QUEUE,
+                       help="jobs that may wait for a worker before requests are refused (default: %(default)s)")
+    serve.add_argument('--cache-dir', default=None, help="cache parsed workbooks in this directory")
+    serve.add_argument('--state-dir', default=None,
+                       help="re-validate only rows changed since the last run, keeping state here")
+    serve.add_argument('--backend', default='auto', choices=['auto'] + list(READER_BACKENDS),
+                       help="reader backend (default: the fastest one installed)")
+    serve.add_argument('--only-expected', action='store_true',
+                       help="load only the expected columns; extra columns are skipped while parsing")
+    serve.add_argument('--config', default=None,
+                       help="Python file setting EXPECTED_COLUMNS and COLUMN_VALIDATIONS (see config_example.py)")
+    serve.set_defaults(handler=run_serve)
+    
+    watch = commands.add_parser('watch', help="validate files dropped into folders and sort them into passed/failed")
+    watch.add_argument('directories', nargs='+', help="folders to watch (files in subfolders are not picked up)")
+    watch.add_argument('--passed-dir', default=None,
+                       help="where files that pass are moved (default: 'passed' in their folder)")
+    watch.add_argument('--failed-dir', default=None,
+                       help="where files that fail are moved (default: 'failed' in their folder)")
+    watch.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU cores)")
+    watch.add_argument('--queue', type=int, default=DEFAULT_WATCH_QUEUE,
+                       help="files that may wait for a worker before new ones are held back (default: %(default)s)")
+    watch.add_argument('--settle', type=float, default=DEFAULT_WATCH_SETTLE,
+                       help="seconds a file must stay unchanged before it is validated (default: %(default)s)")
+    watch.add_argument('--poll', action='store_true', help="poll the folders instead of using inotify")
+    watch.add_argument('--poll-interval', type=float, default=DEFAULT_WATCH_POLL,
+                       help="seconds between checks of the folders (default: %(default)s)")
+    watch.add_argument('--metrics-file', default=None,
+                       help="keep throughput and queue depth metrics in this JSON file")
+    watch.add_argument('--chunk-size', type=int, default=None, help="stream files in chunks of this many rows")
+    watch.add_argument('--cache-dir', default=None, help="cache parsed workbooks in this directory")
+    watch.add_argument('--state-dir', default=None,
+                       help="re-validate only rows changed since the last run, keeping state here")
+    watch.add_argument('--backend', default='auto', choices=['auto'] + list(READER_BACKENDS),
+                       help="reader backend (default: the fastest one installed)")
+    watch.add_argument('--only-expected', action='store_true',
+                       help="load only the expected columns; extra columns are skipped while parsing")
+    watch.add_argument('--max-errors', type=int, default=None, metavar='N',
+                       help="stop validating a file after N errors; with --chunk-size its parse stops too")
+    watch.add_argument('--fail-fast', action='store_true',
+                       help="stop validating a file after its first failing column (same as --max-errors 1)")
+    watch.add_argument('--config', default=None,
+                       help="Python file setting EXPECTED_COLUMNS and COLUMN_VALIDATIONS (see config_example.py)")
+    watch.set_defaults(handler=run_watch)
+    
+    return parser
+
+def run_cli(argv):
+    """Run a non-interactive command and return its exit code."""
+    args = build_arg_parser().parse_args(argv)
+    return args.handler(args)
 
 def main():
     """Main function to run the Excel Handler application."""
@@ -239,6 +274,15 @@ def main():
         print(f"  Required columns: {', '.join(EXPECTED_COLUMNS)}")
         print()
     
+    # When turned on with the environment variables, files picked again after "Try again?"
+    # are not parsed a second time, and resubmitted files only have their changed rows re-validated
+    cache = ParsedCache(INTERACTIVE_CACHE_DIR) if INTERACTIVE_CACHE_DIR else None
+    incremental = IncrementalValidator(INTERACTIVE_STATE_DIR) if INTERACTIVE_STATE_DIR else None
+    if cache is not None:
+        print(f"Parsed workbooks are cached in: {INTERACTIVE_CACHE_DIR}")
+    if incremental is not None:
+        print(f"Validation state is kept in: {INTERACTIVE_STATE_DIR}")
+    
     while True:
         try:
             print("\nHow would you like to select your Excel file?")
@@ -285,7 +329,28 @@ def main():
                 continue
             
             # Read and validate the Excel file
-            excel_data = read_and_validate_excel(file_path, EXPECTED_COLUMNS, COLUMN_VALIDATIONS)
+            # Extra columns are reported by the header check but never loaded
+            if os.path.getsize(file_path) >= QUICK_CHECK_MIN_BYTES:
+                # Large files get a sampled check first; the rows it read are
+                # reused if the operator goes on to the full validation
+                check = quick_check(file_path, EXPECTED_COLUMNS, COLUMN_VALIDATIONS, columns=EXPECTED_COLUMNS)
+                if check is None:
+                    excel_data = None
+                else:
+                    try:
+                        run_full = input("\nRun the full validation? (y/n): ").strip().lower()
+                    except EOFError:
+                        check.close()
+                        print("\n\nInput stream closed. Exiting...")
+                        break
+                    if run_full != 'y':
+                        check.close()
+                        continue
+                    excel_data = check.full(cache=cache, incremental=incremental)
+            else:
+                excel_data = read_and_validate_excel(file_path, EXPECTED_COLUMNS, COLUMN_VALIDATIONS,
+                                                     cache=cache, incremental=incremental,
+                                                     columns=EXPECTED_COLUMNS)
             
             if excel_data:
                 print("\n" + "=" * 60)
@@ -295,6 +360,7 @@ def main():
                 
                 # Here you can process the data further
                 # Example: data_dict = excel_data.to_dict()
+                # Example: for records in excel_data.iter_records(): ...
                 # Example: df = excel_data.get_data()
                 
                 print("\n✓ Data is ready for processing!")
@@ -341,4 +407,8 @@ def main():
         pass
 
 if __name__ == "__main__":
+    # Needed for worker processes in the PyInstaller executable
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
@@ -38,6 +38,8 @@ if excel_data:
     print(f"Access methods available:")
     print(f"  - excel_data.get_data() -> DataFrame")
     print(f"  - excel_data.to_dict() -> List of dictionaries")
+    print(f"  - excel_data.iter_records() -> Batches of dictionaries")
+    print(f"  - excel_data.to_arrow_batches() -> pyarrow RecordBatches")
     print(f"  - excel_data.summary() -> Print summary")
     
     # Show sample data
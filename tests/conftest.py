@@ -0,0 +1,74 @@
+"""
+Shared fixtures for the Excel Handler tests.
+
+Workbooks are written with openpyxl into pytest's temporary directories,
+so the tests need no files of their own.
+"""
+import datetime
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from excel_handler import COLUMN_VALIDATIONS, EXPECTED_COLUMNS
+
+
+def write_workbook(path, rows, header=EXPECTED_COLUMNS, sheets=None):
+    """
+    Write a workbook with one sheet of rows under header.
+    
+    Args:
+        path: where to write the .xlsx file
+        rows: list of row value lists
+        header: header row
+        sheets: dict of sheet name -> rows, to write several sheets instead
+        
+    Returns:
+        path
+    """
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, sheet_rows in (sheets or {'Sheet1': rows}).items():
+        sheet = workbook.create_sheet(name)
+        sheet.append(list(header))
+        for row in sheet_rows:
+            sheet.append(list(row))
+    workbook.save(path)
+    return str(path)
+
+
+def optix_row(number, **values):
+    """Return a valid row of the Optix template, with some values replaced by column name."""
+    row = {
+        'Customer': f"Customer {number % 5}",
+        'Customer RO': f"RO-{number:05d}",
+        'Customer Pre Work PN': f"PN-{number:05d}",
+        'Customer Pre Work SN': f"SN-{number:05d}",
+        'Description': f"Part {number}",
+        'Customer Supplier Code': f"SC-{number % 3}",
+        'Priority - PDR/TDR': number % 4 + 1,
+        'Supplier Name': f"Supplier {number % 3}",
+        'Last Quote ID': f"Q-{number}",
+        'RO Create Date': datetime.datetime(2023, 1, 1) + datetime.timedelta(days=number),
+        'RO Close Date': datetime.datetime(2023, 2, 1) + datetime.timedelta(days=number),
+    }
+    row.update(values)
+    return [row[col] for col in EXPECTED_COLUMNS]
+
+
+@pytest.fixture
+def optix_file(tmp_path):
+    """Return a factory writing an Optix workbook of optix_row rows."""
+    def make(rows=20, name='optix.xlsx', changes=None):
+        changes = changes or {}
+        return write_workbook(tmp_path / name, [optix_row(i, **changes.get(i, {})) for i in range(rows)])
+    return make
+
+
+@pytest.fixture
+def rules():
+    """Return a copy of the built-in validation rules that tests may change."""
+    return {col: dict(rules) for col, rules in COLUMN_VALIDATIONS.items()}
@@ -0,0 +1,81 @@
+"""Tests of batch mode: validate_file_report, validate_batch and the batch command."""
+import json
+
+import main
+from conftest import optix_row, write_workbook
+from excel_handler import (
+    EXPECTED_COLUMNS,
+    find_cross_file_duplicates,
+    find_excel_files,
+    validate_batch,
+    validate_file_report,
+)
+
+
+def test_file_report(optix_file, rules):
+    path = optix_file(rows=12, changes={4: {'Priority - PDR/TDR': 'high'}})
+    result = validate_file_report(path, EXPECTED_COLUMNS, rules)
+    assert result['passed'] is False
+    assert result['error_counts'] == {'Priority - PDR/TDR: numeric': 1}
+    assert result['first_errors'] == [{'row': 6, 'column': 'Priority - PDR/TDR', 'rule': 'numeric', 'value': 'high'}]
+    assert not result['stopped_early']
+    assert any('Priority - PDR/TDR' in line for line in result['log'])
+    # The report is sent between processes and written as JSON
+    json.dumps(result)
+
+
+def test_batch_keeps_the_order_of_the_files(tmp_path, optix_file, rules):
+    paths = [optix_file(rows=5, name=f"file{i}.xlsx", changes={1: {'Customer': None}} if i == 1 else None)
+             for i in range(3)]
+    results = validate_batch(paths, workers=2, expected_columns=EXPECTED_COLUMNS, column_validations=rules)
+    assert [result['file'] for result in results] == paths
+    assert [result['passed'] for result in results] == [True, False, True]
+    assert find_excel_files(str(tmp_path)) == paths
+
+
+def test_batch_command_writes_a_report(tmp_path, optix_file):
+    optix_file(rows=5, name='good.xlsx')
+    write_workbook(tmp_path / 'bad.xlsx', [optix_row(0, **{'RO Create Date': 'someday'})])
+    report_path = tmp_path / 'report.json'
+    assert main.run_cli(['batch', str(tmp_path), '--report', str(report_path), '--workers', '1']) == 1
+    
+    report = json.loads(report_path.read_text())
+    assert report['summary']['files'] == 2
+    assert report['summary']['passed'] == 1
+    failed = [result for result in report['files'] if not result['passed']]
+    assert failed[0]['file'].endswith('bad.xlsx')
+    assert failed[0]['error_counts'] == {'RO Create Date: date': 1}
+
+
+def test_batch_command_reports_a_bad_config(tmp_path, optix_file, capsys):
+    optix_file()
+    config = tmp_path / 'config.py'
+    config.write_text("COLUMN_VALIDATIONS = {'Customer': {'type': 'string', 'minimum': 1}}\n")
+    assert main.run_cli(['batch', str(tmp_path), '--config', str(config), '--report', str(tmp_path / 'r.json')]) == 1
+    assert "Could not load config file" in capsys.readouterr().out
+    assert not (tmp_path / 'r.json').exists()
+
+
+def test_keys_shared_between_files(tmp_path, optix_file, rules):
+    rules['Customer RO']['unique'] = ['Customer Pre Work SN']
+    first = optix_file(rows=5, name='first.xlsx')
+    shared = {'Customer RO': 'RO-00001', 'Customer Pre Work SN': 'SN-00001'}
+    second = write_workbook(tmp_path / 'second.xlsx', [optix_row(i, **(shared if i == 13 else {})) for i in range(10, 15)])
+    results = validate_batch([first, second], workers=2, expected_columns=EXPECTED_COLUMNS,
+                             column_validations=rules, key_indexes=True)
+    # Each file on its own has unique keys
+    assert all(result['passed'] for result in results)
+    duplicates = find_cross_file_duplicates(results)
+    assert duplicates == [{
+        'column': 'Customer RO',
+        'key': {'Customer RO': 'RO-00001', 'Customer Pre Work SN': 'SN-00001'},
+        'files': {first: [3], second: [5]},
+    }]
+    assert all('key_indexes' not in result for result in results)
+
+
+def test_fail_fast_report_is_marked_as_stopped_early(optix_file, rules):
+    changes = {i: {'Customer': None, 'Priority - PDR/TDR': 'high'} for i in range(5)}
+    result = validate_file_report(optix_file(rows=12, changes=changes), EXPECTED_COLUMNS, rules, max_errors=1)
+    assert result['stopped_early']
+    assert result['error_counts'] == {'Customer: required': 5}
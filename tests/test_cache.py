@@ -0,0 +1,74 @@
+"""Tests of the on-disk cache of parsed sheets."""
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from excel_handler import ParsedCache, load_sheet
+
+pytest.importorskip('pyarrow')
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'main.py')
+
+
+def test_unchanged_file_is_loaded_from_the_cache(tmp_path, optix_file):
+    cache = ParsedCache(str(tmp_path / 'cache'))
+    path = optix_file()
+    df, cached = load_sheet(path, cache=cache)
+    assert not cached
+    again, cached = load_sheet(path, cache=cache)
+    assert cached
+    pd.testing.assert_frame_equal(again, df)
+
+
+def test_mixed_columns_are_not_cached(tmp_path):
+    cache = ParsedCache(str(tmp_path / 'cache'))
+    assert not cache.store('mixed', pd.DataFrame({'Priority': [1, 'n/a', 2.5]}))
+    assert cache.load('mixed') is None
+    assert os.listdir(tmp_path / 'cache') == []
+
+
+def test_pickled_entries_are_never_loaded(tmp_path):
+    cache = ParsedCache(str(tmp_path / 'cache'))
+    os.makedirs(cache.cache_dir)
+    pd.DataFrame({'a': [1]}).to_pickle(os.path.join(cache.cache_dir, 'old.pkl'))
+    assert cache.load('old') is None
+    # and they are cleared out by the next store
+    assert cache.store('new', pd.DataFrame({'a': [1]}))
+    assert os.listdir(cache.cache_dir) == ['new.feather']
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    frame = pd.DataFrame({'a': range(1000)})
+    cache = ParsedCache(str(tmp_path / 'cache'))
+    cache.store('first', frame)
+    cache.max_bytes = os.path.getsize(os.path.join(cache.cache_dir, 'first.feather')) * 3 // 2
+    cache.store('second', frame)
+    assert cache.load('first') is None
+    assert cache.load('second') is not None
+
+
+def run_interactive(path, home, **env):
+    """Pick path twice in the interactive tool, answering "Try again?" with y, and return its output."""
+    answers = f"2\n{path}\ny\n2\n{path}\nn\n\n"
+    env = dict(os.environ, HOME=str(home), USERPROFILE=str(home), **env)
+    return subprocess.run([sys.executable, MAIN], input=answers, capture_output=True, text=True, env=env,
+                          encoding='utf-8', timeout=120).stdout
+
+
+def test_interactive_tool_uses_the_cache_set_in_the_environment(tmp_path, optix_file):
+    path = optix_file(changes={3: {'Customer': None}})
+    output = run_interactive(path, tmp_path, EXCEL_HANDLER_CACHE_DIR=str(tmp_path / 'cache'))
+    assert output.count("Column 'Customer' has 1 empty/null values") == 2
+    assert output.count("(from cache)") == 1
+    assert os.listdir(tmp_path / 'cache')
+
+
+def test_interactive_tool_keeps_nothing_on_disk_by_default(tmp_path, optix_file):
+    path = optix_file(changes={3: {'Customer': None}})
+    env = {name: '' for name in ('EXCEL_HANDLER_CACHE_DIR', 'EXCEL_HANDLER_STATE_DIR')}
+    output = run_interactive(path, tmp_path, **env)
+    assert "(from cache)" not in output
+    assert not (tmp_path / '.excel_handler').exists()
@@ -0,0 +1,135 @@
+"""Tests of ExcelData: typed columns and the ways of reading the rows."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from excel_handler import COLUMN_VALIDATIONS, EXPECTED_COLUMNS, ExcelData, RowView, read_and_validate_excel
+
+
+def test_typed_mode_gives_compact_columns(optix_file, rules):
+    data = read_and_validate_excel(optix_file(rows=40), EXPECTED_COLUMNS, rules, typed=True)
+    dtypes = data.dataframe.dtypes
+    # Five customers in 40 rows: a categorical
+    assert isinstance(dtypes['Customer'], pd.CategoricalDtype)
+    assert sorted(data.dataframe['Customer'].cat.categories) == [f"Customer {i}" for i in range(5)]
+    # Priorities 1 to 4 fit in one byte
+    assert dtypes['Priority - PDR/TDR'] == 'int8'
+    assert dtypes['RO Create Date'].kind == 'M'
+    assert data.dataframe['RO Create Date'].iloc[3] == pd.Timestamp(2023, 1, 4)
+    # Every value is distinct, so a categorical would not save anything
+    assert not isinstance(dtypes['Customer RO'], pd.CategoricalDtype)
+    assert data.dataframe['Customer RO'].tolist() == [f"RO-{i:05d}" for i in range(40)]
+
+
+def test_convert_types_reports_the_memory_saved(optix_file, rules):
+    data = read_and_validate_excel(optix_file(rows=40), EXPECTED_COLUMNS, rules)
+    before, after = data.convert_types(rules)
+    assert before > after == data.memory_usage()
+
+
+def test_numbers_get_the_smallest_exact_dtype():
+    df = pd.DataFrame({
+        'small': [1, 2, 3],
+        'large': [1, 2, 70000],
+        'halves': [0.5, 1.5, None],
+        'precise': [0.1, 0.2, 0.3],
+        'huge': [1e20, 1.0, 2.0],
+    })
+    data = ExcelData(df, 'numbers.xlsx')
+    data.convert_types({col: {'type': 'numeric'} for col in df.columns})
+    assert data.dataframe.dtypes.astype(str).to_dict() == {
+        'small': 'int8', 'large': 'int32', 'halves': 'float32', 'precise': 'float64', 'huge': 'float64',
+    }
+    assert data.dataframe['huge'].iloc[0] == 1e20
+    assert data.dataframe['precise'].tolist() == [0.1, 0.2, 0.3]
+
+
+def test_columns_that_do_not_convert_are_kept_as_they_are():
+    """convert_types on unvalidated data leaves a column alone rather than lose the values it cannot convert."""
+    df = pd.DataFrame({
+        'Priority': [1, 'urgent', 3],
+        'Opened': [datetime.datetime(2023, 1, 2), 'last week', None],
+        'Closed': ['2023-01-05', None, '2023-01-07'],
+        'Notes': ['a', 'a', 'a'],
+    })
+    data = ExcelData(df.copy(), 'unvalidated.xlsx')
+    data.convert_types({
+        'Priority': {'type': 'numeric'},
+        'Opened': {'type': 'date'},
+        'Closed': {'type': 'date'},
+        'Missing': {'type': 'numeric'},
+    })
+    pd.testing.assert_series_equal(data.dataframe['Priority'], df['Priority'])
+    pd.testing.assert_series_equal(data.dataframe['Opened'], df['Opened'])
+    assert data.dataframe['Closed'].dtype.kind == 'M'
+    # Columns without rules are not touched
+    assert data.dataframe['Notes'].dtype == df['Notes'].dtype
+    assert list(data.dataframe.columns) == list(df.columns)
+
+
+def test_built_in_rules_are_the_default(optix_file, rules):
+    data = read_and_validate_excel(optix_file(rows=10), EXPECTED_COLUMNS, rules)
+    data.convert_types()
+    assert {col for col, dtype in data.dataframe.dtypes.items() if dtype.kind == 'M'} == {
+        col for col, col_rules in COLUMN_VALIDATIONS.items() if col_rules['type'] == 'date'
+    }
+
+
+@pytest.fixture(params=['in_memory', 'typed', 'streamed'])
+def excel_data(request, optix_file, rules):
+    """The same 25 validated rows as ExcelData, typed ExcelData and LazyExcelData."""
+    options = {'typed': True} if request.param == 'typed' else {'chunk_size': 10} if request.param == 'streamed' else {}
+    return read_and_validate_excel(optix_file(rows=25), EXPECTED_COLUMNS, rules, **options)
+
+
+def python_values(records):
+    return [{col: (type(value), value) for col, value in record.items()} for record in records]
+
+
+def test_iter_records_gives_what_to_dict_gives(excel_data):
+    batches = list(excel_data.iter_records(batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    records = [record for batch in batches for record in batch]
+    assert python_values(records) == python_values(excel_data.to_dict())
+    assert records[3]['Customer RO'] == 'RO-00003'
+    assert records[3]['RO Create Date'] == pd.Timestamp(2023, 1, 4)
+
+
+def test_rows_hold_the_same_values_and_types_as_the_records(excel_data):
+    rows = list(excel_data.iter_rows(batch_size=10))
+    assert len(rows) == 25
+    assert python_values(row.as_dict() for row in rows) == python_values(excel_data.to_dict())
+    assert type(rows[3]['Priority - PDR/TDR']) is int
+    assert type(rows[3]['RO Create Date']) is pd.Timestamp
+
+
+def test_row_view_is_indexed_by_name_or_position():
+    row = RowView({'Name': 0, 'Count': 1}, ('a', 2))
+    assert row['Count'] == row[1] == row[np.int64(1)] == row[-1] == 2
+    assert row.get('Count') == 2 and row.get('Price', 0.0) == 0.0
+    assert len(row) == 2
+    assert row.as_dict() == {'Name': 'a', 'Count': 2}
+    with pytest.raises(KeyError):
+        row['Price']
+
+
+def test_arrow_batches_hold_the_rows(excel_data):
+    pa = pytest.importorskip('pyarrow')
+    batches = list(excel_data.to_arrow_batches(batch_size=10))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    table = pa.Table.from_batches(batches)
+    assert table.column_names == EXPECTED_COLUMNS
+    assert table.column('Customer RO').to_pylist() == [f"RO-{i:05d}" for i in range(25)]
+    assert table.column('RO Create Date')[3].as_py() == datetime.datetime(2023, 1, 4)
+
+
+def test_numpy_records(optix_file, rules):
+    data = read_and_validate_excel(optix_file(rows=25), EXPECTED_COLUMNS, rules, typed=True)
+    records = data.to_numpy_records()
+    assert len(records) == 25
+    assert list(records.dtype.names) == EXPECTED_COLUMNS
+    assert records['Priority - PDR/TDR'].dtype == np.int8
+    assert records['Priority - PDR/TDR'].tolist() == [i % 4 + 1 for i in range(25)]
+    assert records[3]['RO Create Date'] == np.datetime64('2023-01-04')
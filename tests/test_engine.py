@@ -0,0 +1,184 @@
+"""Tests of the vectorized ValidationEngine."""
+import datetime
+import functools
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from excel_handler import (
+    EXPECTED_COLUMNS,
+    DuplicateIndex,
+    ErrorIndex,
+    ReferenceIndex,
+    ValidationEngine,
+    load_config,
+    load_reference,
+)
+from excel_handler import engine as engine_module
+from excel_handler.engine import _coerce_date, _coerce_date_values
+
+
+@pytest.mark.parametrize('dtype', [object, 'str'])
+def test_pattern_uses_one_regex_engine_for_every_dtype(dtype):
+    """Python's re matches Arabic-Indic digits with \\d, whichever dtype the column has."""
+    engine = ValidationEngine({'Code': {'type': 'string', 'required': False, 'pattern': r'\d+'}})
+    df = pd.DataFrame({'Code': pd.Series(['123', '٣٤٥', 'A1', None], dtype=dtype)})
+    result = engine.run(df)
+    assert result.counts == {('Code', 'pattern'): 1}
+    assert result.masks[('Code', 'pattern')].tolist() == [False, False, True, False]
+
+
+def test_repeated_dates_are_converted_like_distinct_ones():
+    """Converting each distinct date once gives what converting every cell gives."""
+    values = [datetime.datetime(2023, 1, 1 + i % 3) for i in range(60)] + ['2023-02-01', 'not a date', None] * 5
+    col_data = pd.Series(values, dtype=object)
+    converted = _coerce_date(col_data)
+    expected = _coerce_date_values(col_data)
+    pd.testing.assert_series_equal(converted, expected)
+    assert converted.isna().sum() == 10
+
+
+def test_error_index_rows_and_first_values():
+    engine = ValidationEngine({'Name': {'type': 'string'}, 'Count': {'type': 'numeric'}})
+    error_index = ErrorIndex(['Name', 'Count'], max_values=2)
+    for offset in (0, 3):
+        df = pd.DataFrame({'Name': ['a', None, 'c'], 'Count': [1, 'x', 'y']}, index=range(offset, offset + 3))
+        error_index.add(engine.run(df), df, row_offset=offset)
+    assert len(error_index) == 6
+    assert error_index.counts() == {('Name', 'required'): 2, ('Count', 'numeric'): 4}
+    assert error_index.sheet_rows(column='Count').tolist() == [3, 4, 6, 7]
+    assert error_index.sheet_rows(rule='required').tolist() == [3, 6]
+    # Only the first max_values errors keep their raw value
+    assert error_index.first() == [
+        {'row': 3, 'column': 'Name', 'rule': 'required', 'value': None},
+        {'row': 3, 'column': 'Count', 'rule': 'numeric', 'value': 'x'},
+    ]
+
+
+def test_value_rules():
+    engine = ValidationEngine({
+        'Priority': {'type': 'numeric', 'min': 1, 'max': 4},
+        'Status': {'type': 'string', 'allowed': ['open', 'closed']},
+        'Opened': {'type': 'date'},
+        'Closed': {'type': 'date', 'required': False, 'not_before': 'Opened'},
+    })
+    df = pd.DataFrame({
+        'Priority': [1, 5, 0, 'high'],
+        'Status': ['open', 'closed', 'pending', 'open'],
+        'Opened': pd.to_datetime(['2023-01-02', '2023-01-02', '2023-01-02', '2023-01-02']),
+        'Closed': pd.to_datetime(['2023-01-03', '2023-01-01', None, '2023-01-02']),
+    })
+    result = engine.run(df)
+    assert result.counts == {
+        ('Priority', 'numeric'): 1,
+        ('Priority', 'range'): 2,
+        ('Status', 'allowed'): 1,
+        ('Closed', 'order'): 1,
+    }
+    assert result.masks[('Priority', 'range')].tolist() == [False, True, True, False]
+    assert result.masks[('Closed', 'order')].tolist() == [False, True, False, False]
+
+
+def test_bad_rules_are_rejected_before_any_data_is_read():
+    with pytest.raises(ValueError, match="Unknown rules for column 'Code': maximum"):
+        ValidationEngine({'Code': {'type': 'numeric', 'maximum': 3}})
+
+
+def test_load_config(tmp_path):
+    config = tmp_path / 'config.py'
+    config.write_text(
+        "EXPECTED_COLUMNS = ['Code', 'Supplier']\n"
+        "COLUMN_VALIDATIONS = {\n"
+        "    'Code': {'type': 'string', 'pattern': r'[A-Z]+'},\n"
+        "    'Supplier': {'type': 'string', 'reference': 'suppliers.csv'},\n"
+        "}\n")
+    expected_columns, column_validations = load_config(str(config))
+    assert expected_columns == ['Code', 'Supplier']
+    # Reference paths are relative to the config file
+    assert column_validations['Supplier']['reference'] == {'path': str(tmp_path / 'suppliers.csv')}
+
+
+def test_load_config_keeps_the_built_in_settings_it_does_not_define(tmp_path):
+    config = tmp_path / 'config.py'
+    config.write_text("COLUMN_VALIDATIONS = {'Customer': {'type': 'string', 'required': False}}\n")
+    expected_columns, column_validations = load_config(str(config))
+    assert expected_columns == EXPECTED_COLUMNS
+    assert column_validations == {'Customer': {'type': 'string', 'required': False}}
+    
+    config.write_text("COLUMN_VALIDATIONS = {'Customer': {'type': 'string', 'unique': True, 'minimum': 1}}\n")
+    with pytest.raises(ValueError, match='minimum'):
+        load_config(str(config))
+
+
+def test_duplicate_keys_across_chunks():
+    """A key repeated in a later chunk fails there, and its group lists every row."""
+    engine = ValidationEngine({'RO': {'type': 'string', 'unique': ['SN']}, 'SN': {'type': 'string'}})
+    duplicates = engine.duplicate_indexes()
+    first = pd.DataFrame({'RO': ['A', 'B', 'A'], 'SN': ['1', '1', '2']})
+    second = pd.DataFrame({'RO': ['B', 'C', None], 'SN': ['1', '1', '1']}, index=[3, 4, 5])
+    assert engine.run(first, duplicates=duplicates).is_valid
+    result = engine.run(second, duplicates=duplicates, row_offset=3)
+    assert result.masks[('RO', 'duplicate')].tolist() == [True, False, False]
+    # Rows with an empty key column are never duplicates
+    assert result.counts == {('RO', 'required'): 1, ('RO', 'duplicate'): 1}
+    assert duplicates['RO'].groups() == [{'key': {'RO': 'B', 'SN': '1'}, 'rows': [3, 5]}]
+
+
+def test_duplicate_groups_match_pandas_over_many_adds():
+    """Keys added in many chunks are grouped as pandas groups the whole column."""
+    rng = np.random.default_rng(7)
+    keys = pd.DataFrame({'RO': [f"RO-{i}" for i in rng.integers(0, 300, 1000)],
+                         'SN': [f"SN-{i}" for i in rng.integers(0, 2, 1000)]})
+    index = DuplicateIndex(['RO', 'SN'])
+    repeated = np.concatenate([index.add(keys.iloc[start:start + 97], row_offset=start)
+                               for start in range(0, len(keys), 97)])
+    assert repeated.tolist() == keys.duplicated().tolist()
+    assert len(index) == len(keys.drop_duplicates())
+    
+    # Sheet rows start at 2, below the header
+    expected = {
+        key: (rows + 2).tolist()
+        for key, rows in keys.groupby(['RO', 'SN'], sort=False).indices.items() if len(rows) > 1
+    }
+    groups = index.groups()
+    assert {(group['key']['RO'], group['key']['SN']): group['rows'] for group in groups} == expected
+    assert len(groups) == len(expected)
+
+
+def test_reference_index_is_reused_until_the_source_changes(tmp_path):
+    source = tmp_path / 'suppliers.csv'
+    source.write_text("Supplier Code\n00123\nSC-1\n")
+    index = ReferenceIndex(str(source), 'Supplier Code', index_dir=str(tmp_path / 'index'))
+    values = pd.Series(['00123', '123', 'SC-1', 'SC-2', None])
+    assert index.contains(values).tolist() == [True, False, True, False, False]
+    
+    reopened = ReferenceIndex(str(source), 'Supplier Code', index_dir=str(tmp_path / 'index'))
+    assert isinstance(reopened.hashes(), np.memmap)
+    
+    source.write_text("Supplier Code\n00123\nSC-1\nSC-2\n")
+    os.utime(source, ns=(time.time_ns() + 10**9,) * 2)
+    assert reopened.contains(values).tolist() == [True, False, True, True, False]
+
+
+def test_reference_rule(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine_module, 'load_reference',
+                        functools.partial(load_reference, index_dir=str(tmp_path / 'index')))
+    (tmp_path / 'suppliers.csv').write_text("Code\nSC-1\nSC-2\n")
+    engine = ValidationEngine({'Supplier': {'type': 'string', 'required': False,
+                                            'reference': {'path': str(tmp_path / 'suppliers.csv'), 'column': 'Code'}}})
+    result = engine.run(pd.DataFrame({'Supplier': ['SC-1', 'SC-3', None]}))
+    assert result.counts == {('Supplier', 'reference'): 1}
+    assert result.masks[('Supplier', 'reference')].tolist() == [False, True, False]
+
+
+def test_error_budget_stops_after_the_failing_column():
+    engine = ValidationEngine({'A': {'type': 'numeric'}, 'B': {'type': 'numeric'}})
+    df = pd.DataFrame({'A': ['x', 'y', 1], 'B': ['z', 2, 3]})
+    result = engine.run(df, max_errors=1)
+    assert result.counts == {('A', 'numeric'): 2}
+    assert result.stopped == 1
+    assert result.errors()[-1].startswith("Validation stopped at the error budget of 1")
+    assert engine.run(df).counts == {('A', 'numeric'): 2, ('B', 'numeric'): 1}
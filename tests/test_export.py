@@ -0,0 +1,111 @@
+"""Tests of exporting validated data for other tools."""
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import optix_row, write_workbook
+from excel_handler import EXPECTED_COLUMNS, LazyExcelData, read_and_validate_excel
+from excel_handler import data as data_module
+
+pytest.importorskip('pyarrow')
+
+
+# Columns without rules: hours worked, free text, and references that are sometimes numbers
+EXTRA_COLUMNS = ['Hours', 'Notes', 'Reference']
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """A workbook whose columns only show their final type after the first slices."""
+    rows = [optix_row(i) + [i % 9, f"note {i % 3}", i if i % 50 else f"REF-{i}"] for i in range(300)]
+    # A part number column of plain numbers until the last rows
+    for i, row in enumerate(rows):
+        row[EXPECTED_COLUMNS.index('Customer Pre Work PN')] = 1000 + i if i < 290 else f"PN-{i}"
+    # Blank priorities only near the end, so the column cannot be an integer one
+    rows[295][EXPECTED_COLUMNS.index('Priority - PDR/TDR')] = 2.5
+    return write_workbook(tmp_path / 'export.xlsx', rows, header=EXPECTED_COLUMNS + EXTRA_COLUMNS)
+
+
+@pytest.fixture
+def excel_data(workbook, rules):
+    """The workbook, validated."""
+    data = read_and_validate_excel(workbook, EXPECTED_COLUMNS, rules)
+    assert data is not None
+    return data
+
+
+def read_export(path, export_format):
+    return {'parquet': pd.read_parquet, 'arrow': pd.read_feather, 'csv': pd.read_csv}[export_format](path)
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow', 'csv'])
+def test_slices_are_written_with_the_types_of_the_whole_column(tmp_path, excel_data, export_format):
+    path = tmp_path / f"sliced.{export_format}"
+    assert excel_data.export(str(path), export_format, batch_size=50) == 300
+    whole = tmp_path / f"whole.{export_format}"
+    excel_data.export(str(whole), export_format, batch_size=1000)
+    
+    if export_format == 'csv':
+        assert path.read_text() == whole.read_text()
+        return
+    sliced, single = (read_export(p, export_format) for p in (path, whole))
+    pd.testing.assert_frame_equal(sliced, single)
+    assert sliced['Customer Pre Work PN'].iloc[0] == '1000'
+    assert sliced['Priority - PDR/TDR'].dtype == 'float32'
+    assert sliced['RO Create Date'].iloc[0] == datetime.datetime(2023, 1, 1)
+    assert isinstance(sliced['Customer'].dtype, pd.CategoricalDtype)
+    assert sliced['Hours'].dtype == 'int64'
+    assert sliced['Reference'].iloc[:2].tolist() == ['REF-0', '1']
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow', 'csv'])
+def test_streamed_export_is_written_like_the_in_memory_one(tmp_path, workbook, excel_data, rules, export_format):
+    streamed = read_and_validate_excel(workbook, EXPECTED_COLUMNS, rules, chunk_size=40, keep_for_export=True)
+    assert isinstance(streamed, LazyExcelData)
+    path = tmp_path / f"streamed.{export_format}"
+    assert streamed.export(str(path), export_format) == 300
+    whole = tmp_path / f"whole.{export_format}"
+    excel_data.export(str(whole), export_format)
+    
+    if export_format == 'csv':
+        assert path.read_text() == whole.read_text()
+    else:
+        pd.testing.assert_frame_equal(read_export(path, export_format), read_export(whole, export_format))
+    streamed.close()
+
+
+def test_streamed_export_does_not_read_the_workbook_again(tmp_path, workbook, rules, monkeypatch):
+    data = read_and_validate_excel(workbook, EXPECTED_COLUMNS, rules, chunk_size=40, keep_for_export=True)
+    kept = data._export_spill.directory
+    
+    def parse(*args, **kwargs):
+        raise AssertionError("the workbook was read again")
+    
+    monkeypatch.setattr(data_module, 'iter_excel_chunks', parse)
+    assert data.export(str(tmp_path / 'kept.parquet')) == 300
+    exported = pd.read_parquet(tmp_path / 'kept.parquet')
+    assert exported['Priority - PDR/TDR'].dtype == 'float32'
+    data.close()
+    assert not os.path.exists(kept)
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow', 'csv'])
+def test_multi_sheet_export(tmp_path, rules, export_format):
+    """Combined sheets hold columns in several Arrow chunks, which are written as one."""
+    path = write_workbook(tmp_path / 'months.xlsx', None, sheets={
+        'January': [optix_row(i) for i in range(30)],
+        'February': [optix_row(i) for i in range(30, 70)],
+    })
+    data = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, sheets='*')
+    export = tmp_path / f"months.{export_format}"
+    assert data.export(str(export), export_format, batch_size=50) == 70
+    
+    written = {'parquet': pd.read_parquet, 'arrow': pd.read_feather, 'csv': pd.read_csv}[export_format](export)
+    assert list(written.columns) == list(data.dataframe.columns)
+    assert written['Sheet'].tolist() == ['January'] * 30 + ['February'] * 40
+    assert written['Customer RO'].tolist() == [f"RO-{i:05d}" for i in range(70)]
+    
+    batches = list(data.to_arrow_batches(batch_size=50))
+    assert [batch.num_rows for batch in batches] == [50, 20]
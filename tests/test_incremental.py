@@ -0,0 +1,124 @@
+"""Tests of incremental re-validation."""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import optix_row, write_workbook
+from excel_handler import EXPECTED_COLUMNS, IncrementalValidator, read_and_validate_excel
+
+
+@pytest.fixture
+def incremental(tmp_path):
+    return IncrementalValidator(str(tmp_path / 'state'))
+
+
+def validate(path, rules, incremental):
+    data, error_index = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, incremental=incremental,
+                                                return_errors=True)
+    return data, error_index.diff
+
+
+def test_fixing_a_cell_that_changes_the_column_dtype(tmp_path, rules, incremental):
+    """Fixing the only 'n/a' of a numeric column turns it from float/object to int64; only its row changed."""
+    path = tmp_path / 'resubmitted.xlsx'
+    write_workbook(path, [optix_row(i, **({'Priority - PDR/TDR': 'n/a'} if i == 5 else {})) for i in range(200)])
+    data, diff = validate(path, rules, incremental)
+    assert data is None and not diff['previous_version']
+    
+    write_workbook(path, [optix_row(i) for i in range(200)])
+    data, diff = validate(path, rules, incremental)
+    assert data is not None
+    assert diff['previous_version']
+    assert len(diff['added']) == 0
+    assert diff['changed'].tolist() == [7]
+    assert diff['unchanged'] == 199
+
+
+def test_previous_version_without_rows(tmp_path, rules, incremental):
+    """A file first validated with no data rows does not break later runs."""
+    path = tmp_path / 'empty_first.xlsx'
+    write_workbook(path, [])
+    data, diff = validate(path, rules, incremental)
+    assert data is not None and data.rows == 0
+    
+    write_workbook(path, [optix_row(i) for i in range(10)])
+    data, diff = validate(path, rules, incremental)
+    assert data is not None
+    assert diff['previous_version']
+    assert diff['added'].tolist() == list(range(2, 12))
+    assert diff['unchanged'] == 0
+    
+    # The state was replaced, so the next run sees the ten rows
+    data, diff = validate(path, rules, incremental)
+    assert data is not None and diff['unchanged'] == 10
+
+
+def test_added_changed_and_removed_rows(tmp_path, rules, incremental):
+    path = tmp_path / 'edited.xlsx'
+    write_workbook(path, [optix_row(i) for i in range(10)])
+    validate(path, rules, incremental)
+    
+    rows = [optix_row(i) for i in range(10) if i != 3]
+    rows[0] = optix_row(0, Description='Changed')
+    rows.append(optix_row(50))
+    write_workbook(path, rows)
+    data, diff = validate(path, rules, incremental)
+    assert data is not None
+    assert diff['added'].tolist() == [11]
+    assert diff['changed'].tolist() == [2]
+    assert diff['removed'] == [('RO-00003', 'SN-00003')]
+    assert diff['unchanged'] == 8
+
+
+def test_stored_errors_are_reused_for_unchanged_rows(tmp_path, rules, incremental):
+    path = tmp_path / 'errors.xlsx'
+    write_workbook(path, [optix_row(i, **({'RO Close Date': 'soon'} if i == 4 else {})) for i in range(10)])
+    assert validate(path, rules, incremental)[0] is None
+    
+    # Another row changes; the unchanged bad row must still fail
+    write_workbook(path, [optix_row(i, **({'RO Close Date': 'soon'} if i == 4 else
+                                           {'Description': 'New'} if i == 7 else {})) for i in range(10)])
+    data, error_index = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, incremental=incremental,
+                                                return_errors=True)
+    assert data is None
+    assert error_index.counts() == {('RO Close Date', 'date'): 1}
+    assert error_index.diff['changed'].tolist() == [9]
+
+
+def test_changed_rules_discard_the_state(tmp_path, rules, incremental):
+    path = tmp_path / 'rules.xlsx'
+    write_workbook(path, [optix_row(i) for i in range(5)])
+    validate(path, rules, incremental)
+    rules['Priority - PDR/TDR']['max'] = 3
+    data, diff = validate(path, rules, incremental)
+    assert data is None
+    assert not diff['previous_version']
+
+
+def test_state_is_stored_without_pickle(tmp_path, rules, incremental):
+    """The state can be loaded with pickle support turned off, and removed rows keep their key values."""
+    path = tmp_path / 'no_pickle.xlsx'
+    write_workbook(path, [optix_row(i) for i in range(5)])
+    validate(path, rules, incremental)
+    state_files = os.listdir(tmp_path / 'state')
+    assert len(state_files) == 1 and state_files[0].endswith('.npz')
+    with np.load(tmp_path / 'state' / state_files[0], allow_pickle=False) as state:
+        assert len(state['key']) == 5
+    
+    write_workbook(path, [optix_row(i) for i in range(4)])
+    _, diff = validate(path, rules, incremental)
+    assert diff['removed'] == [('RO-00004', 'SN-00004')]
+
+
+def test_least_recently_validated_files_are_forgotten(tmp_path, rules):
+    """State beyond max_bytes is removed, oldest first."""
+    incremental = IncrementalValidator(str(tmp_path / 'state'))
+    first = write_workbook(tmp_path / 'first.xlsx', [optix_row(i) for i in range(50)])
+    validate(first, rules, incremental)
+    incremental.max_bytes = os.path.getsize(tmp_path / 'state' / os.listdir(tmp_path / 'state')[0]) * 3 // 2
+    validate(write_workbook(tmp_path / 'second.xlsx', [optix_row(i) for i in range(50)]), rules, incremental)
+    assert len(os.listdir(tmp_path / 'state')) == 1
+    
+    _, diff = validate(first, rules, incremental)
+    assert not diff['previous_version']
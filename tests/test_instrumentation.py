@@ -0,0 +1,30 @@
+"""Tests of the per-stage timing and memory instrumentation."""
+import datetime
+
+from excel_handler import EXPECTED_COLUMNS, Instrumentation, read_and_validate_excel
+
+
+def test_instrumentation_adds_up_repeated_stages():
+    instrument = Instrumentation(trace_memory=True)
+    for _ in range(3):
+        with instrument.stage('read'):
+            with instrument.stage('parse'):
+                data = [datetime.date.today()] * 100000
+            del data
+    records = {record['stage']: record for record in instrument.to_list()}
+    assert list(records) == ['parse', 'read']
+    assert records['read']['calls'] == 3
+    # The enclosing stage's peak includes what its nested stages allocated
+    assert records['read']['peak_bytes'] >= records['parse']['peak_bytes'] >= 800000
+
+
+def test_instrumentation_appends_json_lines(tmp_path, optix_file, rules):
+    instrument = Instrumentation()
+    data = read_and_validate_excel(optix_file(), EXPECTED_COLUMNS, rules, instrument=instrument)
+    assert data.metrics is instrument
+    path = tmp_path / 'stages.jsonl'
+    instrument.to_jsonl(str(path), file='optix.xlsx')
+    instrument.to_jsonl(str(path), file='optix.xlsx')
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2 * len(instrument.records)
+    assert '"file": "optix.xlsx"' in lines[0]
@@ -0,0 +1,50 @@
+"""Tests of out-of-core mode, which spills validated chunks to an Arrow file."""
+import gc
+import os
+import sys
+
+import pytest
+
+from excel_handler import EXPECTED_COLUMNS, OutOfCoreExcelData, read_and_validate_excel
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def spilled(tmp_path, optix_file, rules):
+    data = read_and_validate_excel(optix_file(rows=50), EXPECTED_COLUMNS, rules, chunk_size=20,
+                                   spill_dir=str(tmp_path / 'spill'))
+    assert isinstance(data, OutOfCoreExcelData)
+    yield data
+    data.close()
+
+
+def mapped(path):
+    """Return whether path is memory-mapped by this process."""
+    with open('/proc/self/maps') as maps:
+        return path in maps.read()
+
+
+def test_accessors_read_the_spill_file(spilled):
+    assert spilled.table().num_rows == 50
+    assert [len(chunk) for chunk in spilled.iter_chunks()] == [20, 20, 10]
+    assert [batch.num_rows for batch in spilled.to_arrow_batches(batch_size=15)] == [15, 5, 15, 5, 10]
+    assert spilled.column('Customer RO')[49].as_py() == 'RO-00049'
+    assert spilled.validate(max_errors=1)[0]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="reads /proc/self/maps")
+def test_the_spill_file_is_unmapped_once_results_are_dropped(spilled):
+    path = os.path.realpath(spilled.spill_path)
+    table = spilled.table()
+    column = spilled.column('Customer')
+    assert mapped(path)
+    del table, column
+    assert sum(batch.num_rows for batch in spilled.to_arrow_batches()) == 50
+    gc.collect()
+    assert not mapped(path)
+    
+    spilled.close()
+    assert not os.path.exists(path)
+    # Closing twice is harmless
+    spilled.close()
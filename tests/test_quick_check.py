@@ -0,0 +1,35 @@
+"""Tests of the sampled quick check."""
+from conftest import optix_row, write_workbook
+from excel_handler import EXPECTED_COLUMNS, quick_check
+
+
+def test_quick_check_of_a_whole_sheet_is_exact(optix_file, rules):
+    path = optix_file(rows=50, changes={i: {'Priority - PDR/TDR': 'high'} for i in range(0, 50, 10)})
+    check = quick_check(path, EXPECTED_COLUMNS, rules, sample_size=1000, seed=1)
+    assert check.complete and len(check.sample) == 50
+    estimate = check.estimates()[('Priority - PDR/TDR', 'numeric')]
+    assert estimate == {'errors': 5, 'rate': 0.1, 'low': 0.1, 'high': 0.1}
+    
+    data, error_index = check.full(return_errors=True)
+    assert data is None
+    assert error_index.sheet_rows().tolist() == [2, 12, 22, 32, 42]
+
+
+def test_quick_check_of_a_sample_gives_an_interval(optix_file, rules):
+    path = optix_file(rows=200, changes={i: {'Customer': None} for i in range(0, 200, 4)})
+    check = quick_check(path, EXPECTED_COLUMNS, rules, sample_size=50, seed=1)
+    assert len(check.sample) == 50 and check.rows_scanned == 200
+    estimate = check.estimates()[('Customer', 'required')]
+    assert 0 < estimate['low'] < 0.25 < estimate['high'] < 1
+    
+    # Sampling again with the same seed picks the same rows
+    again = quick_check(path, EXPECTED_COLUMNS, rules, sample_size=50, seed=1)
+    assert again.sample.index.tolist() == check.sample.index.tolist()
+    check.close()
+    again.close()
+
+
+def test_quick_check_stops_at_a_bad_header(tmp_path, rules, capsys):
+    path = write_workbook(tmp_path / 'renamed.xlsx', [optix_row(0)], header=['Client'] + EXPECTED_COLUMNS[1:])
+    assert quick_check(path, EXPECTED_COLUMNS, rules) is None
+    assert "Customer" in capsys.readouterr().out
@@ -0,0 +1,139 @@
+"""Tests of read_and_validate_excel: the header probe, whole-sheet and streamed reads."""
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+
+from conftest import optix_row, write_workbook
+from excel_handler import (
+    EXPECTED_COLUMNS,
+    READER_BACKENDS,
+    Instrumentation,
+    LazyExcelData,
+    read_and_validate_excel,
+    read_excel_header,
+)
+
+INSTALLED = [name for name, backend in READER_BACKENDS.items() if backend.available()]
+STREAMING = [name for name in INSTALLED if READER_BACKENDS[name].streaming]
+
+# Rows with one error each: a missing value, a bad number and a bad date
+CHANGES = {
+    3: {'Customer': None},
+    7: {'Priority - PDR/TDR': 'high'},
+    12: {'RO Close Date': 'soon'},
+}
+
+
+def validate(path, rules, **options):
+    return read_and_validate_excel(path, EXPECTED_COLUMNS, rules, return_errors=True, **options)
+
+
+def share_strings(path):
+    """
+    Move the inline strings of an openpyxl workbook into a shared string table.
+    
+    openpyxl writes text into each cell, while Excel writes it once to
+    xl/sharedStrings.xml and refers to it by index.
+    """
+    with zipfile.ZipFile(path) as archive:
+        parts = {name: archive.read(name) for name in archive.namelist()}
+    strings = []
+    
+    def share(match):
+        strings.append(match.group(2))
+        return f'{match.group(1)} t="s"><v>{len(strings) - 1}</v></c>'
+    
+    sheet = 'xl/worksheets/sheet1.xml'
+    parts[sheet] = re.sub(r'(<c r="[A-Z]+[0-9]+") t="inlineStr"><is><t[^>]*>(.*?)</t></is></c>',
+                          share, parts[sheet].decode('utf-8')).encode('utf-8')
+    parts['xl/sharedStrings.xml'] = (
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        + ''.join(f'<si><t xml:space="preserve">{text}</t></si>' for text in strings)
+        + '</sst>').encode('utf-8')
+    parts['[Content_Types].xml'] = parts['[Content_Types].xml'].replace(b'</Types>', (
+        b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+        b'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>'))
+    parts['xl/_rels/workbook.xml.rels'] = parts['xl/_rels/workbook.xml.rels'].replace(b'</Relationships>', (
+        b'<Relationship Id="rIdShared" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+        b'relationships/sharedStrings" Target="sharedStrings.xml"/></Relationships>'))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return path
+
+
+@pytest.fixture(params=['inline', 'shared'])
+def strings(request):
+    """Write workbooks with inline strings as openpyxl does, or shared strings as Excel does."""
+    return share_strings if request.param == 'shared' else (lambda path: path)
+
+
+def test_header_is_named_like_read_excel(tmp_path, strings):
+    header = ['Name', 'Count', None, 2023, 'Name', 'Name.1']
+    path = strings(write_workbook(tmp_path / 'header.xlsx', [['a', 1, 'x', 2, 'b', 'c']], header=header))
+    assert read_excel_header(path) == ['Name', 'Count', 'Unnamed: 2', '2023', 'Name.2', 'Name.1']
+    assert read_excel_header(path) == [str(col) for col in pd.read_excel(path, nrows=0).columns]
+
+
+@pytest.mark.parametrize('chunk_size', [None, 5])
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_bad_header_is_rejected_before_data_rows_are_parsed(tmp_path, rules, strings, backend, chunk_size,
+                                                             monkeypatch, capsys):
+    header = ['Client'] + EXPECTED_COLUMNS[1:]
+    path = strings(write_workbook(tmp_path / 'renamed.xlsx', [optix_row(i) for i in range(20)], header=header))
+    
+    def parse(*args, **kwargs):
+        raise AssertionError("the data rows were parsed")
+    
+    monkeypatch.setattr(type(READER_BACKENDS[backend]), 'open', parse)
+    instrument = Instrumentation()
+    data, error_index = validate(path, rules, backend=backend, chunk_size=chunk_size, instrument=instrument)
+    assert data is None and error_index is None
+    assert "Missing columns: Customer" in capsys.readouterr().out
+    assert [record['stage'] for record in instrument.to_list()] == ['header_probe', 'column_check']
+
+
+def test_good_header_with_shared_strings_passes(tmp_path, rules):
+    path = share_strings(write_workbook(tmp_path / 'shared.xlsx', [optix_row(i) for i in range(20)]))
+    data, error_index = validate(path, rules)
+    assert data is not None and data.rows == 20
+    assert data.dataframe['Customer RO'].iloc[3] == 'RO-00003'
+
+
+@pytest.mark.parametrize('backend', STREAMING)
+def test_streaming_finds_what_a_full_read_finds(optix_file, rules, backend):
+    path = optix_file(rows=30, changes=CHANGES)
+    _, full = validate(path, rules, backend=backend)
+    _, streamed = validate(path, rules, backend=backend, chunk_size=4)
+    assert streamed.counts() == full.counts()
+    assert streamed.sheet_rows().tolist() == full.sheet_rows().tolist()
+    
+    data, _ = validate(optix_file(rows=30, name='valid.xlsx'), rules, backend=backend, chunk_size=4)
+    assert isinstance(data, LazyExcelData)
+    assert data.rows == 30
+    assert sum(len(chunk) for chunk in data.iter_chunks()) == 30
+
+
+def test_duplicates_across_stream_chunks(optix_file, rules):
+    rules['Customer RO']['unique'] = ['Customer Pre Work SN']
+    path = optix_file(rows=10, changes={8: {'Customer RO': 'RO-00001', 'Customer Pre Work SN': 'SN-00001'}})
+    data, error_index = validate(path, rules, chunk_size=3)
+    assert data is None
+    assert error_index.counts() == {('Customer RO', 'duplicate'): 1}
+    assert error_index.duplicate_groups() == [
+        {'key': {'Customer RO': 'RO-00001', 'Customer Pre Work SN': 'SN-00001'}, 'rows': [3, 10]},
+    ]
+
+
+def test_error_budget_stops_reading_the_stream(optix_file, rules):
+    changes = {i: {'Priority - PDR/TDR': 'high'} for i in range(40)}
+    path = optix_file(rows=40, changes=changes)
+    instrument = Instrumentation()
+    data, error_index = validate(path, rules, chunk_size=5, max_errors=3, instrument=instrument)
+    assert data is None
+    assert error_index.stopped == 3
+    # The budget ran out in the first chunk, so the rest of the sheet was never read
+    assert error_index.counts() == {('Priority - PDR/TDR', 'numeric'): 5}
+    assert max(record['calls'] for record in instrument.to_list()) == 1
@@ -0,0 +1,128 @@
+"""Tests of the reader backends."""
+import datetime
+
+import pandas as pd
+import pytest
+
+from conftest import optix_row, write_workbook
+from excel_handler import (
+    EXPECTED_COLUMNS,
+    READER_BACKENDS,
+    iter_excel_chunks,
+    read_and_validate_excel,
+    read_sheet,
+    select_backend,
+)
+
+INSTALLED = [name for name, backend in READER_BACKENDS.items() if backend.available()]
+
+HEADER = ['Name', 'Count', 'Price', 'When', 'Mixed', 'Notes', 'Blank']
+ROWS = [
+    ['a', 1, 1.5, datetime.datetime(2020, 1, 2), 'x', 'N/A', None],
+    ['N/A', 2, 2.25, datetime.datetime(2021, 3, 4, 5, 6, 7), 5, 'NA', None],
+    ['NULL', 'n/a', None, 'nan', 'None', '#N/A', None],
+    [None, None, None, None, None, None, None],
+    ['b', 3, 'NaN', datetime.datetime(2022, 1, 1), 2.5, '', None],
+    ['null', 4, 3.0, None, ' NA ', '<NA>', None],
+]
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    return write_workbook(tmp_path / 'backends.xlsx', ROWS, header=HEADER)
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_backends_read_like_read_excel(fixture_file, backend):
+    """Every backend gives the frame pd.read_excel gives, including its default NA strings."""
+    expected = pd.read_excel(fixture_file)
+    pd.testing.assert_frame_equal(read_sheet(fixture_file, backend=backend), expected)
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_na_strings_are_missing(fixture_file, backend):
+    df = read_sheet(fixture_file, backend=backend)
+    assert df['Name'].isna().tolist() == [False, True, True, True, False, True]
+    assert df['Count'].dtype == 'float64'
+    assert df['Notes'].isna().all()
+    assert df['Mixed'].iloc[5] == ' NA '
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_chunks_match_whole_sheet(fixture_file, backend):
+    chunks = list(iter_excel_chunks(fixture_file, chunk_size=2, backend=backend))
+    # The blank fourth row must not make its chunk longer than chunk_size
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2]
+    assert [chunk.index[0] for chunk in chunks] == [0, 2, 4]
+    # A column's type can differ between chunks, e.g. when it is empty in one
+    combined = pd.concat(chunks).infer_objects()
+    expected = pd.read_excel(fixture_file)
+    pd.testing.assert_frame_equal(combined, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_repeated_header_names(tmp_path, backend):
+    path = write_workbook(tmp_path / 'repeated.xlsx', [[1, 2, 3, 4, 5, 6]], header=['A', 'A', 'A.1', None, 'A', 'B'])
+    expected = list(pd.read_excel(path).columns)
+    assert expected == ['A', 'A.2', 'A.1', 'Unnamed: 3', 'A.3', 'B']
+    assert list(read_sheet(path, backend=backend).columns) == expected
+
+
+@pytest.mark.parametrize('backend', ['auto'] + INSTALLED)
+def test_na_string_fails_required_column_with_every_backend(optix_file, rules, backend, capsys):
+    path = optix_file(5, changes={2: {'Customer': 'N/A'}})
+    assert read_and_validate_excel(path, EXPECTED_COLUMNS, rules, backend=backend) is None
+    assert "Column 'Customer' has 1 empty/null values" in capsys.readouterr().out
+
+
+def test_chunked_reads_pick_a_streaming_backend(optix_file, rules):
+    path = optix_file(30)
+    data = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, chunk_size=10)
+    assert READER_BACKENDS[data.backend].streaming
+    assert select_backend(path, streaming=True).streaming
+    assert [len(chunk) for chunk in data.iter_chunks()] == [10, 10, 10]
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_every_backend_finds_the_same_errors(optix_file, rules, backend):
+    changes = {3: {'Customer': None}, 7: {'Priority - PDR/TDR': 'high'}, 12: {'RO Close Date': 'soon'}}
+    path = optix_file(rows=30, changes=changes)
+    data, error_index = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, backend=backend, return_errors=True)
+    assert data is None
+    assert error_index.counts() == {
+        ('Customer', 'required'): 1,
+        ('Priority - PDR/TDR', 'numeric'): 1,
+        ('RO Close Date', 'date'): 1,
+    }
+    assert error_index.sheet_rows().tolist() == [5, 9, 14]
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_every_backend_passes_a_valid_file(optix_file, rules, backend):
+    path = optix_file(rows=30)
+    data, error_index = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, backend=backend, return_errors=True)
+    assert data is not None and data.rows == 30
+    assert len(error_index) == 0
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_only_the_requested_columns_are_loaded(fixture_file, backend):
+    """Projected columns come in header order, like usecols; names not in the header are ignored."""
+    df = read_sheet(fixture_file, backend=backend, columns=['Price', 'Name', 'Missing'])
+    assert list(df.columns) == ['Name', 'Price']
+    pd.testing.assert_frame_equal(df, pd.read_excel(fixture_file, usecols=['Name', 'Price']))
+    
+    chunks = list(iter_excel_chunks(fixture_file, chunk_size=4, backend=backend, columns=['When', 'Count']))
+    assert all(list(chunk.columns) == ['Count', 'When'] for chunk in chunks)
+    combined = pd.concat(chunks).infer_objects()
+    pd.testing.assert_frame_equal(combined, pd.read_excel(fixture_file, usecols=['Count', 'When']), check_dtype=False)
+
+
+@pytest.mark.parametrize('backend', INSTALLED)
+def test_extra_columns_are_not_loaded(tmp_path, rules, backend):
+    header = EXPECTED_COLUMNS[:3] + ['Internal notes'] + EXPECTED_COLUMNS[3:] + ['Extra']
+    rows = [optix_row(i)[:3] + [f"note {i}"] + optix_row(i)[3:] + [i] for i in range(10)]
+    path = write_workbook(tmp_path / 'extra.xlsx', rows, header=header)
+    data = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, backend=backend, columns=EXPECTED_COLUMNS)
+    assert data.columns == EXPECTED_COLUMNS
+    assert data.dataframe['Customer Pre Work SN'].tolist() == [f"SN-{i:05d}" for i in range(10)]
@@ -0,0 +1,122 @@
+"""Tests for the local HTTP validation service."""
+import json
+import os
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from excel_handler import server as server_module
+from excel_handler import ValidationServer
+
+real_validate_file_report = server_module.validate_file_report
+
+
+def crashing_validate_file_report(file_path, **options):
+    """Validate like validate_file_report, but kill the worker on files named crash*."""
+    if os.path.basename(file_path).startswith('crash'):
+        os._exit(1)
+    return real_validate_file_report(file_path, **options)
+
+
+@pytest.fixture
+def start_server():
+    """Start one-worker ValidationServers on free ports, with the given options, and stop them after the test."""
+    started = []
+    
+    def start(**options):
+        service = ValidationServer(port=0, workers=1, **options)
+        thread = threading.Thread(target=service.serve_forever)
+        thread.start()
+        started.append((service, thread))
+        return service
+    
+    yield start
+    for service, thread in started:
+        service.shutdown()
+        thread.join()
+
+
+@pytest.fixture
+def server(start_server):
+    """Run a one-worker ValidationServer on a free port for the test."""
+    return start_server()
+
+
+def request(service, path, payload=None):
+    """Send a GET, or a JSON POST if payload is given, and return the decoded response."""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = Request(service.address + path, data=data, headers={'Content-Type': 'application/json'})
+    with urlopen(req, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def upload(service, path, filename):
+    """POST a workbook as the request body and return the decoded response."""
+    with open(path, 'rb') as f:
+        req = Request(f"{service.address}/validate?filename={filename}", data=f.read(),
+                      headers={'Content-Type': 'application/octet-stream'})
+    with urlopen(req, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def test_validate_path(server, optix_file):
+    result = request(server, '/validate', {'path': optix_file()})
+    assert result['passed'] is True
+    assert result['rows'] == 20
+
+
+def test_uploads_use_the_cache_and_incremental_state(start_server, tmp_path, optix_file):
+    service = start_server(cache_dir=str(tmp_path / 'cache'), state_dir=str(tmp_path / 'state'))
+    path = optix_file()
+    first = upload(service, path, 'ro_list.xlsx')
+    assert first['file'] == 'ro_list.xlsx'
+    assert first['changes']['previous_version'] is False
+    
+    # The same workbook again is read from the cache, and its rows are matched to the first upload
+    again = upload(service, path, 'ro_list.xlsx')
+    assert any('(from cache)' in line for line in again['log'])
+    assert again['changes']['previous_version'] is True
+    assert again['changes']['unchanged'] == 20
+    
+    # A corrected version is compared with the last upload of the same name only
+    changed = upload(service, optix_file(name='fixed.xlsx', changes={4: {'Customer': 'Customer 9'}}), 'ro_list.xlsx')
+    assert changed['changes']['changed_rows'] == [6]
+    assert upload(service, path, 'other.xlsx')['changes']['previous_version'] is False
+
+
+def test_pool_is_replaced_after_a_worker_crash(server, optix_file, monkeypatch):
+    monkeypatch.setattr(server_module, 'validate_file_report', crashing_validate_file_report)
+    good = optix_file(name='good.xlsx')
+    
+    crashed = request(server, '/validate', {'path': optix_file(name='crash.xlsx')})
+    assert crashed['passed'] is False
+    assert 'crashed' in crashed['error']
+    
+    assert request(server, '/validate', {'path': good})['passed'] is True
+    health = request(server, '/health')
+    assert (health['pool'], health['pool_restarts']) == ('ok', 1)
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'max_errors': '5'}, "'max_errors' must be an integer"),
+    ({'max_errors': True}, "'max_errors' must be an integer"),
+    ({'max_errors': 0}, "'max_errors' must be at least 1"),
+    ({'only_expected': 'yes'}, "'only_expected' must be true or false"),
+    ({'sheets': ['Month*']}, "'sheets' must be a string"),
+    ({'backend': 'excel'}, "Unknown reader backend 'excel'"),
+])
+def test_options_of_the_wrong_type_are_rejected(server, optix_file, options, error):
+    with pytest.raises(HTTPError) as excinfo:
+        request(server, '/validate', {'path': optix_file(), **options})
+    assert excinfo.value.code == 400
+    assert json.loads(excinfo.value.read())['error'].startswith(error)
+
+
+def test_query_options_that_do_not_parse_are_rejected(server):
+    req = Request(server.address + '/validate?max_errors=five', data=b'x',
+                  headers={'Content-Type': 'application/octet-stream'})
+    with pytest.raises(HTTPError) as excinfo:
+        urlopen(req, timeout=60)
+    assert excinfo.value.code == 400
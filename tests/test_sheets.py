@@ -0,0 +1,29 @@
+"""Tests of validating several sheets of a workbook."""
+from conftest import optix_row, write_workbook
+from excel_handler import EXPECTED_COLUMNS, SHEET_COLUMN, read_and_validate_excel
+
+
+def test_sheets_are_validated_and_combined(tmp_path, rules):
+    path = write_workbook(tmp_path / 'months.xlsx', None, sheets={
+        'January': [optix_row(i) for i in range(5)],
+        'Summary': [['total']],
+        'February': [optix_row(i) for i in range(5, 8)],
+    })
+    data, error_indexes = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, return_errors=True, sheets='*uary')
+    assert list(error_indexes) == ['January', 'February']
+    assert data.rows == 8
+    assert data.dataframe[SHEET_COLUMN].value_counts().to_dict() == {'January': 5, 'February': 3}
+
+
+def test_errors_are_reported_per_sheet(tmp_path, rules):
+    path = write_workbook(tmp_path / 'months.xlsx', None, sheets={
+        'January': [optix_row(i) for i in range(5)],
+        'February': [optix_row(i, **({'RO Create Date': 'never'} if i == 6 else {})) for i in range(5, 8)],
+    })
+    data, error_indexes = read_and_validate_excel(path, EXPECTED_COLUMNS, rules, return_errors=True,
+                                                    sheets=['January', 'February'])
+    assert data is None
+    assert len(error_indexes['January']) == 0
+    assert error_indexes['February'].first() == [
+        {'sheet': 'February', 'row': 3, 'column': 'RO Create Date', 'rule': 'date', 'value': 'never'},
+    ]
@@ -0,0 +1,24 @@
+"""Tests that the command-line tool starts without loading its heavy dependencies."""
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_import_main_loads_no_heavy_modules():
+    code = ("import sys, main; "
+            "print(' '.join(name for name in ('pandas', 'numpy', 'openpyxl', 'tkinter') if name in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, timeout=120)
+    assert loaded.returncode == 0, loaded.stderr
+    assert loaded.stdout.split() == []
+
+
+def test_heavy_modules_load_on_first_use():
+    code = ("import sys, main; "
+            "from excel_handler._lazy import np, pd; "
+            "frame = pd.DataFrame({'a': [1]}); "
+            "print(type(frame).__name__, np.int64(2) + 1, 'pandas' in sys.modules)")
+    used = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, timeout=120)
+    assert used.returncode == 0, used.stderr
+    assert used.stdout.split() == ['DataFrame', '3', 'True']
@@ -0,0 +1,54 @@
+"""Tests for the watch mode daemon."""
+import os
+import threading
+import time
+
+from excel_handler import watcher as watcher_module
+from excel_handler import FolderWatcher
+
+real_validate_file_report = watcher_module.validate_file_report
+
+
+def crashing_validate_file_report(file_path, **options):
+    """Validate like validate_file_report, but kill the worker on files named crash*."""
+    if os.path.basename(file_path).startswith('crash'):
+        os._exit(1)
+    return real_validate_file_report(file_path, **options)
+
+
+def watch_until(watcher, done, timeout=60):
+    """Run watcher on a thread until done() is true, and return whether it was."""
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not done():
+            time.sleep(0.1)
+        return done()
+    finally:
+        watcher.stop()
+        thread.join()
+
+
+def test_validated_files_are_moved_with_their_report(tmp_path, optix_file):
+    optix_file(name='good.xlsx')
+    optix_file(name='bad.xlsx', changes={0: {'Customer': None}})
+    watcher = FolderWatcher([str(tmp_path)], workers=1, settle=0, poll_interval=0.1, use_inotify=False)
+
+    assert watch_until(watcher, lambda: watcher.metrics()['processed'] == 2)
+    assert sorted(os.listdir(tmp_path / 'passed')) == ['good.xlsx', 'good.xlsx.json']
+    assert sorted(os.listdir(tmp_path / 'failed')) == ['bad.xlsx', 'bad.xlsx.json']
+
+
+def test_crashed_worker_fails_only_its_file(tmp_path, optix_file, monkeypatch):
+    monkeypatch.setattr(watcher_module, 'validate_file_report', crashing_validate_file_report)
+    for name in ('crash.xlsx', 'b.xlsx', 'c.xlsx'):
+        optix_file(name=name)
+    watcher = FolderWatcher([str(tmp_path)], workers=1, settle=0, poll_interval=0.1, use_inotify=False)
+
+    assert watch_until(watcher, lambda: watcher.metrics()['processed'] == 3)
+    assert sorted(os.listdir(tmp_path / 'passed')) == ['b.xlsx', 'b.xlsx.json', 'c.xlsx', 'c.xlsx.json']
+    assert sorted(os.listdir(tmp_path / 'failed')) == ['crash.xlsx', 'crash.xlsx.json']
+    metrics = watcher.metrics()
+    assert (metrics['passed'], metrics['failed']) == (2, 1)
+    assert metrics['pool_restarts'] >= 1